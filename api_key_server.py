@@ -1,18 +1,30 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 import os
 import uuid
 import threading
 from werkzeug.utils import secure_filename
 import time
 import json
+import functools
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from flask_cors import CORS
 import secrets
+import hashlib
+import signal
+import sys
 from threading import Lock
-
-# 导入FunASR相关库
-from funasr import AutoModel
-from funasr.utils.postprocess_utils import rich_transcription_postprocess
+from util.inference_pool import InferencePool, QueueFullError
+from util.micro_batcher import MicroBatcher
+from util.stream_session import StreamSession, SessionClosedError
+from util.api_key_store import ApiKeyStore
+from util.task_store import create_task_store
+from util.result_cache import ResultCache
+from util.audio_codec import UPLOAD_ENCODINGS
+from util.mov_support import extract_audio_from_video, audio_duration, is_pcm_wav
+from util.resumable_upload import ResumableUpload, ChunkError
+from util.model_backend import BACKENDS, default_device, merge_vad_segments
+from util.model_workers import InProcessModel, ModelWorkerPool
 
 app = Flask(__name__)
 CORS(app)
@@ -20,57 +32,121 @@ CORS(app)
 # 配置参数
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 最大500MB
+app.config['MODEL_BACKEND'] = os.environ.get('MODEL_BACKEND', 'funasr')  # 模型后端：funasr / torchscript / onnx / onnx-int8 / stub（纯 CPU 测试）
+# 推理设备，逗号分隔；默认有 GPU 时用 cuda:0，否则用 cpu
+app.config['MODEL_DEVICES'] = (os.environ.get('MODEL_DEVICES') or default_device()).split(',')
+app.config['SERVING_MODE'] = os.environ.get('SERVING_MODE', 'thread')  # thread：进程内推理；process：每个设备一个模型进程
+app.config['THREADS_PER_WORKER'] = int(os.environ.get('THREADS_PER_WORKER', 0)) or None  # 模型进程的 OMP 线程数
+app.config['WORKER_HEARTBEAT_TIMEOUT'] = 30  # 模型进程心跳超时（秒）
+app.config['MODEL_LOAD_TIMEOUT'] = 1800  # 模型下载与加载超时（秒）
+# 就绪前预热的合成音频时长（秒），逗号分隔，留空不预热
+app.config['WARM_UP_SECONDS'] = [float(seconds) for seconds in
+                                 os.environ.get('WARM_UP_SECONDS', '1,5,15').split(',') if seconds]
+# 模型就绪前：1 为接受任务并排队，0 为直接返回 503；流式会话始终拒绝
+app.config['QUEUE_UNTIL_READY'] = os.environ.get('QUEUE_UNTIL_READY', '1') == '1'
+# 并发推理线程数，进程模式下默认与模型进程数一致
+app.config['INFERENCE_WORKERS'] = int(os.environ.get('INFERENCE_WORKERS', 0)) or (
+    len(app.config['MODEL_DEVICES']) if app.config['SERVING_MODE'] == 'process' else 1)
+app.config['MAX_QUEUE_SIZE'] = int(os.environ.get('MAX_QUEUE_SIZE', 32))  # 排队任务上限
+# 单个长音频同时识别的时间段数，进程模式下默认与模型进程数一致
+app.config['SPLIT_PARALLELISM'] = int(os.environ.get('SPLIT_PARALLELISM', 0)) or (
+    len(app.config['MODEL_DEVICES']) if app.config['SERVING_MODE'] == 'process' else 1)
+# 长音频按静音切分、多个模型并行识别；只有一个模型时切分无法提速，不启用
+app.config['SPLIT_LONG_AUDIO'] = os.environ.get('SPLIT_LONG_AUDIO', '1') == '1' and app.config['SPLIT_PARALLELISM'] > 1
+app.config['LONG_AUDIO_SECONDS'] = int(os.environ.get('LONG_AUDIO_SECONDS', 300))  # 超过该时长的最终转写任务才切分
+app.config['SPLIT_CHUNK_SECONDS'] = 60  # 每个并行识别任务覆盖的音频时长
+app.config['MICRO_BATCHING'] = os.environ.get('MICRO_BATCHING', '1') == '1'  # 临时任务跨请求合批
+app.config['BATCH_WINDOW_MS'] = int(os.environ.get('BATCH_WINDOW_MS', 50))  # 合批等待窗口
+app.config['MAX_BATCH_SEGMENTS'] = int(os.environ.get('MAX_BATCH_SEGMENTS', 16))  # 单批最大片段数
+app.config['MAX_BATCHED_TASKS'] = int(os.environ.get('MAX_BATCHED_TASKS', 16))  # 同时等待合批结果的临时任务上限
+app.config['STREAM_VAD_CHUNK_MS'] = 200  # 流式 VAD 分块长度
+app.config['STREAM_PARTIAL_INTERVAL_MS'] = 2000  # 流式临时结果刷新间隔
+app.config['STREAM_IDLE_TIMEOUT'] = 600  # 流式会话空闲超时（秒）
+app.config['MAX_STATUS_WAIT'] = 60  # 长轮询最长等待（秒）
+app.config['SSE_HEARTBEAT'] = 15  # SSE 心跳间隔（秒）
+app.config['TASK_STORE'] = os.environ.get('TASK_STORE', 'memory')  # 任务存储后端：memory / sqlite
+app.config['TASK_DB_PATH'] = os.environ.get('TASK_DB_PATH', 'tasks.db')  # SQLite 任务库路径
+app.config['MAX_UPLOAD_SIZE'] = 4 * 1024 * 1024 * 1024  # 断点续传单个文件上限 4GB
+app.config['UPLOAD_CHUNK_SIZE'] = 8 * 1024 * 1024  # 断点续传默认分块大小
+app.config['UPLOAD_IDLE_TIMEOUT'] = 86400  # 未完成上传的保留时间（秒）
+app.config['RESULT_CACHE_DIR'] = os.environ.get('RESULT_CACHE_DIR', 'result_cache')  # 识别结果缓存目录
+app.config['RESULT_CACHE_MAX_BYTES'] = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# 影响识别结果的模型参数，变更后旧缓存自动失效
+MODEL_SIGNATURE = BACKENDS[app.config['MODEL_BACKEND']].SIGNATURE
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# API密钥存储
+# API密钥存储：使用统计在内存中累计，后台定期原子写回
 API_KEYS_FILE = 'api_keys.json'
-api_keys_lock = Lock()
-
-def load_api_keys():
-    if os.path.exists(API_KEYS_FILE):
-        with open(API_KEYS_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+app.config['API_KEYS_FLUSH_INTERVAL'] = 5  # 使用统计写回间隔（秒）
+app.config['API_KEYS_DIRTY_THRESHOLD'] = 200  # 未写回修改达到该数量时立即写回
 
-def save_api_keys(api_keys):
-    with open(API_KEYS_FILE, 'w') as f:
-        json.dump(api_keys, f, indent=2)
-
-api_keys = load_api_keys()
+api_keys = ApiKeyStore(
+    API_KEYS_FILE,
+    flush_interval=app.config['API_KEYS_FLUSH_INTERVAL'],
+    dirty_threshold=app.config['API_KEYS_DIRTY_THRESHOLD'],
+)
 
 # 如果首次运行生成默认管理员密钥
-if not api_keys:
+if not len(api_keys):
     default_admin_key = secrets.token_urlsafe(32)
-    with api_keys_lock:
-        api_keys[default_admin_key] = {
-            'created_at': time.time(),
-            'is_admin': True,
-            'is_active': True,
-            'usage': {
-                'total_requests': 0,
-                'last_used': None,
-                'total_processing_time': 0
-            }
+    api_keys.add(default_admin_key, {
+        'created_at': time.time(),
+        'is_admin': True,
+        'is_active': True,
+        'usage': {
+            'total_requests': 0,
+            'last_used': None,
+            'total_processing_time': 0
         }
-        save_api_keys(api_keys)
+    })
     print(f"初始管理员API密钥已生成：{default_admin_key}")
     print("请立即保存此密钥，应用重启后将不再显示！")
 
-# 存储任务状态的字典
-tasks = {}
-tasks_lock = Lock()
-
-# 初始化模型
-print("Loading SenseVoice model...")
-model = AutoModel(
-    model="iic/SenseVoiceSmall",
-    trust_remote_code=True,
-    remote_code="./model.py",    
-    vad_model="fsmn-vad",
-    vad_kwargs={"max_single_segment_time": 30000},
-    device="cuda:7",
-)
-print("Model loaded successfully!")
+# 任务状态存储（默认内存，可切换为 SQLite 持久化）
+tasks = create_task_store(app.config['TASK_STORE'], app.config['TASK_DB_PATH'])
+# 任务状态变化时通知长轮询与 SSE 请求
+tasks_changed = threading.Condition()
+
+# 断点续传中的上传
+uploads = {}
+uploads_lock = Lock()
+
+# 识别结果缓存：相同音频内容、语言与模型参数直接返回已有结果
+result_cache = ResultCache(app.config['RESULT_CACHE_DIR'], app.config['RESULT_CACHE_MAX_BYTES'])
+
+def notify_task_changed():
+    with tasks_changed:
+        tasks_changed.notify_all()
+
+# 流式识别会话
+stream_sessions = {}
+stream_sessions_lock = Lock()
+
+# 初始化模型：线程模式在本进程加载，进程模式每个设备启动一个模型进程。
+# 加载与预热都在后台进行，HTTP 端口立即可用，就绪状态见 /ready
+server_started_at = time.time()
+if app.config['SERVING_MODE'] == 'process':
+    print(f"Starting model workers on {', '.join(app.config['MODEL_DEVICES'])} in background...")
+    model = ModelWorkerPool(
+        app.config['MODEL_BACKEND'],
+        app.config['MODEL_DEVICES'],
+        threads_per_worker=app.config['THREADS_PER_WORKER'],
+        heartbeat_timeout=app.config['WORKER_HEARTBEAT_TIMEOUT'],
+        load_timeout=app.config['MODEL_LOAD_TIMEOUT'],
+        warm_up_lengths=app.config['WARM_UP_SECONDS'],
+    )
+else:
+    print("Loading SenseVoice model in background...")
+    model = InProcessModel(
+        app.config['MODEL_BACKEND'],
+        app.config['MODEL_DEVICES'][0],
+        load_timeout=app.config['MODEL_LOAD_TIMEOUT'],
+        warm_up_lengths=app.config['WARM_UP_SECONDS'],
+    )
+model.start()
+
+def model_ready():
+    return model.ready_count() > 0
 
 # 身份验证装饰器
 def require_auth(f):
@@ -80,15 +156,12 @@ def require_auth(f):
         if not api_key:
             return jsonify({'error': '缺少API密钥'}), 401
 
-        with api_keys_lock:
-            key_info = api_keys.get(api_key)
-            if not key_info or not key_info.get('is_active', True):
-                return jsonify({'error': '无效或已禁用的API密钥'}), 401
+        key_info = api_keys.get(api_key)
+        if not key_info or not key_info.get('is_active', True):
+            return jsonify({'error': '无效或已禁用的API密钥'}), 401
 
-            # 更新使用统计
-            key_info['usage']['total_requests'] += 1
-            key_info['usage']['last_used'] = time.time()
-            save_api_keys(api_keys)
+        # 更新使用统计（仅内存，后台写回）
+        api_keys.record_request(key_info)
 
         request.key_info = key_info
         return f(*args, **kwargs)
@@ -101,81 +174,229 @@ def require_admin_auth(f):
         if not api_key:
             return jsonify({'error': '缺少API密钥'}), 401
 
-        with api_keys_lock:
-            key_info = api_keys.get(api_key)
-            if not key_info or not key_info.get('is_active', True):
-                return jsonify({'error': '无效或已禁用的API密钥'}), 401
+        key_info = api_keys.get(api_key)
+        if not key_info or not key_info.get('is_active', True):
+            return jsonify({'error': '无效或已禁用的API密钥'}), 401
 
-            if not key_info.get('is_admin', False):
-                return jsonify({'error': '需要管理员权限'}), 403
+        if not key_info.get('is_admin', False):
+            return jsonify({'error': '需要管理员权限'}), 403
 
-            # 更新使用统计
-            key_info['usage']['total_requests'] += 1
-            key_info['usage']['last_used'] = time.time()
-            save_api_keys(api_keys)
+        # 更新使用统计（仅内存，后台写回）
+        api_keys.record_request(key_info)
 
         request.key_info = key_info
         return f(*args, **kwargs)
     return decorated
 
+def finish_task(task_id, file_path, api_key, start_time, text=None, error=None, segments=None):
+    """记录任务结果、累计处理时间并清理临时文件"""
+    processing_time = time.time() - start_time
+    task = tasks.get(task_id)
+    if error is None:
+        fields = {'result': text}
+        if segments is not None:
+            fields['segments'] = segments
+        # 先写缓存再标记完成，客户端看到完成后立即重传同一文件也能命中
+        if task and task.get('cache_key'):
+            try:
+                result_cache.put(task['cache_key'], fields)
+            except OSError as e:
+                print(f"写入识别缓存失败: {e}")
+        tasks.update(task_id, status='completed', completed_at=time.time(), **fields)
+    else:
+        tasks.update(task_id, status='failed', error=str(error))
+    notify_task_changed()
+
+    # 更新处理时间（即使失败）
+    api_keys.record_processing_time(api_key, processing_time)
+
+    # 删除临时文件
+    if task and task.get('delete_after_processing', True):
+        try:
+            os.remove(file_path)
+        except:
+            pass
+    if os.path.exists(decoded_path(file_path)):
+        os.remove(decoded_path(file_path))
+
+def decoded_path(file_path):
+    return f"{file_path}.decoded.wav"
+
+def decode_upload(file_path, encoding):
+    """压缩上传（FLAC/Opus）用 ffmpeg 解码为 16kHz 单声道 WAV，其他格式原样交给模型"""
+    if encoding not in UPLOAD_ENCODINGS:
+        return file_path
+    if not extract_audio_from_video(file_path, decoded_path(file_path)):
+        raise RuntimeError('音频解码失败')
+    return decoded_path(file_path)
+
+def split_vad_segments(file_path):
+    """用 VAD 模型切分音频，返回 [(起始毫秒, 片段采样), ...]"""
+    return model.split_vad(file_path)
+
+def recognize_segment_batch(items):
+    """
+    微批处理函数：items 为 [(片段采样, 语言), ...]，
+    按语言分组后各用一次 SenseVoice 调用完成识别，按原顺序返回文本
+    """
+    return model.recognize_batch(items)
+
+def process_audio_batched(file_path, audio_path, task_id, language, api_key, start_time):
+    """
+    将 VAD 片段交给微批处理器，与其他任务的片段合并推理，
+    最后一个片段返回时按时间顺序拼接结果。
+    提交后即释放推理线程，后续任务的片段才能进入同一批次；等待合批结果的任务数达到
+    MAX_BATCHED_TASKS 时推理线程阻塞，队列随之积压并照常返回 429
+    """
+    segments = split_vad_segments(audio_path)
+    if not segments:
+        finish_task(task_id, file_path, api_key, start_time, text='')
+        return
+
+    batched_task_slots.acquire()
+    futures = [segment_batcher.submit_future((segment, language)) for _, segment in segments]
+    remaining = [len(futures)]
+    remaining_lock = Lock()
+
+    def on_segment_done(_):
+        with remaining_lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        batched_task_slots.release()
+        try:
+            text = ''.join(future.result() for future in futures)
+        except Exception as e:
+            finish_task(task_id, file_path, api_key, start_time, error=e)
+            return
+        finish_task(task_id, file_path, api_key, start_time, text=text)
+
+    for future in futures:
+        future.add_done_callback(on_segment_done)
+
+def group_spans(units, chunk_ms):
+    """按时间顺序把识别单元分组，每组覆盖不超过 chunk_ms 的音频，作为一个并行任务"""
+    chunks = []
+    for unit in units:
+        if chunks and unit[1] - chunks[-1][0][0] <= chunk_ms:
+            chunks[-1].append(unit)
+        else:
+            chunks.append([unit])
+    return chunks
+
+def process_audio_split(file_path, audio_path, task_id, language, api_key, start_time):
+    """
+    长音频：VAD 切分后按时间段分组，分发给多个模型并行识别，
+    再按时间顺序拼接文本，并在结果中附带每段的起止时间
+    """
+    if not is_pcm_wav(audio_path):
+        # 转为 16kHz WAV，各模型可以直接按帧读取自己负责的时间段
+        if not extract_audio_from_video(audio_path, decoded_path(file_path)):
+            raise RuntimeError('音频解码失败')
+        audio_path = decoded_path(file_path)
+
+    units = merge_vad_segments(model.vad_segments(audio_path))
+    chunks = group_spans(units, app.config['SPLIT_CHUNK_SECONDS'] * 1000)
+    futures = [split_executor.submit(model.recognize_span, audio_path, chunk, language) for chunk in chunks]
+    try:
+        texts = [text for future in futures for text in future.result()]
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+
+    segments = [{'start': beg, 'end': end, 'text': text} for (beg, end), text in zip(units, texts)]
+    finish_task(task_id, file_path, api_key, start_time, text=''.join(texts), segments=segments)
+
 def process_audio(file_path, task_id, language, api_key):
     """后台处理音频文件的函数"""
     start_time = time.time()
     try:
-        with tasks_lock:
-            tasks[task_id]['status'] = 'processing'
+        task = tasks.get(task_id)
+        if task is None:
+            return
+        is_final = task.get('is_final', False)
+        tasks.update(task_id, status='processing')
+        notify_task_changed()
+
+        audio_path = decode_upload(file_path, task.get('encoding'))
+
+        # 临时转写任务较短，走跨请求微批处理
+        if app.config['MICRO_BATCHING'] and not is_final:
+            process_audio_batched(file_path, audio_path, task_id, language, api_key, start_time)
+            return
+
+        # 长音频切分后并行识别，短音频整段识别
+        if is_final and app.config['SPLIT_LONG_AUDIO'] and \
+                (audio_duration(audio_path) or 0) > app.config['LONG_AUDIO_SECONDS']:
+            process_audio_split(file_path, audio_path, task_id, language, api_key, start_time)
+            return
 
         # 使用模型进行识别
-        res = model.generate(
-            input=file_path,
-            cache={},
-            language=language,
-            use_itn=True,
-            batch_size_s=60,
-            merge_vad=True,
-            merge_length_s=15,
-        )
-        
-        # 处理结果
-        text = rich_transcription_postprocess(res[0]["text"])
-        processing_time = time.time() - start_time
-
-        with tasks_lock:
-            tasks[task_id]['status'] = 'completed'
-            tasks[task_id]['result'] = text
-            tasks[task_id]['completed_at'] = time.time()
-
-        # 更新处理时间
-        with api_keys_lock:
-            if api_key in api_keys:
-                api_keys[api_key]['usage']['total_processing_time'] += processing_time
-                save_api_keys(api_keys)
-
-        # 删除临时文件
-        if tasks[task_id].get('delete_after_processing', True):
-            try:
-                os.remove(file_path)
-            except:
-                pass
+        text = model.generate(audio_path, language)
+        finish_task(task_id, file_path, api_key, start_time, text=text)
 
     except Exception as e:
-        processing_time = time.time() - start_time
-        with tasks_lock:
-            tasks[task_id]['status'] = 'failed'
-            tasks[task_id]['error'] = str(e)
-
-        # 更新处理时间（即使失败）
-        with api_keys_lock:
-            if api_key in api_keys:
-                api_keys[api_key]['usage']['total_processing_time'] += processing_time
-                save_api_keys(api_keys)
-
-        # 尝试删除临时文件
-        if tasks[task_id].get('delete_after_processing', True):
-            try:
-                os.remove(file_path)
-            except:
-                pass
+        finish_task(task_id, file_path, api_key, start_time, error=e)
+
+# 跨请求微批处理：在时间窗口内合并多个任务的 VAD 片段
+segment_batcher = MicroBatcher(
+    recognize_segment_batch,
+    max_batch_size=app.config['MAX_BATCH_SEGMENTS'],
+    max_wait=app.config['BATCH_WINDOW_MS'] / 1000,
+)
+segment_batcher.start()
+batched_task_slots = threading.BoundedSemaphore(app.config['MAX_BATCHED_TASKS'])
+
+# 长音频各时间段的并行识别线程，进程模式下由模型进程池分配到空闲进程
+split_executor = ThreadPoolExecutor(max_workers=app.config['SPLIT_PARALLELISM'], thread_name_prefix='split')
+
+# 推理调度：有界优先级队列 + 固定数量的推理线程，最终转写任务优先
+inference_pool = InferencePool(
+    process_audio,
+    num_workers=app.config['INFERENCE_WORKERS'],
+    max_queue_size=app.config['MAX_QUEUE_SIZE'],
+)
+inference_pool.start()
+
+def requeue_unfinished_tasks():
+    """重启后把持久化存储中未完成的任务重新加入推理队列"""
+    for task_id, task in tasks.unfinished():
+        if not os.path.exists(task['file_path']):
+            tasks.update(task_id, status='failed', error='上传文件已丢失')
+            continue
+        tasks.update(task_id, status='queued')
+        inference_pool.submit(
+            task_id,
+            (task['file_path'], task_id, task.get('language', 'auto'), task.get('api_key')),
+            is_final=task.get('is_final', False),
+            force=True
+        )
+
+requeue_unfinished_tasks()
+
+def queue_full_response(retry_after):
+    """队列已满时返回 429 并附带 Retry-After"""
+    response = jsonify({'error': '服务器繁忙，请稍后重试', 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def not_ready_response():
+    """模型尚未就绪时返回 503 并附带 Retry-After"""
+    response = jsonify({'error': '模型正在加载，请稍后重试', 'retry_after': 10})
+    response.status_code = 503
+    response.headers['Retry-After'] = '10'
+    return response
+
+def save_upload(file, file_path):
+    """边写入磁盘边计算内容哈希，返回 SHA-256 十六进制串"""
+    digest = hashlib.sha256()
+    with open(file_path, 'wb') as f:
+        for chunk in iter(lambda: file.stream.read(1024 * 1024), b''):
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
 
 @app.route('/recognize', methods=['POST'])
 @require_auth
@@ -190,59 +411,335 @@ def recognize_speech():
     
     language = request.form.get('language', 'auto')
     is_final = request.form.get('is_final', 'false').lower() == 'true'
+    encoding = request.form.get('encoding')
     api_key = request.headers.get('X-API-Key')
 
+    if encoding and encoding not in UPLOAD_ENCODINGS:
+        return jsonify({'error': f'不支持的上传编码: {encoding}'}), 400
+
     task_id = str(uuid.uuid4())
     filename = secure_filename(file.filename)
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{task_id}_{filename}")
-    file.save(file_path)
-
-    with tasks_lock:
-        tasks[task_id] = {
-            'status': 'queued',
-            'created_at': time.time(),
-            'file_path': file_path,
-            'is_final': is_final,
-            'delete_after_processing': not is_final,
-            'api_key': api_key
-        }
+    content_hash = save_upload(file, file_path)
+
+    return enqueue_task(task_id, file_path, content_hash, language, is_final, encoding, api_key)
 
-    # 启动处理线程
-    thread = threading.Thread(target=process_audio, args=(file_path, task_id, language, api_key))
-    thread.daemon = True
-    thread.start()
+def enqueue_task(task_id, file_path, content_hash, language, is_final, encoding, api_key):
+    """为已落盘的上传创建任务：命中缓存直接完成，否则加入推理队列"""
+    # 临时任务走微批处理，结果与完整识别略有不同，分开缓存
+    pipeline = 'batched' if app.config['MICRO_BATCHING'] and not is_final else 'full'
+    cache_key = ResultCache.make_key(content_hash, language, pipeline, MODEL_SIGNATURE)
+    task = {
+        'status': 'queued',
+        'created_at': time.time(),
+        'file_path': file_path,
+        'language': language,
+        'is_final': is_final,
+        'delete_after_processing': not is_final,
+        'api_key': api_key,
+        'encoding': encoding,
+        'cache_key': cache_key
+    }
+
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        task.update(cached, status='completed', completed_at=time.time(), cached=True)
+        tasks.create(task_id, task)
+        if task['delete_after_processing']:
+            try:
+                os.remove(file_path)
+            except:
+                pass
+        return jsonify({
+            'task_id': task_id,
+            'status': 'completed',
+            **cached,
+            'cached': True,
+            'message': '命中识别缓存'
+        })
+
+    if not model_ready() and not app.config['QUEUE_UNTIL_READY']:
+        try:
+            os.remove(file_path)
+        except:
+            pass
+        return not_ready_response()
+
+    tasks.create(task_id, task)
+
+    # 加入推理队列（模型就绪前任务在队列中等待）
+    try:
+        inference_pool.submit(task_id, (file_path, task_id, language, api_key), is_final=is_final)
+    except QueueFullError as e:
+        tasks.delete(task_id)
+        try:
+            os.remove(file_path)
+        except:
+            pass
+        return queue_full_response(e.retry_after)
 
     return jsonify({
         'task_id': task_id,
         'status': 'queued',
+        'queue_position': inference_pool.position(task_id),
         'message': '文件已上传，正在处理中...'
     })
 
-@app.route('/status/<task_id>', methods=['GET'])
+@app.route('/upload/initiate', methods=['POST'])
 @require_auth
-def check_status(task_id):
-    """检查任务状态"""
-    with tasks_lock:
-        task = tasks.get(task_id)
-    
-    if not task:
-        return jsonify({'error': '任务不存在'}), 404
-    
+def initiate_upload():
+    """开始断点续传上传，预分配文件并返回 upload_id 与分块大小"""
+    data = request.get_json(silent=True) or {}
+    size = data.get('size')
+    encoding = data.get('encoding')
+    if not isinstance(size, int) or size < 0:
+        return jsonify({'error': '缺少文件大小'}), 400
+    if size > app.config['MAX_UPLOAD_SIZE']:
+        return jsonify({'error': '文件过大'}), 413
+    if encoding and encoding not in UPLOAD_ENCODINGS:
+        return jsonify({'error': f'不支持的上传编码: {encoding}'}), 400
+    chunk_size = data.get('chunk_size')
+    if chunk_size is None:
+        chunk_size = app.config['UPLOAD_CHUNK_SIZE']
+    if not isinstance(chunk_size, int) or isinstance(chunk_size, bool) or chunk_size <= 0:
+        return jsonify({'error': '分块大小必须是正整数'}), 400
+    if chunk_size > app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({'error': f"分块大小不能超过 {app.config['MAX_CONTENT_LENGTH']} 字节"}), 400
+    # 过小的分块会产生大量请求，按下限放大
+    chunk_size = max(chunk_size, 64 * 1024)
+
+    upload_id = str(uuid.uuid4())
+    filename = secure_filename(data.get('filename', '')) or 'audio'
+    upload = ResumableUpload(
+        upload_id,
+        os.path.join(app.config['UPLOAD_FOLDER'], f"{upload_id}_{filename}"),
+        size,
+        chunk_size,
+        language=data.get('language', 'auto'),
+        is_final=bool(data.get('is_final', False)),
+        encoding=encoding,
+        api_key=request.headers.get('X-API-Key'),
+    )
+    with uploads_lock:
+        uploads[upload_id] = upload
+
+    return jsonify(upload.status())
+
+def get_upload(upload_id):
+    with uploads_lock:
+        upload = uploads.get(upload_id)
+    if upload and upload.meta['api_key'] != request.headers.get('X-API-Key'):
+        return None
+    return upload
+
+@app.route('/upload/<upload_id>', methods=['PUT'])
+@require_auth
+def put_upload_chunk(upload_id):
+    """写入一个分块：?offset=字节偏移，X-Chunk-SHA256 头为该块校验和"""
+    upload = get_upload(upload_id)
+    if not upload:
+        return jsonify({'error': '上传不存在'}), 404
+
+    try:
+        upload.write_chunk(request.args.get('offset', type=int, default=-1), request.stream,
+                           request.headers.get('X-Chunk-SHA256'))
+    except ChunkError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(upload.status())
+
+@app.route('/upload/<upload_id>', methods=['GET'])
+@require_auth
+def upload_status(upload_id):
+    """查询已确认的分块，客户端据此续传"""
+    upload = get_upload(upload_id)
+    if not upload:
+        return jsonify({'error': '上传不存在'}), 404
+
+    return jsonify(upload.status())
+
+@app.route('/upload/<upload_id>/complete', methods=['POST'])
+@require_auth
+def complete_upload(upload_id):
+    """所有分块到齐后校验整体哈希并创建识别任务"""
+    upload = get_upload(upload_id)
+    if not upload:
+        return jsonify({'error': '上传不存在'}), 404
+
+    try:
+        content_hash = upload.finalize()
+    except ChunkError as e:
+        return jsonify(dict(upload.status(), error=str(e))), 409
+
+    with uploads_lock:
+        uploads.pop(upload_id, None)
+
+    expected_hash = (request.get_json(silent=True) or {}).get('sha256')
+    if expected_hash and expected_hash.lower() != content_hash:
+        os.remove(upload.file_path)
+        return jsonify({'error': '文件校验和不匹配，请重新上传'}), 400
+
+    meta = upload.meta
+    return enqueue_task(str(uuid.uuid4()), upload.file_path, content_hash,
+                        meta['language'], meta['is_final'], meta['encoding'], meta['api_key'])
+
+def task_status(task_id, task):
+    """构造任务状态响应"""
     response = {
         'task_id': task_id,
         'status': task['status'],
         'created_at': task['created_at'],
         'is_final': task.get('is_final', False)
     }
-    
+
+    if task['status'] == 'queued':
+        response['queue_position'] = inference_pool.position(task_id)
+
     if task['status'] == 'completed':
         response['result'] = task['result']
         response['completed_at'] = task.get('completed_at')
+        if task.get('segments') is not None:
+            response['segments'] = task['segments']
     
     if task['status'] == 'failed':
         response['error'] = task.get('error', '未知错误')
-    
-    return jsonify(response)
+
+    return response
+
+def wait_for_status_change(task_id, status, timeout):
+    """等待任务状态离开 status，返回最新任务（不存在则为 None）"""
+    latest = {}
+
+    def changed():
+        latest['task'] = tasks.get(task_id)
+        return latest['task'] is None or latest['task']['status'] != status
+
+    with tasks_changed:
+        tasks_changed.wait_for(changed, timeout=timeout)
+    return latest['task']
+
+@app.route('/status/<task_id>', methods=['GET'])
+@require_auth
+def check_status(task_id):
+    """检查任务状态，带 ?wait=秒数 时长轮询直到状态变化或超时"""
+    wait = min(request.args.get('wait', 0, type=float), app.config['MAX_STATUS_WAIT'])
+
+    task = tasks.get(task_id)
+    if task and wait > 0 and task['status'] in ['queued', 'processing']:
+        task = wait_for_status_change(task_id, task['status'], wait)
+
+    if not task:
+        return jsonify({'error': '任务不存在'}), 404
+
+    return jsonify(task_status(task_id, task))
+
+@app.route('/status/<task_id>/events', methods=['GET'])
+@require_auth
+def status_events(task_id):
+    """以 Server-Sent Events 推送任务状态，任务结束后关闭连接"""
+    if tasks.get(task_id) is None:
+        return jsonify({'error': '任务不存在'}), 404
+
+    def generate():
+        last_status = None
+        last_response = None
+        while True:
+            task = wait_for_status_change(task_id, last_status, app.config['SSE_HEARTBEAT'])
+            response = task_status(task_id, task) if task else None
+
+            if response is None:
+                yield f"event: error\ndata: {json.dumps({'error': '任务不存在'})}\n\n"
+                return
+
+            if response != last_response:
+                yield f"data: {json.dumps(response)}\n\n"
+                last_status = response['status']
+                last_response = response
+            else:
+                yield ": keepalive\n\n"
+
+            if response['status'] in ['completed', 'failed']:
+                return
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def stream_vad(session_id, samples, is_final):
+    """流式 VAD，返回本块检测到的端点。VAD 状态按会话保存在模型一侧（进程模式下固定在同一模型进程）"""
+    return model.stream_vad(session_id, samples, is_final, app.config['STREAM_VAD_CHUNK_MS'])
+
+def stream_recognize(samples, language, callback):
+    """流式片段与临时任务共用微批处理器"""
+    segment_batcher.submit((samples, language), callback)
+
+def get_stream_session(session_id):
+    with stream_sessions_lock:
+        session = stream_sessions.get(session_id)
+    if session and session.api_key != request.headers.get('X-API-Key'):
+        return None
+    return session
+
+@app.route('/stream/open', methods=['POST'])
+@require_auth
+def open_stream():
+    """创建流式识别会话"""
+    if not model_ready():
+        return not_ready_response()
+    data = request.get_json(silent=True) or {}
+    session_id = str(uuid.uuid4())
+    session = StreamSession(
+        session_id,
+        data.get('language', 'auto'),
+        functools.partial(stream_vad, session_id),
+        stream_recognize,
+        partial_interval_ms=app.config['STREAM_PARTIAL_INTERVAL_MS'],
+    )
+    session.api_key = request.headers.get('X-API-Key')
+    with stream_sessions_lock:
+        stream_sessions[session_id] = session
+
+    return jsonify({'session_id': session_id, 'sample_rate': session.sample_rate, 'format': 'pcm_s16le'})
+
+@app.route('/stream/<session_id>/chunk', methods=['POST'])
+@require_auth
+def push_stream_chunk(session_id):
+    """上传一段 PCM（请求体为原始 16kHz 单声道 int16），返回当前识别进度"""
+    session = get_stream_session(session_id)
+    if not session:
+        return jsonify({'error': '会话不存在'}), 404
+
+    pcm = request.get_data()
+    if len(pcm) % 2:
+        return jsonify({'error': '请求体必须是 int16 PCM，长度应为偶数字节'}), 400
+
+    is_final = request.args.get('is_final', 'false').lower() == 'true'
+    try:
+        return jsonify(session.feed(pcm, is_final=is_final))
+    except SessionClosedError as e:
+        return jsonify({'error': str(e)}), 409
+
+@app.route('/stream/<session_id>/close', methods=['POST'])
+@require_auth
+def close_stream(session_id):
+    """结束会话，剩余语音段会被定稿"""
+    session = get_stream_session(session_id)
+    if not session:
+        return jsonify({'error': '会话不存在'}), 404
+
+    try:
+        return jsonify(session.feed(b'', is_final=True))
+    except SessionClosedError:
+        return jsonify(session.snapshot())
+
+@app.route('/stream/<session_id>', methods=['GET'])
+@require_auth
+def stream_status(session_id):
+    """查询会话当前的临时与定稿片段"""
+    session = get_stream_session(session_id)
+    if not session:
+        return jsonify({'error': '会话不存在'}), 404
+
+    return jsonify(session.snapshot())
 
 @app.route('/admin/create_key', methods=['POST'])
 @require_admin_auth
@@ -251,27 +748,24 @@ def create_api_key():
     data = request.json
     is_admin = data.get('is_admin', False)
     
-    new_key = secrets.token_urlsafe(32)
-    with api_keys_lock:
-        while new_key in api_keys:
-            new_key = secrets.token_urlsafe(32)
-        
-        api_keys[new_key] = {
-            'created_at': time.time(),
-            'is_admin': is_admin,
-            'is_active': True,
-            'usage': {
-                'total_requests': 0,
-                'last_used': None,
-                'total_processing_time': 0
-            }
+    key_info = {
+        'created_at': time.time(),
+        'is_admin': is_admin,
+        'is_active': True,
+        'usage': {
+            'total_requests': 0,
+            'last_used': None,
+            'total_processing_time': 0
         }
-        save_api_keys(api_keys)
+    }
+    new_key = secrets.token_urlsafe(32)
+    while not api_keys.add(new_key, key_info):
+        new_key = secrets.token_urlsafe(32)
     
     return jsonify({
         'api_key': new_key,
         'is_admin': is_admin,
-        'created_at': api_keys[new_key]['created_at']
+        'created_at': key_info['created_at']
     })
 
 @app.route('/admin/keys', methods=['GET'])
@@ -279,15 +773,14 @@ def create_api_key():
 def list_api_keys():
     """列出所有API密钥（脱敏）"""
     keys_info = []
-    with api_keys_lock:
-        for key, info in api_keys.items():
-            keys_info.append({
-                'prefix': f"{key[:5]}...{key[-5:]}",
-                'created_at': info['created_at'],
-                'is_admin': info['is_admin'],
-                'is_active': info['is_active'],
-                'usage': info['usage']
-            })
+    for key, info in api_keys.items():
+        keys_info.append({
+            'prefix': f"{key[:5]}...{key[-5:]}",
+            'created_at': info['created_at'],
+            'is_admin': info['is_admin'],
+            'is_active': info['is_active'],
+            'usage': info['usage']
+        })
     return jsonify({'keys': keys_info})
 
 @app.route('/admin/toggle_key', methods=['POST'])
@@ -298,40 +791,73 @@ def toggle_api_key():
     target_key = data.get('api_key')
     new_status = data.get('active', True)
 
-    with api_keys_lock:
-        if target_key not in api_keys:
-            return jsonify({'error': '密钥不存在'}), 404
-        
-        api_keys[target_key]['is_active'] = new_status
-        save_api_keys(api_keys)
+    if not api_keys.set_active(target_key, new_status):
+        return jsonify({'error': '密钥不存在'}), 404
     
     return jsonify({'message': f'密钥状态已更新为{"启用" if new_status else "禁用"}'})
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """健康检查"""
+    """存活检查：进程能响应即返回 200，模型是否可用见 ready 字段或 /ready"""
     return jsonify({
         'status': 'healthy',
+        'ready': model_ready(),
+        'uptime': round(time.time() - server_started_at, 1),
         'model': 'SenseVoiceSmall',
+        'model_backend': app.config['MODEL_BACKEND'],
+        'upload_encodings': list(UPLOAD_ENCODINGS),
+        'resumable_upload': True,
+        'upload_chunk_size': app.config['UPLOAD_CHUNK_SIZE'],
+        'queue': inference_pool.stats(),
+        'batching': segment_batcher.stats(),
+        'tasks': tasks.count_by_status(),
+        'result_cache': result_cache.stats(),
+        'serving_mode': app.config['SERVING_MODE'],
+        'model_workers': model.stats(),
         'timestamp': time.time()
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """
+    就绪检查：至少一个模型已加载并完成预热时返回 200，否则返回 503。
+    所有设备都已放弃重启时附带最近一次加载错误
+    """
+    ready = model_ready()
+    workers = model.stats()
+    body = {
+        'ready': ready,
+        'uptime': round(time.time() - server_started_at, 1),
+        'queue': inference_pool.stats(),
+        'model_workers': workers,
+    }
+    if not ready and all(worker['dead'] for worker in workers):
+        body['error'] = '模型无法加载'
+        body['load_error'] = next((worker['load_error'] for worker in workers if worker['load_error']), None)
+    return jsonify(body), 200 if ready else 503
+
 def cleanup_tasks():
     """定期清理旧任务"""
     while True:
         current_time = time.time()
-        to_delete = []
-        
-        with tasks_lock:
-            for task_id, task in tasks.items():
-                # 普通任务保留30分钟，最终转写任务保留24小时
-                retention = 1800 if not task.get('is_final') else 86400
-                if (current_time - task['created_at'] > retention) and \
-                   (task['status'] in ['completed', 'failed']):
-                    to_delete.append(task_id)
-            
-            for task_id in to_delete:
-                del tasks[task_id]
+
+        # 普通任务保留30分钟，最终转写任务保留24小时
+        tasks.delete_finished_before(current_time - 1800, is_final=False)
+        tasks.delete_finished_before(current_time - 86400, is_final=True)
+
+        # 清理长时间未完成的断点续传上传
+        with uploads_lock:
+            stale = [upload_id for upload_id, upload in uploads.items()
+                     if current_time - upload.last_active > app.config['UPLOAD_IDLE_TIMEOUT']]
+            for upload_id in stale:
+                uploads.pop(upload_id).discard()
+
+        # 清理空闲的流式会话
+        with stream_sessions_lock:
+            for session_id in [sid for sid, session in stream_sessions.items()
+                               if current_time - session.last_active > app.config['STREAM_IDLE_TIMEOUT']]:
+                del stream_sessions[session_id]
+                model.release_stream(session_id)
         
         time.sleep(600)
 
@@ -339,5 +865,8 @@ if __name__ == '__main__':
     cleanup_thread = threading.Thread(target=cleanup_tasks)
     cleanup_thread.daemon = True
     cleanup_thread.start()
+
+    # SIGTERM 时正常退出，确保 atexit 中写回使用统计
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     
     app.run(host='0.0.0.0', port=14612, debug=False, threaded=True)
\ No newline at end of file
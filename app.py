@@ -12,6 +12,7 @@ from PySide6.QtGui import QTextCursor
 from audio_transcription import TranscriptionManager
 from summarize import SummarizationWorker
 from util.Instructions import *
+from util.deepseek_v3_tokenizer.deepseek_tokenizer import get_tokenizer_service
 
 from PySide6.QtCore import QThread, Signal
 
@@ -34,6 +35,18 @@ class AudioExtractionWorker(QThread):
             self.status_bar.showMessage("Audio extraction failed")
         self.extraction_finished.emit(success, self.audio_output_path)
 
+class TranscriptionWaitWorker(QThread):
+    status_changed = Signal(dict)  # 任务状态变化（含最终结果）
+
+    def __init__(self, transcription_manager):
+        super().__init__()
+        self.transcription_manager = transcription_manager
+
+    def run(self):
+        # 服务器推送状态变化，无需定时轮询
+        status_info = self.transcription_manager.wait_for_transcription(self.status_changed.emit)
+        self.status_changed.emit(status_info)
+
 class AudioTranscriptionApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -61,15 +74,16 @@ class AudioTranscriptionApp(QMainWindow):
 
         # Initialize timer for recording chunks
         self.record_timer = QTimer(self)
-        self.record_timer.timeout.connect(self.record_audio_chunk)
+        self.record_timer.timeout.connect(self.update_live_transcription)
 
-        # Initialize timer for status checking
-        self.status_timer = QTimer(self)
-        self.status_timer.timeout.connect(self.check_transcription_status)
+        # Worker waiting for server-pushed status changes
+        self.status_worker = None
 
         # Recording state
         self.recording = False
         self.current_audio_file: Optional[str] = None
+        self.source_file: Optional[str] = None
+        self.summary_instruction = ""
         self.transcription_in_progress = False
         self.elapsed_time = 0
         self.recording_timer = QTimer(self)
@@ -77,6 +91,10 @@ class AudioTranscriptionApp(QMainWindow):
 
         self.summarization_worker = None  # 初始化 summarization_worker
 
+        # 后台加载 tokenizer，总结分块与 token 数显示不再阻塞界面
+        self.tokenizer_service = get_tokenizer_service()
+        self.tokenizer_service.preload()
+
         # 创建QSettings，配置文件是tmp/.temp
         self.setting = QSettings('tmp/.temp', QSettings.IniFormat) 
 		
@@ -201,6 +219,11 @@ class AudioTranscriptionApp(QMainWindow):
         open_file_button.clicked.connect(self.open_audio_file)
         buttons_layout.addWidget(open_file_button)
 
+        # Live transcription while recording
+        self.live_checkbox = QCheckBox("Live transcription")
+        self.live_checkbox.setToolTip("Stream audio to the server while recording and show partial results")
+        buttons_layout.addWidget(self.live_checkbox)
+
         recording_layout.addLayout(buttons_layout)
 
         # Recording time display
@@ -374,8 +397,13 @@ class AudioTranscriptionApp(QMainWindow):
         if not self.recording:
             # Start recording
             self.recording = True
-            self.transcription_manager.start_recording()
-            self.record_timer.start(100)  # Record chunks every 100ms
+            if self.live_checkbox.isChecked():
+                self.transcription_text.clear()
+                self.summary_text.clear()
+            self.transcription_manager.start_recording(
+                self.live_checkbox.isChecked(), self.language_combo.currentData()
+            )
+            self.record_timer.start(250)  # Refresh live text; capture runs on its own thread
             self.record_button.setText("Stop Recording")
             self.statusBar().showMessage("Recording...")
 
@@ -392,7 +420,17 @@ class AudioTranscriptionApp(QMainWindow):
             self.current_audio_file = self.transcription_manager.stop_recording()
             self.record_button.setText("Start Recording")
 
-            if self.current_audio_file:
+            capture = self.transcription_manager.capture_stats()
+            if capture["overflows"] or capture["dropped_chunks"]:
+                print(f"Audio capture lost data: {capture}")
+
+            if self.transcription_manager.stream_session_id:
+                # Live session already has most of the text, wait for the last segments
+                self.progress_bar.setVisible(True)
+                self.transcription_in_progress = True
+                self.statusBar().showMessage("Finalizing live transcription...")
+                self.start_status_worker()
+            elif self.current_audio_file:
                 # Start transcription process
                 self.transcribe_audio()
 
@@ -404,10 +442,13 @@ class AudioTranscriptionApp(QMainWindow):
         seconds = self.elapsed_time % 60
         self.time_label.setText(f"{hours:02d}:{minutes:02d}:{seconds:02d}")
 
-    def record_audio_chunk(self):
-        """Record a chunk of audio data."""
+    def update_live_transcription(self):
+        """Show the latest live transcription text while recording."""
         if self.transcription_manager and self.recording:
-            self.transcription_manager.record_chunk()
+            if self.transcription_manager.stream_session_id:
+                live_text = self.transcription_manager.get_stream_text()
+                if live_text != self.transcription_text.toPlainText():
+                    self.transcription_text.setPlainText(live_text)
 
     def open_audio_file(self):
         """Open an existing audio file for transcription."""
@@ -435,6 +476,17 @@ class AudioTranscriptionApp(QMainWindow):
         self.progress_bar.setVisible(True)
         self.transcription_in_progress = True
 
+        # Previously processed files are served from the local cache, no extraction or upload
+        self.source_file = self.current_audio_file
+        cached_transcript = self.transcription_manager.lookup_cached(
+            self.source_file, self.language_combo.currentData()
+        )
+        if cached_transcript is not None:
+            self.on_transcription_status({"status": "completed", "result": cached_transcript})
+            if not self.summarize_checkbox.isChecked():
+                self.statusBar().showMessage("Loaded cached transcript")
+            return
+
         if self.current_audio_file[-4:] in ['.mp4', '.avi', '.mov', '.mkv']:
             # Extract audio from video in a separate thread
             self.audio_extraction_worker = AudioExtractionWorker(self.transcription_manager, self.current_audio_file, self.statusBar())
@@ -457,27 +509,33 @@ class AudioTranscriptionApp(QMainWindow):
         """Start the transcription process."""
         self.statusBar().showMessage("Transcribing audio...")
         success = self.transcription_manager.submit_for_transcription(
-            self.current_audio_file, self.language_combo.currentData(), True
+            self.current_audio_file, self.language_combo.currentData(), True,
+            source_path=self.source_file, use_cache=False
         )
 
         if success:
-            self.status_timer.start(2000)  # Check every 2 seconds
+            self.start_status_worker()
         else:
             self.progress_bar.setVisible(False)
             self.transcription_in_progress = False
             QMessageBox.warning(self, "Transcription Error", "Failed to submit audio for transcription.")
 
-    def check_transcription_status(self):
-        """Check the status of the current transcription task."""
+    def start_status_worker(self):
+        """Wait for the current transcription task in a background thread."""
+        self.status_worker = TranscriptionWaitWorker(self.transcription_manager)
+        self.status_worker.status_changed.connect(self.on_transcription_status)
+        self.status_worker.finished.connect(self.status_worker.deleteLater)
+        self.status_worker.start()
+
+    @Slot(dict)
+    def on_transcription_status(self, status_info):
+        """Handle a status change of the current transcription task."""
         if not self.transcription_manager or not self.transcription_in_progress:
             return
 
-        status_info = self.transcription_manager.check_transcription_status()
-
         if status_info["status"] == "completed":
             # Transcription is complete
             self.transcription_in_progress = False
-            self.status_timer.stop()
             self.progress_bar.setVisible(False)
 
             # Display transcript
@@ -492,12 +550,11 @@ class AudioTranscriptionApp(QMainWindow):
             else:
                 self.save_summary_button.setEnabled(False)  # Disable summary save if no summary
 
-        elif status_info["status"] == "failed":
+        elif status_info["status"] in ["failed", "error"]:
             # Transcription failed
             self.transcription_in_progress = False
-            self.status_timer.stop()
             self.progress_bar.setVisible(False)
-            error_message = status_info.get("error", "Transcription failed")
+            error_message = status_info.get("error", status_info.get("message", "Transcription failed"))
             self.statusBar().showMessage("Transcription failed", 5000)
             QMessageBox.critical(self, "Transcription Failed", error_message)
 
@@ -526,7 +583,10 @@ class AudioTranscriptionApp(QMainWindow):
             QMessageBox.warning(self, "Configuration Error", "LLM API Key not configured.")
             return
 
-        self.statusBar().showMessage("Summarizing transcript...")
+        # tokenizer 未加载完成时显示近似值
+        token_count = self.tokenizer_service.count(transcript)
+        approx = "" if self.tokenizer_service.ready.is_set() and not self.tokenizer_service.load_error else "~"
+        self.statusBar().showMessage(f"Summarizing transcript ({approx}{token_count} tokens)...")
         self.summary_text.clear()  # 清空 Summary TextEdit
         self.progress_bar.setVisible(True)  # 显示进度条
         self.progress_bar.setRange(0, 0)  # 设置为不确定进度条
@@ -537,6 +597,18 @@ class AudioTranscriptionApp(QMainWindow):
         # 输出当前提示词
         print(instruction)
         # return
+        self.summary_instruction = instruction
+
+        # 同一文件、同一提示词已有总结时直接使用缓存
+        cached_summary = self.transcription_manager.get_cached_summary(instruction)
+        if cached_summary is not None:
+            self.summary_text.setMarkdown(cached_summary)
+            self.progress_bar.setVisible(False)
+            self.statusBar().showMessage("Loaded cached summary")
+            self.save_summary_button.setEnabled(True)
+            self.open_summary_button.setEnabled(True)
+            self.copy_summary_button.setEnabled(True)
+            return
 
         # 创建 SummarizationWorker 实例，如果之前有worker在运行，先停止并清理
         if self.summarization_worker and self.summarization_worker.isRunning():
@@ -549,6 +621,7 @@ class AudioTranscriptionApp(QMainWindow):
         self.summarization_worker.summary_chunk_ready.connect(self.append_summary_text)
         self.summarization_worker.summary_finished.connect(self.on_summary_finished)
         self.summarization_worker.summary_error.connect(self.on_summary_error)
+        self.summarization_worker.summary_progress.connect(self.on_summary_progress)
 
         self.summarization_worker.start()  # 启动工作线程
         self.save_summary_button.setEnabled(False)  # 禁用保存摘要按钮，直到完成
@@ -588,9 +661,18 @@ class AudioTranscriptionApp(QMainWindow):
         self.summary_text.insertPlainText(text_chunk)  # 追加文本块
 
 
-    @Slot()
-    def on_summary_finished(self):
-        """槽函数，当总结任务完成时调用."""
+    @Slot(int, int)
+    def on_summary_progress(self, done, total):
+        """槽函数，长文本分块总结时显示已完成的块数."""
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        self.statusBar().showMessage(f"Summarizing transcript... ({done}/{total} parts)")
+        if done == total:
+            self.progress_bar.setRange(0, 0)  # 归并阶段进度未知
+
+    @Slot(str)
+    def on_summary_finished(self, summary):
+        """槽函数，当总结任务完成时调用，只缓存本次任务成功生成的完整总结."""
         self.progress_bar.setVisible(False)  # 隐藏进度条
         self.statusBar().showMessage("Summary completed")  # 更新状态栏
         self.save_summary_button.setEnabled(True)  # 启用保存摘要按钮
@@ -599,6 +681,8 @@ class AudioTranscriptionApp(QMainWindow):
         if self.summarization_worker:  # 清理worker
             self.summarization_worker.deleteLater()
             self.summarization_worker = None
+        if summary:
+            self.transcription_manager.cache_summary(self.summary_instruction, summary)
         self.summary_text.setMarkdown(self.summary_text.toPlainText())  # 设置Markdown格式
 
     @Slot(str)
@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+
+import aiohttp
+from openai import OpenAI
+
+from util.audio_codec import transcode_for_upload
+from util.mov_support import extract_audio_from_video
+from util.transcript_cache import TranscriptCache
+from util.map_reduce_summary import MapReduceSummarizer
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv"}
+
+
+@dataclass
+class BatchResult:
+    """Data class to hold the outcome of one file in a batch."""
+    file_path: str
+    status: str  # "completed" or "failed"
+    transcript: str = ""
+    summary: Optional[str] = None
+    error: str = ""
+    task_id: Optional[str] = None
+    cached: bool = False
+    elapsed: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)  # Seconds spent in each stage
+
+
+class AsyncTranscriptionManager:
+    """
+    Asyncio-native client for transcribing many recordings at once.
+
+    Each file passes through three stages with their own concurrency limits: audio
+    extraction/transcoding (`max_extractions`), upload and recognition (`max_concurrent`) and
+    summarization (`max_summaries`), so later files are prepared and earlier transcripts are
+    summarized while other files are still being recognized. Results are yielded in
+    completion order.
+
+    Usage:
+        async with AsyncTranscriptionManager(key, url, llm_key) as manager:
+            async for result in manager.process_files(paths):
+                ...
+    """
+
+    def __init__(self, speech_api_key: str, speech_api_url: str, llm_api_key: Optional[str] = None,
+                 max_concurrent: int = 4, max_summaries: int = 2, max_extractions: int = 2,
+                 upload_encoding: str = "flac",
+                 cache_dir: Optional[str] = None, llm_base_url: str = "https://api.deepseek.com",
+                 connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                 max_submit_attempts: int = 30, task_timeout: float = 6 * 3600):
+        self.speech_api_key = speech_api_key
+        self.speech_api_url = speech_api_url.rstrip("/")
+        self.max_concurrent = max_concurrent
+        self.upload_encoding = upload_encoding
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_submit_attempts = max_submit_attempts  # Uploads answered with 429/503 before giving up
+        self.task_timeout = task_timeout  # Seconds to wait for a submitted task to finish
+        self.llm_client = OpenAI(api_key=llm_api_key, base_url=llm_base_url) if llm_api_key else None
+        self.transcript_cache = TranscriptCache(cache_dir) if cache_dir else None
+
+        self._extract_slots = asyncio.Semaphore(max_extractions)
+        self._recognize_slots = asyncio.Semaphore(max_concurrent)
+        self._summary_slots = asyncio.Semaphore(max_summaries)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._server_info: Optional[Dict[str, Any]] = None
+
+    async def __aenter__(self) -> "AsyncTranscriptionManager":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """Create the shared keep-alive connection pool."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers={"X-API-Key": self.speech_api_key},
+                connector=aiohttp.TCPConnector(limit=self.max_concurrent * 2),
+                timeout=aiohttp.ClientTimeout(connect=self.connect_timeout, sock_read=self.read_timeout),
+            )
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def server_info(self) -> Dict[str, Any]:
+        """Fetch and cache the speech server's /health capabilities (empty dict if unreachable)."""
+        if self._server_info is None:
+            try:
+                async with self._session.get(f"{self.speech_api_url}/health") as response:
+                    self._server_info = await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"Error querying server capabilities: {e}")
+                return {}
+        return self._server_info
+
+    async def _prepare_upload(self, file_path: str) -> Tuple[str, Optional[str]]:
+        """
+        Extract audio from videos and transcode to the negotiated encoding, off the event loop.
+
+        Returns:
+            Tuple[str, Optional[str]]: Path to upload (a temp file unless unchanged) and its encoding
+        """
+        upload_path = file_path
+        if os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS:
+            fd, upload_path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            if not await asyncio.to_thread(extract_audio_from_video, file_path, upload_path):
+                raise RuntimeError("Failed to extract audio from video")
+
+        encoding = self.upload_encoding
+        if encoding == "wav" or encoding not in (await self.server_info()).get("upload_encodings", []):
+            return upload_path, None
+
+        try:
+            encoded_path = await asyncio.to_thread(transcode_for_upload, upload_path, encoding)
+        except Exception as e:
+            print(f"Transcoding failed, uploading original file: {e}")
+            return upload_path, None
+        if upload_path != file_path:
+            os.remove(upload_path)
+        return encoded_path, encoding
+
+    async def _post_recognize(self, file_path: str, upload_path: str, encoding: Optional[str],
+                              language: str) -> Dict[str, Any]:
+        """
+        Upload one file to /recognize, waiting out 429 backpressure and 503 while the model loads.
+
+        Returns:
+            Dict[str, Any]: The server's response (task_id, status and, on a cache hit, result)
+
+        Raises:
+            RuntimeError: If the server rejects the upload or is still busy after `max_submit_attempts`
+        """
+        for attempt in range(self.max_submit_attempts):
+            if attempt:
+                await asyncio.sleep(retry_after)
+            form = aiohttp.FormData()
+            form.add_field("language", language)
+            form.add_field("is_final", "true")
+            if encoding:
+                form.add_field("encoding", encoding)
+            with open(upload_path, "rb") as audio_file:
+                form.add_field("file", audio_file, filename=os.path.basename(upload_path))
+                async with self._session.post(f"{self.speech_api_url}/recognize", data=form) as response:
+                    if response.status in (429, 503):
+                        retry_after = float(response.headers.get("Retry-After", 1))
+                    elif response.status == 200:
+                        return await response.json()
+                    else:
+                        raise RuntimeError(f"Transcription request for {file_path} failed: {await response.text()}")
+        raise RuntimeError(f"Server still busy after {self.max_submit_attempts} attempts, giving up on {file_path}")
+
+    async def wait_for_task(self, task_id: str) -> Dict[str, Any]:
+        """
+        Wait for a task to finish via server-sent events, falling back to long-polling.
+
+        Returns:
+            Dict[str, Any]: The final status payload ("completed" or "failed")
+
+        Raises:
+            RuntimeError: If the task does not finish within `task_timeout` seconds
+        """
+        try:
+            return await asyncio.wait_for(self._wait_for_task(task_id), self.task_timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"Task {task_id} did not finish within {self.task_timeout:.0f}s") from None
+
+    async def _wait_for_task(self, task_id: str) -> Dict[str, Any]:
+        try:
+            async with self._session.get(f"{self.speech_api_url}/status/{task_id}/events",
+                                         headers={"Accept": "text/event-stream"}) as response:
+                if response.status == 200:
+                    async for line in response.content:
+                        line = line.decode().strip()
+                        if line.startswith("data:"):
+                            status = json.loads(line[5:])
+                            if status.get("status") in ["completed", "failed"]:
+                                return status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error reading status events, falling back to long-poll: {e}")
+
+        while True:
+            async with self._session.get(f"{self.speech_api_url}/status/{task_id}", params={"wait": 30},
+                                         timeout=aiohttp.ClientTimeout(sock_read=self.read_timeout + 30)) as response:
+                if response.status == 404:
+                    return {"status": "failed", "error": "Task not found"}
+                if response.status == 200:
+                    status = await response.json()
+                    if status.get("status") in ["completed", "failed"]:
+                        return status
+                elif response.status < 500:
+                    raise RuntimeError(f"Checking task {task_id} failed: {await response.text()}")
+                else:
+                    await asyncio.sleep(2)
+
+    async def transcribe(self, file_path: str, language: str = "auto",
+                         timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Prepare, submit and wait for one file, holding a slot of each stage only while in it.
+
+        Args:
+            timings (Dict[str, float]): If given, receives the seconds spent in 'extract' and 'transcribe'
+        """
+        timings = timings if timings is not None else {}
+        started = time.time()
+        async with self._extract_slots:
+            upload_path, encoding = await self._prepare_upload(file_path)
+        timings["extract"] = time.time() - started
+
+        try:
+            async with self._recognize_slots:
+                started = time.time()
+                task = await self._post_recognize(file_path, upload_path, encoding, language)
+                if task.get("status") not in ["completed", "failed"]:
+                    task = dict(await self.wait_for_task(task["task_id"]), task_id=task["task_id"])
+                timings["transcribe"] = time.time() - started
+                return task
+        finally:
+            if upload_path != file_path:
+                os.remove(upload_path)
+
+    async def summarize(self, text: str, instruction: str = "") -> str:
+        """Run the map-reduce summarizer in a worker thread, bounded by `max_summaries`."""
+        summarizer = MapReduceSummarizer(self.llm_client)
+        async with self._summary_slots:
+            return await asyncio.to_thread(lambda: "".join(summarizer.summarize(text, instruction)))
+
+    async def process_file(self, file_path: str, language: str = "auto", summarize: bool = True,
+                           instruction: str = "", transcript: Optional[str] = None) -> BatchResult:
+        """
+        Transcribe and optionally summarize one file. Errors are reported in the result.
+
+        Args:
+            transcript (Optional[str]): An existing transcript; recognition is skipped when given
+        """
+        started = time.time()
+        result = BatchResult(file_path=file_path, status="failed")
+        try:
+            cache_key = self.transcript_cache.key(file_path, language) if self.transcript_cache else None
+            if transcript is None and cache_key:
+                transcript = self.transcript_cache.get_transcript(cache_key)
+            if transcript is not None:
+                result.cached = True
+            else:
+                status = await self.transcribe(file_path, language, result.timings)
+                result.task_id = status.get("task_id")
+                if status.get("status") != "completed":
+                    result.error = status.get("error", "Unknown error")
+                    return result
+                transcript = status.get("result", "")
+                if cache_key:
+                    self.transcript_cache.put_transcript(cache_key, transcript, source=file_path)
+
+            result.transcript = transcript
+            result.status = "completed"
+            if summarize and transcript and self.llm_client:
+                result.summary = self.transcript_cache.get_summary(cache_key, instruction) if cache_key else None
+                if result.summary is None:
+                    summary_started = time.time()
+                    result.summary = await self.summarize(transcript, instruction)
+                    result.timings["summarize"] = time.time() - summary_started
+                    if cache_key:
+                        self.transcript_cache.put_summary(cache_key, instruction, result.summary)
+        except Exception as e:
+            result.status = "failed"
+            result.error = str(e)
+        finally:
+            result.elapsed = time.time() - started
+        return result
+
+    async def process_files(self, file_paths: List[str], language: str = "auto", summarize: bool = True,
+                            instruction: str = "") -> AsyncIterator[BatchResult]:
+        """
+        Process many files concurrently and yield each result as soon as it is ready.
+
+        Args:
+            file_paths (List[str]): Audio or video files
+            language (str): Language code or 'auto'
+            summarize (bool): Whether to summarize each transcript
+            instruction (str): Instruction for summarization
+
+        Yields:
+            BatchResult: One result per file, in completion order
+        """
+        await self.open()
+        pending = [asyncio.create_task(self.process_file(path, language, summarize, instruction))
+                   for path in file_paths]
+        try:
+            for finished in asyncio.as_completed(pending):
+                yield await finished
+        finally:
+            for task in pending:
+                task.cancel()
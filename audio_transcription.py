@@ -1,48 +1,166 @@
+import os
+import json
 import time
 import wave
+import queue
 import pyaudio
 import tempfile
+import hashlib
+import threading
 import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, List
+from dataclasses import dataclass, field
 from openai import OpenAI
 from util.mov_support import extract_audio_from_video
+from util.audio_codec import transcode_for_upload
+from util.transcript_cache import TranscriptCache
+from util.silence_trimmer import SilenceTrimmer
+from util.map_reduce_summary import MapReduceSummarizer
+from util.http_client import PooledSession
 
 
 class AudioRecorder:
     """
     Class for handling audio recording functionality.
+
+    Capture runs in PyAudio callback mode: the PortAudio thread only hands each buffer to a
+    queue, and a writer thread appends it to the WAV file (the header is patched when recording
+    stops) and to a bounded in-memory ring for live consumers. Callers never block on audio I/O,
+    and memory use does not grow with recording length.
+
+    The WAV file always holds the raw recording. With trim_silence enabled, long pauses are
+    compressed in what gets uploaded: the live consumer receives trimmed audio and a trimmed
+    copy of the file is written alongside (see upload_copy()); to_original_ms() maps times in
+    the trimmed audio back onto the recording.
     """
 
-    def __init__(self, channels=1, rate=16000, chunk=4096, format=pyaudio.paInt16):
+    def __init__(self, channels=1, rate=16000, chunk=4096, format=pyaudio.paInt16, ring_seconds=30,
+                 max_pending_chunks=256, trim_silence=True):
         self.channels = channels
         self.rate = rate
         self.chunk = chunk
         self.format = format
         self.p = None
         self.stream = None
-        self.frames = []
+        # Bounded ring of the most recent chunks
+        self.frames = deque(maxlen=max(1, ring_seconds * rate // chunk))
         self.is_recording = False
         self.temp_file = None
+        self._wav = None
+        self.trimmed_file: Optional[str] = None
+        self._trimmed_wav = None
+        self.frames_written = 0
+        self.trim_silence = trim_silence
+        self.trimmer: Optional[SilenceTrimmer] = None
+
+        # Buffers handed over by the PortAudio callback; SimpleQueue.put never blocks
+        self.max_pending_chunks = max_pending_chunks
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._on_chunk: Optional[Callable[[bytes], None]] = None
+
+        # Capture health counters
+        self.overflows = 0  # Input overflow reported by PortAudio (samples lost in the driver)
+        self.underruns = 0  # Input underflow reported by PortAudio
+        self.dropped_chunks = 0  # Chunks dropped because the writer thread fell behind
+
+    def start_recording(self, on_chunk: Optional[Callable[[bytes], None]] = None) -> None:
+        """
+        Start recording audio from microphone.
 
-    def start_recording(self) -> None:
-        """Start recording audio from microphone."""
+        Args:
+            on_chunk (Callable): Called from the writer thread with every captured PCM chunk
+        """
         self.p = pyaudio.PyAudio()
-        self.frames = []
+        self.frames.clear()
+        self.frames_written = 0
+        self.overflows = self.underruns = self.dropped_chunks = 0
+        self._on_chunk = on_chunk
+        # A fresh trimmer per recording, so its time map only covers this recording
+        self.trimmer = SilenceTrimmer(self.rate) if self.trim_silence and self.channels == 1 else None
+
+        # Create a unique temporary file and stream frames into it while recording
+        self.temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+        self.temp_file.close()
+        self._wav = self._open_wav(self.temp_file.name)
+
+        # The trimmed upload copy of the previous recording is no longer needed
+        if self.trimmed_file and os.path.exists(self.trimmed_file):
+            os.remove(self.trimmed_file)
+        self.trimmed_file = None
+        if self.trimmer:
+            self.trimmed_file = self.temp_file.name[:-4] + "_trimmed.wav"
+            self._trimmed_wav = self._open_wav(self.trimmed_file)
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
         self.stream = self.p.open(
             format=self.format,
             channels=self.channels,
             rate=self.rate,
             input=True,
-            frames_per_buffer=self.chunk
+            frames_per_buffer=self.chunk,
+            stream_callback=self._capture_callback
         )
         self.is_recording = True
 
+    def _open_wav(self, path: str) -> wave.Wave_write:
+        wav = wave.open(path, 'wb')
+        wav.setnchannels(self.channels)
+        wav.setsampwidth(pyaudio.get_sample_size(self.format))
+        wav.setframerate(self.rate)
+        return wav
+
+    def _capture_callback(self, in_data, frame_count, time_info, status):
+        """Runs on the PortAudio thread: count errors and hand the buffer over, nothing else."""
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        if status & pyaudio.paInputUnderflow:
+            self.underruns += 1
+
+        if self._pending.qsize() >= self.max_pending_chunks:
+            self.dropped_chunks += 1
+        else:
+            self._pending.put(in_data)
+        return None, pyaudio.paContinue
+
+    def _write_loop(self) -> None:
+        """Writer thread: append captured chunks to the WAV file, the live ring and the upload copy."""
+        while True:
+            data = self._pending.get()
+            if data is None:
+                if self.trimmer:
+                    self._write_upload_chunk(self.trimmer.flush())
+                break
+            self._write_chunk(data)
+            self._write_upload_chunk(self.trimmer.process(data) if self.trimmer else data)
+
+    def _write_chunk(self, data: bytes) -> None:
+        """Append raw audio to the recording and the live ring."""
+        self._wav.writeframesraw(data)
+        self.frames_written += len(data) // self._wav.getsampwidth() // self.channels
+        self.frames.append(data)
+
+    def _write_upload_chunk(self, data: bytes) -> None:
+        """Hand audio meant for upload (silence-trimmed when enabled) to the upload copy and live consumer."""
+        if not data:
+            return
+        if self._trimmed_wav:
+            self._trimmed_wav.writeframesraw(data)
+        if self._on_chunk:
+            try:
+                self._on_chunk(data)
+            except Exception as e:
+                print(f"Error in audio chunk consumer: {e}")
+
     def stop_recording(self) -> str:
         """
-        Stop recording audio and save to a temporary WAV file.
+        Stop recording audio and finish the temporary WAV file.
 
         Returns:
             str: Path to the saved temporary WAV file
@@ -58,25 +176,50 @@ class AudioRecorder:
         if self.p:
             self.p.terminate()
 
-        # Create a unique temporary file
-        self.temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
-        temp_filename = self.temp_file.name
-        self.temp_file.close()
-
-        # Save recorded audio to the temporary file
-        with wave.open(temp_filename, 'wb') as wf:
-            wf.setnchannels(self.channels)
-            wf.setsampwidth(self.p.get_sample_size(self.format))
-            wf.setframerate(self.rate)
-            wf.writeframes(b''.join(self.frames))
-
-        return temp_filename
+        # Drain the chunks still queued, then close the writer
+        self._pending.put(None)
+        self._writer.join()
+        self._writer = None
+
+        # Closing the wave writer patches the RIFF/data sizes in the header
+        self._wav.close()
+        self._wav = None
+        if self._trimmed_wav:
+            self._trimmed_wav.close()
+            self._trimmed_wav = None
+
+        return self.temp_file.name
+
+    def capture_stats(self) -> Dict[str, Any]:
+        """Return capture health counters for the current or last recording."""
+        stats = {
+            "seconds": round(self.frames_written / self.rate, 1),
+            "overflows": self.overflows,
+            "underruns": self.underruns,
+            "dropped_chunks": self.dropped_chunks,
+            "pending_chunks": self._pending.qsize()
+        }
+        if self.trimmer:
+            stats["silence_trimming"] = self.trimmer.stats()
+        return stats
+
+    def to_original_ms(self, ms: float) -> float:
+        """Map a time in the uploaded (silence-trimmed) audio to the recording timeline."""
+        return self.trimmer.to_original_ms(ms) if self.trimmer else ms
+
+    def upload_copy(self, file_path: str) -> str:
+        """
+        Return the file to upload for file_path: the silence-trimmed copy when file_path is
+        this recorder's last finished recording, otherwise file_path itself.
+        """
+        if self.trimmed_file and not self.is_recording and self.temp_file and \
+                file_path == self.temp_file.name and os.path.exists(self.trimmed_file):
+            return self.trimmed_file
+        return file_path
 
-    def record_chunk(self) -> None:
-        """Record a chunk of audio data."""
-        if self.is_recording and self.stream:
-            data = self.stream.read(self.chunk)
-            self.frames.append(data)
+    def recent_audio(self) -> bytes:
+        """Return the most recent audio kept in the in-memory ring."""
+        return b''.join(self.frames)
 
     def save_to_file(self, filepath: str) -> None:
         """
@@ -85,14 +228,13 @@ class AudioRecorder:
         Args:
             filepath (str): Path where to save the WAV file
         """
-        if not self.frames:
+        if not self.frames_written or self.is_recording:
             return
 
-        with wave.open(filepath, 'wb') as wf:
-            wf.setnchannels(self.channels)
-            wf.setsampwidth(self.p.get_sample_size(self.format))
-            wf.setframerate(self.rate)
-            wf.writeframes(b''.join(self.frames))
+        with wave.open(self.temp_file.name, 'rb') as src, wave.open(filepath, 'wb') as wf:
+            wf.setparams(src.getparams())
+            for _ in range(0, src.getnframes(), self.rate):
+                wf.writeframes(src.readframes(self.rate))
 
 
 @dataclass
@@ -106,6 +248,8 @@ class TranscriptionTask:
     status: str = "queued"
     result: str = ""
     error: str = ""
+    queue_position: Optional[int] = None
+    segments: List[Dict[str, Any]] = field(default_factory=list)
 
 
 class DeepSeekAPI:
@@ -113,12 +257,49 @@ class DeepSeekAPI:
     Class for handling DeepSeek API interactions for both speech recognition and LLM.
     """
 
-    def __init__(self, speech_api_key: str, speech_api_url: str, llm_api_key: str):
+    def __init__(self, speech_api_key: str, speech_api_url: str, llm_api_key: str,
+                 upload_encoding: str = "flac", pool_size: int = 8,
+                 connect_timeout: float = 5.0, read_timeout: float = 60.0):
         self.speech_api_key = speech_api_key
         self.speech_api_url = speech_api_url
         self.llm_api_key = llm_api_key
         self.llm_client = OpenAI(api_key=llm_api_key, base_url="https://api.deepseek.com")
         self.tasks: Dict[str, TranscriptionTask] = {}
+        # Keep-alive connection pool for the speech server; idempotent calls retry with jittered backoff
+        self.http = PooledSession(pool_size=pool_size, connect_timeout=connect_timeout, read_timeout=read_timeout)
+        # Compressed upload format ('flac', 'opus' or 'wav' to send files unchanged)
+        self.upload_encoding = upload_encoding
+        self._server_info: Optional[Dict[str, Any]] = None
+        # Files at least this large go through resumable chunked upload when the server supports it
+        self.resumable_threshold = 32 * 1024 * 1024
+        self.upload_workers = 4
+        self.chunk_retries = 3
+        # Upload content hash -> upload_id, so a retried upload resumes instead of restarting
+        self._pending_uploads: Dict[str, str] = {}
+
+    def server_info(self) -> Dict[str, Any]:
+        """Fetch and cache the speech server's /health capabilities (empty dict if unreachable)."""
+        if self._server_info is None:
+            try:
+                response = self.http.get(f"{self.speech_api_url}/health", timeout=(self.http.default_timeout[0], 10))
+                self._server_info = response.json()
+            except Exception as e:
+                print(f"Error querying server capabilities: {e}")
+                return {}
+        return self._server_info
+
+    def negotiate_upload_encoding(self) -> str:
+        """
+        Pick the upload encoding supported by both this client and the speech server.
+
+        Returns:
+            str: 'flac' or 'opus' if the server can decode it, otherwise 'wav' (send the file unchanged)
+        """
+        if self.upload_encoding == "wav":
+            return "wav"
+
+        server_encodings = self.server_info().get("upload_encodings", [])
+        return self.upload_encoding if self.upload_encoding in server_encodings else "wav"
 
     def transcribe_audio(self, file_path: str, language: str = "auto", is_final: bool = False) -> Optional[
         TranscriptionTask]:
@@ -133,17 +314,31 @@ class DeepSeekAPI:
         Returns:
             Optional[TranscriptionTask]: The created transcription task or None if failed
         """
+        upload_path = file_path
         try:
             # Prepare request
             url = f"{self.speech_api_url}/recognize"
             headers = {"X-API-Key": self.speech_api_key}
+            data = {"language": language, "is_final": str(is_final).lower()}
+
+            # Transcode to 16 kHz mono FLAC/Opus to cut upload size
+            encoding = self.negotiate_upload_encoding()
+            if encoding != "wav":
+                try:
+                    upload_path = transcode_for_upload(file_path, encoding)
+                    data["encoding"] = encoding
+                except Exception as e:
+                    print(f"Transcoding failed, uploading original file: {e}")
+
+            if (os.path.getsize(upload_path) >= self.resumable_threshold
+                    and self.server_info().get("resumable_upload")):
+                response = self.upload_resumable(upload_path, language, is_final, data.get("encoding"))
+            else:
+                with open(upload_path, "rb") as audio_file:
+                    files = {"file": (os.path.basename(upload_path), audio_file)}
 
-            with open(file_path, "rb") as audio_file:
-                files = {"file": audio_file}
-                data = {"language": language, "is_final": str(is_final).lower()}
-
-                # Send request
-                response = requests.post(url, headers=headers, files=files, data=data)
+                    # Send request
+                    response = self.http.post(url, headers=headers, files=files, data=data)
 
             if response.status_code == 200:
                 response_data = response.json()
@@ -155,7 +350,10 @@ class DeepSeekAPI:
                     file_path=file_path,
                     created_at=datetime.now().isoformat(),
                     language=language,
-                    is_final=is_final
+                    is_final=is_final,
+                    status=response_data.get("status", "queued"),
+                    result=response_data.get("result", ""),
+                    segments=response_data.get("segments", [])
                 )
                 self.tasks[task_id] = task
                 return task
@@ -167,12 +365,105 @@ class DeepSeekAPI:
             print(f"Error submitting transcription: {e}")
             return None
 
-    def check_transcription_status(self, task_id: str) -> Optional[TranscriptionTask]:
+        finally:
+            if upload_path != file_path:
+                os.remove(upload_path)
+
+    def latency_stats(self) -> Dict[str, Any]:
+        """Per-endpoint latency histograms of calls to the speech server."""
+        return self.http.latency_stats()
+
+    def upload_resumable(self, file_path: str, language: str = "auto", is_final: bool = False,
+                         encoding: Optional[str] = None) -> requests.Response:
+        """
+        Upload a large file in checksummed chunks, several in parallel.
+
+        If a previous attempt for the same content was interrupted, only the chunks the server
+        has not confirmed are sent again.
+
+        Returns:
+            requests.Response: The response of the final /complete call (same shape as /recognize)
+        """
+        headers = {"X-API-Key": self.speech_api_key}
+        size = os.path.getsize(file_path)
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        content_hash = digest.hexdigest()
+
+        status = None
+        upload_id = self._pending_uploads.get(content_hash)
+        if upload_id:
+            response = self.http.get(f"{self.speech_api_url}/upload/{upload_id}", headers=headers)
+            if response.status_code == 200:
+                status = response.json()
+
+        if status is None:
+            response = self.http.post(f"{self.speech_api_url}/upload/initiate", headers=headers, json={
+                "filename": os.path.basename(file_path),
+                "size": size,
+                "chunk_size": self.server_info().get("upload_chunk_size"),
+                "language": language,
+                "is_final": is_final,
+                "encoding": encoding,
+            })
+            response.raise_for_status()
+            status = response.json()
+            upload_id = status["upload_id"]
+            self._pending_uploads[content_hash] = upload_id
+
+        chunk_size = status["chunk_size"]
+
+        def send_chunk(index: int) -> None:
+            offset = index * chunk_size
+            with open(file_path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read(chunk_size)
+            chunk_headers = dict(headers, **{"X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()})
+            for attempt in range(self.chunk_retries):
+                try:
+                    response = self.http.put(f"{self.speech_api_url}/upload/{upload_id}",
+                                             params={"offset": offset}, headers=chunk_headers, data=chunk)
+                    if response.status_code == 200:
+                        return
+                    error = response.text
+                except requests.RequestException as e:
+                    error = str(e)
+                time.sleep(2 ** attempt)
+            raise RuntimeError(f"Chunk {index} failed after {self.chunk_retries} attempts: {error}")
+
+        with ThreadPoolExecutor(max_workers=self.upload_workers) as executor:
+            # list() re-raises the first chunk failure; the upload stays resumable
+            list(executor.map(send_chunk, status["missing_chunks"]))
+
+        response = self.http.post(f"{self.speech_api_url}/upload/{upload_id}/complete",
+                                  headers=headers, json={"sha256": content_hash})
+        if response.status_code != 409:
+            self._pending_uploads.pop(content_hash, None)
+        return response
+
+    def _update_task(self, task_id: str, status_data: Dict[str, Any]) -> TranscriptionTask:
+        """Apply a status payload from the server to the stored task."""
+        task = self.tasks[task_id]
+        task.status = status_data.get("status", "unknown")
+        task.queue_position = status_data.get("queue_position")
+
+        if task.status == "completed":
+            task.result = status_data.get("result", "")
+            task.segments = status_data.get("segments", [])
+        elif task.status == "failed":
+            task.error = status_data.get("error", "Unknown error")
+
+        return task
+
+    def check_transcription_status(self, task_id: str, wait: float = 0) -> Optional[TranscriptionTask]:
         """
         Check the status of a transcription task.
 
         Args:
             task_id (str): ID of the task to check
+            wait (float): Seconds the server may hold the request until the status changes (long-poll)
 
         Returns:
             Optional[TranscriptionTask]: Updated task info or None if failed
@@ -184,28 +475,160 @@ class DeepSeekAPI:
         try:
             url = f"{self.speech_api_url}/status/{task_id}"
             headers = {"X-API-Key": self.speech_api_key}
+            params = {"wait": wait} if wait else None
 
-            response = requests.get(url, headers=headers)
+            # A long-poll may legitimately take `wait` seconds before answering
+            timeout = (self.http.default_timeout[0], self.http.default_timeout[1] + wait)
+            response = self.http.get(url, headers=headers, params=params, timeout=timeout)
 
             if response.status_code == 200:
-                status_data = response.json()
-                task = self.tasks[task_id]
+                return self._update_task(task_id, response.json())
+            else:
+                print(f"Status check failed: {response.text}")
+                return None
+
+        except Exception as e:
+            print(f"Error checking transcription status: {e}")
+            return None
+
+    def wait_for_transcription(self, task_id: str,
+                               on_update: Optional[Callable[[TranscriptionTask], None]] = None,
+                               timeout: Optional[float] = None) -> Optional[TranscriptionTask]:
+        """
+        Block until a transcription task completes or fails.
+
+        Status changes are pushed by the server over Server-Sent Events. If the
+        event stream is unavailable, falls back to long-polling the status endpoint.
 
-                # Update task info
-                task.status = status_data.get("status", "unknown")
+        Args:
+            task_id (str): ID of the task to wait for
+            on_update (Callable): Called with the task on every intermediate status change
+            timeout (Optional[float]): Give up after this many seconds and return the last known task
+
+        Returns:
+            Optional[TranscriptionTask]: Final task info or None if failed
+        """
+        if task_id not in self.tasks:
+            print(f"Task ID {task_id} not found")
+            return None
 
-                if task.status == "completed":
-                    task.result = status_data.get("result", "")
-                elif task.status == "failed":
-                    task.error = status_data.get("error", "Unknown error")
+        deadline = time.time() + timeout if timeout else None
+        task = self.tasks[task_id]
 
+        try:
+            url = f"{self.speech_api_url}/status/{task_id}/events"
+            headers = {"X-API-Key": self.speech_api_key, "Accept": "text/event-stream"}
+
+            with self.http.get(url, headers=headers, stream=True) as response:
+                if response.status_code == 200:
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line and line.startswith("data:"):
+                            task = self._update_task(task_id, json.loads(line[5:]))
+                            if task.status in ["completed", "failed"]:
+                                return task
+                            if on_update:
+                                on_update(task)
+                        if deadline and time.time() > deadline:
+                            return task
+                else:
+                    print(f"Status events unavailable: {response.status_code}")
+
+        except Exception as e:
+            print(f"Error reading status events, falling back to long-poll: {e}")
+
+        while not deadline or time.time() < deadline:
+            started = time.time()
+            previous_status = task.status
+            task = self.check_transcription_status(task_id, wait=30)
+            if task is None or task.status in ["completed", "failed"]:
                 return task
+            if task.status != previous_status and on_update:
+                on_update(task)
+            # Servers without long-poll support answer immediately
+            if time.time() - started < 1:
+                time.sleep(2)
+
+        return task
+
+    def open_stream(self, language: str = "auto") -> Optional[str]:
+        """
+        Open a streaming recognition session on the speech server.
+
+        Args:
+            language (str): Language code or 'auto' for auto-detection
+
+        Returns:
+            Optional[str]: The session ID or None if failed
+        """
+        try:
+            url = f"{self.speech_api_url}/stream/open"
+            headers = {"X-API-Key": self.speech_api_key}
+
+            response = self.http.post(url, headers=headers, json={"language": language})
+
+            if response.status_code == 200:
+                return response.json().get("session_id")
             else:
-                print(f"Status check failed: {response.text}")
+                print(f"Opening stream failed: {response.text}")
                 return None
 
         except Exception as e:
-            print(f"Error checking transcription status: {e}")
+            print(f"Error opening stream: {e}")
+            return None
+
+    def push_stream_chunk(self, session_id: str, pcm: bytes, is_final: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Upload raw 16 kHz mono int16 PCM to a streaming session.
+
+        Args:
+            session_id (str): ID returned by open_stream
+            pcm (bytes): Raw PCM data
+            is_final (bool): Whether this is the last chunk of the session
+
+        Returns:
+            Optional[Dict[str, Any]]: Session snapshot with partial and final segments, or None if failed
+        """
+        try:
+            url = f"{self.speech_api_url}/stream/{session_id}/chunk"
+            headers = {"X-API-Key": self.speech_api_key, "Content-Type": "application/octet-stream"}
+            params = {"is_final": str(is_final).lower()}
+
+            response = self.http.post(url, headers=headers, params=params, data=pcm)
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                print(f"Stream upload failed: {response.text}")
+                return None
+
+        except Exception as e:
+            print(f"Error uploading stream chunk: {e}")
+            return None
+
+    def get_stream_status(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch the current snapshot of a streaming session.
+
+        Args:
+            session_id (str): ID returned by open_stream
+
+        Returns:
+            Optional[Dict[str, Any]]: Session snapshot or None if failed
+        """
+        try:
+            url = f"{self.speech_api_url}/stream/{session_id}"
+            headers = {"X-API-Key": self.speech_api_key}
+
+            response = self.http.get(url, headers=headers)
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                print(f"Stream status check failed: {response.text}")
+                return None
+
+        except Exception as e:
+            print(f"Error checking stream status: {e}")
             return None
 
     # def summarize_text(self, text: str, instruction: str) -> str:
@@ -240,42 +663,28 @@ class DeepSeekAPI:
     #         print(f"Error summarizing with LLM: {e}")
     #         return f"Error processing text: {str(e)}"
 
-    def summarize_text(self, text: str, instruction: str):  # 去掉 -> str 返回值类型注解，改为生成器
+    def summarize_text(self, text: str, instruction: str,
+                       on_progress: Optional[Callable[[int, int], None]] = None):  # 去掉 -> str 返回值类型注解，改为生成器
         """
         Use DeepSeek LLM to summarize or process the transcribed text (流式输出).
 
+        Transcripts longer than one context budget are split on sentence boundaries,
+        summarized chunk by chunk in parallel, then reduced with the given instruction.
+
         Args:
             text (str): The transcribed text to process
             instruction (str): Instruction for how to process the text
+            on_progress (Callable): Called with (chunks done, total chunks) during the map phase
 
         Yields:
             str:  Summary text chunks from the stream.
-        """
-        try:
-            system_prompt = "You are a helpful assistant that processes lecture transcripts. Organize the content into clear sections with headings, bullet points, and highlight key concepts."
-
-            if instruction:
-                system_prompt = instruction
-
-            response_stream = self.llm_client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Here is the transcript to process:\n\n{text}"},
-                ],
-                stream=True  # 启用流式输出
-            )
-
-            for chunk in response_stream:  # 迭代流式响应
-                if chunk.choices:
-                    text_chunk = chunk.choices[0].delta.content
-                    if text_chunk:
-                        yield text_chunk  # 使用 yield 返回文本块
 
-        except Exception as e:
-            error_str = f"Error summarizing with LLM: {e}"
-            print(error_str)
-            yield error_str  # 出错时也 yield 错误信息 (或者可以抛出异常，根据具体需求)
+        Raises:
+            Exception: If an LLM request fails. Callers must not cache the chunks
+                received before the failure.
+        """
+        summarizer = MapReduceSummarizer(self.llm_client)
+        yield from summarizer.summarize(text, instruction, on_progress)
 
 
 class TranscriptionManager:
@@ -287,52 +696,284 @@ class TranscriptionManager:
                  speech_api_key: str,
                  speech_api_url: str,
                  llm_api_key: str,
-                 output_dir: str = "transcriptions"):
-        self.recorder = AudioRecorder()
+                 output_dir: str = "transcriptions",
+                 cache_dir: Optional[str] = None,
+                 cache_max_bytes: int = 256 * 1024 * 1024,
+                 trim_silence: bool = True):
+        self.recorder = AudioRecorder(trim_silence=trim_silence)
         self.api = DeepSeekAPI(speech_api_key, speech_api_url, llm_api_key)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True, parents=True)
         self.current_task: Optional[TranscriptionTask] = None
 
-    def start_recording(self) -> None:
-        """Start recording audio."""
-        self.recorder.start_recording()
+        # Local transcript cache keyed by audio fingerprint and language
+        self.transcript_cache = TranscriptCache(cache_dir or str(self.output_dir / ".cache"), cache_max_bytes)
+        self.current_cache_key: Optional[str] = None
+        self._cached_task_id: Optional[str] = None
+
+        # Streaming recognition state
+        self.stream_session_id: Optional[str] = None
+        self.stream_snapshot: Dict[str, Any] = {}
+        self.stream_error = ""
+        self.stream_upload_bytes = 32000  # Upload about one second of 16 kHz int16 audio at a time
+        self.stream_queue_chunks = 120  # About 30 s of captured audio waiting for upload before the live session is given up
+        self._stream_queue: Optional[queue.Queue] = None
+        self._stream_thread: Optional[threading.Thread] = None
+        self._stream_to_original_ms: Optional[Callable[[float], float]] = None
+        # Maps segment times of the current file task back onto the recording when the upload was trimmed
+        self._task_to_original_ms: Optional[Callable[[float], float]] = None
+
+    def start_recording(self, streaming: bool = False, language: str = "auto") -> None:
+        """
+        Start recording audio.
+
+        Args:
+            streaming (bool): Whether to push audio to the server while recording
+            language (str): Language code used for the streaming session
+        """
+        self.current_cache_key = None
+        self.recorder.start_recording(on_chunk=self._on_audio_chunk)
+        if streaming:
+            # Live segment times refer to the silence-trimmed upload of this recording
+            self.start_streaming(language, to_original_ms=self.recorder.to_original_ms)
 
     def stop_recording(self) -> str:
         """Stop recording and return the path to the recorded file."""
-        return self.recorder.stop_recording()
+        file_path = self.recorder.stop_recording()
+        if self._stream_queue:
+            # Let the uploader flush the remaining audio and finalize the session
+            while not self.stream_error and self._stream_thread.is_alive():
+                try:
+                    self._stream_queue.put(None, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            self._stream_queue = None
+        if self.stream_error:
+            # The live session is incomplete, transcribe the recorded file instead
+            self.stream_session_id = None
+        return file_path
+
+    def _on_audio_chunk(self, data: bytes) -> None:
+        """Forward captured audio to the live uploader (called on the recorder's writer thread)."""
+        stream_queue = self._stream_queue
+        if not stream_queue or self.stream_error:
+            return
+        try:
+            stream_queue.put_nowait(data)
+        except queue.Full:
+            # The server cannot keep up; stop streaming rather than buffer without bound
+            self.stream_error = "Live upload fell behind the recording"
 
-    def record_chunk(self) -> None:
-        """Record a chunk of audio data."""
-        self.recorder.record_chunk()
+    def capture_stats(self) -> Dict[str, Any]:
+        """Return microphone capture health counters."""
+        return self.recorder.capture_stats()
+
+    def start_streaming(self, language: str = "auto",
+                        to_original_ms: Optional[Callable[[float], float]] = None) -> bool:
+        """
+        Open a streaming session and start the background uploader.
+
+        Args:
+            language (str): Language code or 'auto'
+            to_original_ms (Callable): Maps segment times in the uploaded audio back onto the source,
+                when the uploaded audio was silence-trimmed
+
+        Returns:
+            bool: True if the session was opened, False otherwise
+        """
+        session_id = self.api.open_stream(language)
+        if not session_id:
+            return False
+
+        self.stream_session_id = session_id
+        self.stream_snapshot = {}
+        self.stream_error = ""
+        self._stream_to_original_ms = to_original_ms
+        self._stream_queue = queue.Queue(maxsize=self.stream_queue_chunks)
+        self._stream_thread = threading.Thread(
+            target=self._stream_uploader,
+            args=(session_id, self._stream_queue, self.stream_upload_bytes),
+            daemon=True
+        )
+        self._stream_thread.start()
+        return True
+
+    def _stream_uploader(self, session_id: str, chunks: queue.Queue, upload_bytes: int) -> None:
+        """Background loop that pushes recorded PCM to the streaming session."""
+        buffer = bytearray()
+        finished = False
+        while not finished:
+            if self.stream_error:
+                return
+            data = chunks.get()
+            if data is None:
+                finished = True
+            else:
+                buffer.extend(data)
+                if len(buffer) < upload_bytes:
+                    continue
+
+            snapshot = self.api.push_stream_chunk(session_id, bytes(buffer), is_final=finished)
+            buffer.clear()
+            if snapshot is None:
+                self.stream_error = "Failed to upload audio to the streaming session"
+                return
+            self.stream_snapshot = snapshot
+
+        # Wait for the server to finalize the remaining segments
+        while not self.stream_snapshot.get("done"):
+            time.sleep(0.5)
+            snapshot = self.api.get_stream_status(session_id)
+            if snapshot is None:
+                self.stream_error = "Failed to check streaming session status"
+                return
+            self.stream_snapshot = snapshot
+
+    def get_stream_text(self) -> str:
+        """
+        Return the live transcript of the streaming session, including the partial segment.
+        """
+        return "".join(segment.get("text", "") for segment in self.stream_snapshot.get("segments", []))
+
+    def check_stream_status(self) -> Dict[str, Any]:
+        """
+        Check the status of the streaming session after recording stopped.
+
+        Returns:
+            Dict[str, Any]: A dictionary with the current status info
+        """
+        if self.stream_error:
+            self.stream_session_id = None
+            return {"status": "failed", "error": self.stream_error}
+
+        if self.stream_snapshot.get("done"):
+            self.stream_session_id = None
+            if self.current_cache_key:
+                self.transcript_cache.put_transcript(self.current_cache_key, self.stream_snapshot.get("text", ""))
+            return {
+                "status": "completed",
+                "result": self.stream_snapshot.get("text", ""),
+                "segments": self._to_recording_time(self.stream_snapshot.get("segments", []),
+                                                    self._stream_to_original_ms)
+            }
+
+        return {"status": "processing", "message": "Finalizing live transcription"}
+
+    @staticmethod
+    def _to_recording_time(segments: List[Dict[str, Any]],
+                           to_original_ms: Optional[Callable[[float], float]]) -> List[Dict[str, Any]]:
+        """Shift segment times that refer to the silence-trimmed upload back onto the recording."""
+        if not to_original_ms:
+            return segments
+        return [dict(segment, start=to_original_ms(segment["start"]), end=to_original_ms(segment["end"]))
+                for segment in segments]
 
     def is_recording(self) -> bool:
         """Check if recording is in progress."""
         return self.recorder.is_recording
 
-    def submit_for_transcription(self, file_path: str, language: str = "auto", is_final: bool = False) -> bool:
+    def lookup_cached(self, file_path: str, language: str = "auto") -> Optional[str]:
+        """
+        Look up a previously finished transcript for an audio or video file.
+
+        The file also becomes the cache source for transcripts and summaries produced afterwards.
+
+        Args:
+            file_path (str): Path to the original audio or video file
+            language (str): Language code or 'auto'
+
+        Returns:
+            Optional[str]: The cached transcript or None on a miss
+        """
+        try:
+            self.current_cache_key = self.transcript_cache.key(file_path, language)
+        except OSError:
+            self.current_cache_key = None
+            return None
+        return self.transcript_cache.get_transcript(self.current_cache_key)
+
+    def get_cached_summary(self, instruction: str) -> Optional[str]:
+        """Return the cached summary of the current file for this instruction, if any."""
+        if not self.current_cache_key:
+            return None
+        return self.transcript_cache.get_summary(self.current_cache_key, instruction)
+
+    def cache_summary(self, instruction: str, summary: str) -> None:
+        """Store a finished summary of the current file."""
+        if self.current_cache_key and summary:
+            self.transcript_cache.put_summary(self.current_cache_key, instruction, summary)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return hit/miss statistics of the local transcript cache."""
+        return self.transcript_cache.stats()
+
+    def submit_for_transcription(self, file_path: str, language: str = "auto", is_final: bool = False,
+                                 source_path: Optional[str] = None, use_cache: bool = True) -> bool:
         """
         Submit a recorded audio file for transcription.
 
+        Args:
+            file_path (str): Path to the audio file to upload
+            language (str): Language code or 'auto'
+            is_final (bool): Whether this is a final transcription
+            source_path (Optional[str]): Original file the audio came from (e.g. a video), used as cache key
+            use_cache (bool): Whether to look up the local cache before uploading
+
         Returns:
             bool: True if submission was successful, False otherwise
         """
-        task = self.api.transcribe_audio(file_path, language, is_final)
+        source_path = source_path or file_path
+        self._task_to_original_ms = None
+        if use_cache:
+            cached = self.lookup_cached(source_path, language)
+            if cached is not None:
+                self.current_task = TranscriptionTask(
+                    task_id=f"cache-{self.current_cache_key[:16]}",
+                    file_path=file_path,
+                    created_at=datetime.now().isoformat(),
+                    language=language,
+                    is_final=is_final,
+                    status="completed",
+                    result=cached
+                )
+                self._cached_task_id = self.current_task.task_id
+                return True
+
+        # Recordings are uploaded from their silence-trimmed copy; the raw WAV stays as recorded
+        upload_path = self.recorder.upload_copy(file_path)
+        if upload_path != file_path:
+            # Bind this recording's time map, a new recording replaces the recorder's trimmer
+            self._task_to_original_ms = self.recorder.trimmer.to_original_ms
+        task = self.api.transcribe_audio(upload_path, language, is_final)
         if task:
             self.current_task = task
             return True
         return False
+
+    def _remember_transcript(self, task: Optional[TranscriptionTask]) -> None:
+        """Store a completed transcript in the local cache once."""
+        if not task or task.status != "completed" or not self.current_cache_key:
+            return
+        if task.task_id == self._cached_task_id:
+            return
+        self.transcript_cache.put_transcript(self.current_cache_key, task.result, task.file_path)
+        self._cached_task_id = task.task_id
     
-    def extract_audio_from_video(self, video_path: str, output_audio_path: str) -> None:
+    def extract_audio_from_video(self, video_path: str, output_audio_path: str,
+                                 max_bytes: Optional[int] = None) -> bool:
         """
-        Extract audio from a video file and save it as a WAV file.
+        Extract audio from a video file and save it as a 16 kHz mono WAV file.
 
         Args:
             video_path (str): Path to the video file
             output_audio_path (str): Path to save the extracted audio
-        """   
-        is_success = extract_audio_from_video(video_path, output_audio_path)
-        return is_success
+            max_bytes (Optional[int]): Give up if the WAV would grow beyond this size
+
+        Returns:
+            bool: True if extraction succeeded, False otherwise
+        """
+        return extract_audio_from_video(video_path, output_audio_path, max_bytes=max_bytes)
 
     def check_transcription_status(self) -> Dict[str, Any]:
         """
@@ -341,25 +982,72 @@ class TranscriptionManager:
         Returns:
             Dict[str, Any]: A dictionary with the current status info
         """
+        if self.stream_session_id:
+            return self.check_stream_status()
+
+        if not self.current_task:
+            return {"status": "no_task", "message": "No active transcription task"}
+
+        task = self.current_task
+        if task.status not in ["completed", "failed"]:
+            task = self.api.check_transcription_status(task.task_id)
+        self._remember_transcript(task)
+        return self._task_status_info(task)
+
+    def wait_for_transcription(self, on_update: Optional[Callable[[Dict[str, Any]], None]] = None,
+                               timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Block until the current transcription task (or live session) finishes.
+
+        Args:
+            on_update (Callable): Called with the status info on every intermediate status change
+            timeout (Optional[float]): Maximum number of seconds to wait
+
+        Returns:
+            Dict[str, Any]: A dictionary with the final status info
+        """
+        if self.stream_session_id:
+            if self._stream_thread:
+                self._stream_thread.join(timeout)
+            return self.check_stream_status()
+
         if not self.current_task:
             return {"status": "no_task", "message": "No active transcription task"}
 
-        task = self.api.check_transcription_status(self.current_task.task_id)
+        task = self.current_task
+        if task.status not in ["completed", "failed"]:
+            callback = (lambda task: on_update(self._task_status_info(task))) if on_update else None
+            task = self.api.wait_for_transcription(task.task_id, callback, timeout)
+        self._remember_transcript(task)
+        return self._task_status_info(task)
+
+    def _task_status_info(self, task: Optional[TranscriptionTask]) -> Dict[str, Any]:
+        """Convert a task into the status dictionary used by the GUI."""
         if not task:
             return {"status": "error", "message": "Failed to check task status"}
 
         if task.status == "completed":
-            return {
+            info = {
                 "status": "completed",
                 "result": task.result,
                 "task_id": task.task_id
             }
+            if task.segments:
+                # Split-mode results carry per-segment times in the uploaded audio
+                info["segments"] = self._to_recording_time(task.segments, self._task_to_original_ms)
+            return info
         elif task.status == "failed":
             return {
                 "status": "failed",
                 "error": task.error,
                 "task_id": task.task_id
             }
+        elif task.queue_position:
+            return {
+                "status": task.status,
+                "message": f"Task is {task.status} (position {task.queue_position})",
+                "task_id": task.task_id
+            }
         else:
             return {
                 "status": task.status,
@@ -446,11 +1134,7 @@ class TranscriptionManager:
 
         # Wait for completion if requested
         if wait_for_completion:
-            while True:
-                status_info = self.check_transcription_status()
-                if status_info["status"] in ["completed", "failed", "error"]:
-                    break
-                time.sleep(2)
+            status_info = self.wait_for_transcription()
 
             if status_info["status"] != "completed":
                 return status_info
@@ -461,7 +1145,19 @@ class TranscriptionManager:
 
             # Summarize if requested
             if summarize and transcript:
-                summary = self.summarize_transcript(transcript, instruction)
+                summary = self.get_cached_summary(instruction)
+                if summary is None:
+                    try:
+                        summary = "".join(self.summarize_transcript(transcript, instruction))
+                    except Exception as e:
+                        print(f"Error summarizing with LLM: {e}")
+                        return {
+                            "status": "error",
+                            "message": f"Error summarizing with LLM: {e}",
+                            "transcript": transcript,
+                            "transcript_path": transcript_path
+                        }
+                    self.cache_summary(instruction, summary)
                 summary_path = self.save_summary(summary)
                 return {
                     "status": "success",
@@ -482,4 +1178,4 @@ class TranscriptionManager:
                 "status": "submitted",
                 "task_id": self.current_task.task_id,
                 "message": "Transcription submitted, check status later"
-            }
\ No newline at end of file
+            }
@@ -0,0 +1,161 @@
+"""
+Headless batch transcription: walk folders of recordings, transcribe and summarize every file,
+and append one JSON line per file to a manifest. Imports no Qt, so it starts fast on servers.
+
+Usage:
+    python batch_transcribe.py [folders or files ...] --output-dir transcriptions \\
+        --extract-jobs 2 --transcribe-jobs 4 --summarize-jobs 2
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from async_transcription import AsyncTranscriptionManager, BatchResult, VIDEO_EXTENSIONS
+from util.Instructions import Instruction1, Instruction2
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".m4a"}
+CONFIG_PATH = "config/config.json"
+
+
+def configured_folders(config_path: str = CONFIG_PATH) -> List[str]:
+    """Read the GUI's transcription folders (cfg.transcriptionFolders) without loading Qt."""
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("Folders", {}).get("LocalTranscription", [])
+    except (OSError, ValueError):
+        return []
+
+
+def find_media(paths: List[str], extensions) -> List[Path]:
+    """Expand folders recursively into a sorted list of media files."""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in extensions)
+        elif path.is_file():
+            files.append(path)
+        else:
+            print(f"Skipping missing path: {path}", file=sys.stderr)
+    return sorted(set(files))
+
+
+def output_paths(media: Path, roots: List[Path], output_dir: Path):
+    """Mirror the media file's location under its root folder into output_dir."""
+    for root in roots:
+        if root.is_dir() and root in media.parents:
+            relative = media.relative_to(root.parent)
+            break
+    else:
+        relative = Path(media.name)
+    base = output_dir / relative
+    return base.with_suffix(".txt"), base.with_suffix(".summary.md")
+
+
+async def run(args) -> int:
+    roots = [Path(p).resolve() for p in (args.paths or configured_folders(args.config))]
+    if not roots:
+        print("No input folders given and none configured in " + args.config, file=sys.stderr)
+        return 2
+
+    extensions = AUDIO_EXTENSIONS | VIDEO_EXTENSIONS
+    media_files = find_media([str(root) for root in roots], extensions)
+    output_dir = Path(args.output_dir)
+    manifest_path = Path(args.manifest) if args.manifest else output_dir / "manifest.jsonl"
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    instruction = {"1": Instruction1, "2": Instruction2}.get(args.instruction, args.instruction)
+    summarize = not args.no_summary
+
+    manager = AsyncTranscriptionManager(
+        args.speech_key, args.speech_url, None if args.no_summary else args.llm_key,
+        max_concurrent=args.transcribe_jobs, max_summaries=args.summarize_jobs,
+        max_extractions=args.extract_jobs, upload_encoding=args.upload_encoding,
+        cache_dir=args.cache_dir, llm_base_url=args.llm_url,
+    )
+
+    async def process(media: Path) -> dict:
+        transcript_path, summary_path = output_paths(media, roots, output_dir)
+        record = {"file": str(media), "transcript_path": str(transcript_path),
+                  "summary_path": str(summary_path) if summarize else None}
+
+        # Skip work whose outputs already exist
+        transcript = None
+        if transcript_path.exists() and not args.force:
+            transcript = transcript_path.read_text(encoding="utf-8")
+            if not summarize or summary_path.exists():
+                return dict(record, status="skipped", timings={}, elapsed=0.0)
+
+        result: BatchResult = await manager.process_file(str(media), args.language, summarize,
+                                                         instruction, transcript=transcript)
+        # Keep the transcript even if summarizing failed, so a rerun only redoes the summary
+        if result.transcript and transcript is None:
+            transcript_path.parent.mkdir(parents=True, exist_ok=True)
+            transcript_path.write_text(result.transcript, encoding="utf-8")
+        if result.status == "completed" and result.summary is not None:
+            summary_path.write_text(result.summary, encoding="utf-8")
+
+        return dict(record, status=result.status, error=result.error or None, cached=result.cached,
+                    task_id=result.task_id, timings={k: round(v, 3) for k, v in result.timings.items()},
+                    elapsed=round(result.elapsed, 3))
+
+    started = time.time()
+    counts = {}
+    async with manager:
+        pending = [asyncio.create_task(process(media)) for media in media_files]
+        with open(manifest_path, "a", encoding="utf-8") as manifest:
+            for done, finished in enumerate(asyncio.as_completed(pending), 1):
+                record = await finished
+                record["finished_at"] = datetime.now().isoformat()
+                manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+                manifest.flush()
+                counts[record["status"]] = counts.get(record["status"], 0) + 1
+                print(f"[{done}/{len(pending)}] {record['status']:>9} {record['elapsed']:7.1f}s {record['file']}")
+
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"Processed {len(media_files)} files in {time.time() - started:.1f}s ({summary or 'nothing to do'})")
+    print(f"Manifest: {manifest_path}")
+    return 1 if counts.get("failed") else 0
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Batch-transcribe folders of lecture recordings.")
+    parser.add_argument("paths", nargs="*", help="Folders or files (default: transcription folders from the config)")
+    parser.add_argument("--config", default=CONFIG_PATH, help="GUI config file holding the default folders")
+    parser.add_argument("--output-dir", default="transcriptions", help="Where transcripts and summaries are written")
+    parser.add_argument("--manifest", help="JSONL manifest path (default: <output-dir>/manifest.jsonl)")
+    parser.add_argument("--speech-url", default=os.environ.get("SPEECH_API_URL", "http://localhost:14612"))
+    parser.add_argument("--speech-key", default=os.environ.get("SPEECH_API_KEY", ""))
+    parser.add_argument("--llm-key", default=os.environ.get("DEEPSEEK_API_KEY", ""))
+    parser.add_argument("--llm-url", default="https://api.deepseek.com", help="OpenAI-compatible LLM endpoint")
+    parser.add_argument("--language", default="auto", help="Language code or 'auto'")
+    parser.add_argument("--instruction", default="1",
+                        help="Summary instruction: '1' or '2' for the built-in ones, or custom text")
+    parser.add_argument("--no-summary", action="store_true", help="Only transcribe")
+    parser.add_argument("--upload-encoding", default="flac", choices=["flac", "opus", "wav"])
+    parser.add_argument("--cache-dir", help="Reuse transcripts across runs from this cache directory")
+    parser.add_argument("--extract-jobs", type=int, default=2, help="Parallel audio extractions/transcodes")
+    parser.add_argument("--transcribe-jobs", type=int, default=4, help="Parallel recognition requests")
+    parser.add_argument("--summarize-jobs", type=int, default=2, help="Parallel summaries")
+    parser.add_argument("--force", action="store_true", help="Redo files whose outputs already exist")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.speech_key:
+        print("Speech API key required (--speech-key or SPEECH_API_KEY)", file=sys.stderr)
+        return 2
+    if not args.no_summary and not args.llm_key:
+        print("DeepSeek API key required for summaries (--llm-key or DEEPSEEK_API_KEY), "
+              "or pass --no-summary", file=sys.stderr)
+        return 2
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
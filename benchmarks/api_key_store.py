@@ -0,0 +1,48 @@
+import json
+import os
+import threading
+import time
+
+from util.api_key_store import ApiKeyStore
+
+
+if __name__ == '__main__':
+    # 压测：模拟 /status 的鉴权路径，对比每次请求同步重写文件与写回缓存
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    REQUESTS = 2000
+    THREADS = 8
+    keys = {f"key-{i}": {'is_active': True, 'usage': {'total_requests': 0, 'last_used': None,
+                                                     'total_processing_time': 0}} for i in range(50)}
+    path = os.path.join(tempfile.mkdtemp(), 'api_keys.json')
+    lock = threading.Lock()
+
+    def sync_auth(i):
+        with lock:
+            key_info = keys.get(f"key-{i % 50}")
+            key_info['usage']['total_requests'] += 1
+            key_info['usage']['last_used'] = time.time()
+            with open(path, 'w') as f:
+                json.dump(keys, f, indent=2)
+
+    start = time.time()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(sync_auth, range(REQUESTS)))
+    before = REQUESTS / (time.time() - start)
+
+    store = ApiKeyStore(path)
+
+    def store_auth(i):
+        store.record_request(store.get(f"key-{i % 50}"))
+
+    start = time.time()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(store_auth, range(REQUESTS)))
+    after = REQUESTS / (time.time() - start)
+    store.close()
+
+    with open(path) as f:
+        assert sum(info['usage']['total_requests'] for info in json.load(f).values()) == 2 * REQUESTS
+    print(f"同步写文件: {before:.0f} 次/秒")
+    print(f"写回缓存:   {after:.0f} 次/秒")
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+
+from openai import OpenAI
+
+from async_transcription import AsyncTranscriptionManager
+from util.map_reduce_summary import MapReduceSummarizer
+
+
+if __name__ == '__main__':
+    # 基准测试：本地替身服务器按固定耗时"识别"与"总结"，对比逐个文件轮询与异步并发批处理
+    import requests
+    from aiohttp import web
+
+    FILES = 12
+    RECOGNIZE_SECONDS = 1.5  # 替身服务器识别一个文件的耗时
+    SERVER_WORKERS = 4  # 替身服务器的推理并发数
+    SUMMARY_SECONDS = 1.0  # 替身 LLM 生成一份总结的耗时
+
+    async def run_stub_server():
+        results = {}
+        events = {}
+        workers = asyncio.Semaphore(SERVER_WORKERS)
+
+        async def recognize_job(task_id):
+            async with workers:
+                await asyncio.sleep(RECOGNIZE_SECONDS)
+            results[task_id] = {"task_id": task_id, "status": "completed", "result": f"transcript of {task_id}"}
+            events[task_id].set()
+
+        async def health(request):
+            return web.json_response({"status": "ok", "upload_encodings": []})
+
+        async def recognize(request):
+            await request.post()
+            task_id = str(len(events))
+            events[task_id] = asyncio.Event()
+            results[task_id] = {"task_id": task_id, "status": "queued"}
+            asyncio.ensure_future(recognize_job(task_id))
+            return web.json_response(results[task_id])
+
+        async def status(request):
+            task_id = request.match_info["task_id"]
+            wait = float(request.query.get("wait", 0))
+            if wait:
+                try:
+                    await asyncio.wait_for(events[task_id].wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            return web.json_response(results[task_id])
+
+        async def status_events(request):
+            task_id = request.match_info["task_id"]
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            await events[task_id].wait()
+            await response.write(f"data: {json.dumps(results[task_id])}\n\n".encode())
+            return response
+
+        async def chat(request):
+            body = await request.json()
+            await asyncio.sleep(SUMMARY_SECONDS)
+            content = "summary"
+            if not body.get("stream"):
+                return web.json_response({"id": "stub", "object": "chat.completion", "created": 0,
+                                          "model": body["model"], "choices": [{
+                                              "index": 0, "finish_reason": "stop",
+                                              "message": {"role": "assistant", "content": content}}]})
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            chunk = {"id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                     "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode())
+            return response
+
+        stub = web.Application()
+        stub.add_routes([
+            web.get("/health", health),
+            web.post("/recognize", recognize),
+            web.get("/status/{task_id}", status),
+            web.get("/status/{task_id}/events", status_events),
+            web.post("/chat/completions", chat),
+        ])
+        runner = web.AppRunner(stub)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    def sequential_baseline(url, paths, llm_client):
+        """原同步流程：一个文件提交、每 2 秒轮询一次，完成后再总结，再处理下一个文件"""
+        for path in paths:
+            with open(path, "rb") as f:
+                task_id = requests.post(f"{url}/recognize", files={"file": f}).json()["task_id"]
+            while requests.get(f"{url}/status/{task_id}").json()["status"] != "completed":
+                time.sleep(2)
+            "".join(MapReduceSummarizer(llm_client).summarize("transcript"))
+
+    async def main():
+        runner, url = await run_stub_server()
+        workdir = tempfile.mkdtemp()
+        paths = []
+        for i in range(FILES):
+            paths.append(os.path.join(workdir, f"lecture_{i:02d}.wav"))
+            with open(paths[-1], "wb") as f:
+                f.write(os.urandom(64 * 1024))
+
+        started = time.time()
+        await asyncio.to_thread(sequential_baseline, url, paths, OpenAI(api_key="stub", base_url=url))
+        print(f"逐个处理 {FILES} 个文件: {time.time() - started:.1f}s")
+
+        started = time.time()
+        async with AsyncTranscriptionManager("stub", url, "stub", llm_base_url=url) as manager:
+            async for result in manager.process_files(paths):
+                print(f"  {time.time() - started:5.1f}s {os.path.basename(result.file_path)} {result.status}")
+        print(f"异步并发处理 {FILES} 个文件: {time.time() - started:.1f}s")
+        await runner.cleanup()
+
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import tempfile
+
+from util.audio_codec import transcode_for_upload
+from util.mov_support import get_ffmpeg_exe
+
+
+if __name__ == '__main__':
+    # 基准测试：本地替身服务器只接收并丢弃上传内容，对比上传字节数与耗时
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import requests
+
+    # 模拟校园 Wi-Fi 的上行带宽（字节/秒），0 表示不限速
+    UPLINK = 2 * 1024 * 1024
+
+    class StandInHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            remaining = int(self.headers['Content-Length'])
+            started = time.time()
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, 64 * 1024)))
+                if UPLINK:
+                    received = int(self.headers['Content-Length']) - remaining
+                    time.sleep(max(0, received / UPLINK - (time.time() - started)))
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(b'{"task_id": "bench", "status": "queued"}')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/recognize"
+
+    # 10 分钟 16kHz 单声道测试音频：带噪声的语音频段正弦波
+    wav_path = os.path.join(tempfile.mkdtemp(), 'lecture.wav')
+    subprocess.run([get_ffmpeg_exe(), '-v', 'error', '-y', '-f', 'lavfi', '-i',
+                    'sine=frequency=220:duration=600,volume=0.5[a];anoisesrc=d=600:a=0.05[n];[a][n]amix',
+                    '-ac', '1', '-ar', '16000', wav_path], check=True)
+
+    for encoding in ['wav', 'flac', 'opus']:
+        started = time.time()
+        path = wav_path if encoding == 'wav' else transcode_for_upload(wav_path, encoding)
+        encoded = time.time() - started
+        with open(path, 'rb') as f:
+            requests.post(url, files={'file': f}, data={'encoding': encoding})
+        total = time.time() - started
+        print(f"{encoding:>5}: {os.path.getsize(path) / 1024 / 1024:7.2f} MB, "
+              f"转码 {encoded:5.2f}s, 总耗时 {total:5.2f}s")
+        if path != wav_path:
+            os.remove(path)
+    server.shutdown()
@@ -0,0 +1,106 @@
+"""
+比较模型后端的识别准确率与速度。
+
+样本目录中每个音频可附带同名 .txt 参考文本；没有参考文本时以第一个后端的结果为参考，
+此时错误率反映的是与该后端的一致程度。中文按字、其他语言按词计算错误率（MER）。
+
+用法：
+    python -m benchmarks.compare_backends samples/ --backends funasr onnx onnx-int8 --device cpu
+"""
+import argparse
+import re
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+from util.model_backend import BACKENDS, create_backend, load_audio, warm_up
+
+AUDIO_EXTENSIONS = {'.wav', '.mp3', '.flac', '.ogg', '.m4a', '.mp4'}
+_TOKEN = re.compile(r"[㐀-鿿]|[^\W_㐀-鿿]+(?:'[^\W_㐀-鿿]+)?")
+
+
+def tokenize(text):
+    """去掉标点、情感与事件符号，中文切成单字，其他语言按词切分"""
+    text = ''.join(ch for ch in unicodedata.normalize('NFKC', text).lower()
+                   if unicodedata.category(ch)[0] in 'LNZ' or ch == "'")
+    return _TOKEN.findall(text)
+
+
+def edit_distance(reference, hypothesis):
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref in enumerate(reference, 1):
+        current = [i]
+        for j, hyp in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref != hyp)))
+        previous = current
+    return previous[-1]
+
+
+def evaluate(name, device, samples, language):
+    """加载并预热后端，逐个识别样本，返回 (识别文本, 耗时列表, 加载耗时)"""
+    started = time.perf_counter()
+    backend = create_backend(name, device)
+    load_seconds = time.perf_counter() - started
+    warm_up(backend)
+
+    texts, latencies = {}, []
+    for path in samples:
+        started = time.perf_counter()
+        texts[path] = backend.generate(str(path), language)
+        latencies.append(time.perf_counter() - started)
+    return texts, latencies, load_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较模型后端的识别准确率与速度")
+    parser.add_argument('samples', help="样本目录，可附带同名 .txt 参考文本")
+    parser.add_argument('--backends', nargs='+', default=['funasr', 'onnx', 'onnx-int8'], choices=list(BACKENDS))
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--language', default='auto')
+    parser.add_argument('--show', action='store_true', help="打印每个文件的识别结果")
+    args = parser.parse_args()
+
+    samples = sorted(p for p in Path(args.samples).rglob('*') if p.suffix.lower() in AUDIO_EXTENSIONS)
+    if not samples:
+        parser.error(f"{args.samples} 中没有音频文件")
+    durations = {path: len(load_audio(str(path))) / 16000 for path in samples}
+    references = {path: path.with_suffix('.txt').read_text(encoding='utf-8')
+                  for path in samples if path.with_suffix('.txt').exists()}
+    print(f"{len(samples)} 个样本，共 {sum(durations.values()) / 60:.1f} 分钟，"
+          f"{len(references)} 个带参考文本")
+
+    rows = []
+    for name in args.backends:
+        try:
+            texts, latencies, load_seconds = evaluate(name, args.device, samples, args.language)
+        except Exception as e:
+            print(f"{name}: 无法运行（{e!r}）")
+            continue
+        if not references:
+            # 以第一个成功运行的后端为参考
+            references = dict(texts)
+
+        # 只统计有参考文本的样本
+        errors = tokens = 0
+        for path in samples:
+            if args.show:
+                print(f"[{name}] {path.name}: {texts[path]}")
+            if path in references:
+                reference = tokenize(references[path])
+                errors += edit_distance(reference, tokenize(texts[path]))
+                tokens += len(reference)
+
+        audio_seconds = sum(durations.values())
+        rows.append((name, load_seconds, errors / max(tokens, 1), sum(latencies) / audio_seconds,
+                     *np.percentile(latencies, [50, 99])))
+
+    print(f"\n{'后端':<12}{'加载(s)':>9}{'错误率':>9}{'RTF':>8}{'p50(s)':>9}{'p99(s)':>9}{'加速':>8}")
+    for name, load_seconds, error_rate, rtf, p50, p99 in rows:
+        speedup = rows[0][3] / rtf if rtf else float('inf')
+        print(f"{name:<12}{load_seconds:>9.1f}{error_rate:>9.2%}{rtf:>8.3f}{p50:>9.2f}{p99:>9.2f}{speedup:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
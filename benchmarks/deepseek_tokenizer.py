@@ -0,0 +1,19 @@
+from util.deepseek_v3_tokenizer.deepseek_tokenizer import deepseek_tokenize_length, get_tokenizer_service
+
+
+if __name__ == "__main__":
+    # 基准测试：首次调用（含加载 tokenizer）、批量计数与缓存命中的耗时
+    import time
+
+    text = "Hello!"
+    service = get_tokenizer_service()
+    started = time.time()
+    print(deepseek_tokenize_length(text), f"首次（含加载）{time.time() - started:.2f}s")
+
+    sentences = [f"第{i}句：今天我们讲傅里叶变换的性质。" for i in range(2000)]
+    started = time.time()
+    service.count_tokens(sentences)
+    print(f"批量 {len(sentences)} 句 {time.time() - started:.3f}s")
+    started = time.time()
+    service.count_tokens(sentences)
+    print(f"缓存命中 {len(sentences)} 句 {time.time() - started:.3f}s")
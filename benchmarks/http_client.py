@@ -0,0 +1,49 @@
+import threading
+import time
+
+import requests
+
+from util.http_client import PooledSession
+
+
+if __name__ == '__main__':
+    # 对比每次新建连接与连接池复用：本地服务器每个连接先模拟一次 TLS 握手的耗时
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    HANDSHAKE = 0.03
+
+    class KeepAliveHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            time.sleep(HANDSHAKE)
+
+        def do_GET(self):
+            body = b'{"status": "processing"}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/status/0b9e7c1e-4a5f-4c39-9a57-1f3c2d4e5f60"
+
+    started = time.time()
+    for _ in range(100):
+        requests.get(url)
+    print(f"requests.get 100 次: {time.time() - started:.2f}s")
+
+    session = PooledSession()
+    started = time.time()
+    for _ in range(100):
+        session.get(url)
+    print(f"PooledSession 100 次: {time.time() - started:.2f}s")
+    print(session.latency_stats())
+    server.shutdown()
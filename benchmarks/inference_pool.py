@@ -0,0 +1,25 @@
+import time
+
+from util.inference_pool import InferencePool, QueueFullError
+
+
+if __name__ == '__main__':
+    # 使用会 sleep 的桩模型演示调度顺序与背压
+    done = []
+
+    def stub_model(name, seconds):
+        time.sleep(seconds)
+        done.append(name)
+
+    pool = InferencePool(stub_model, num_workers=2, max_queue_size=4)
+    pool.start()
+    for i in range(8):
+        name = "final" if i == 5 else f"interim-{i}"
+        try:
+            pool.submit(name, (name, 0.2), is_final=(name == "final"))
+        except QueueFullError as e:
+            print(f"{name} 被拒绝，Retry-After={e.retry_after}")
+    print("final 排队位置:", pool.position("final"))
+    time.sleep(2)
+    pool.stop()
+    print("完成顺序:", done)
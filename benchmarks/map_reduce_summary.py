@@ -0,0 +1,59 @@
+from util.deepseek_v3_tokenizer.deepseek_tokenizer import estimate_tokens
+from util.map_reduce_summary import MapReduceSummarizer, split_transcript
+
+
+if __name__ == '__main__':
+    # 本地 OpenAI 兼容替身服务器：请求延迟随输入长度增长，观察分块并发后的首字与总耗时
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from openai import OpenAI
+
+    LATENCY_PER_1K_TOKENS = 0.2
+
+    class MockChatHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            prompt = body['messages'][-1]['content']
+            time.sleep(0.3 + estimate_tokens(prompt) / 1000 * LATENCY_PER_1K_TOKENS)
+            reply = f"[{estimate_tokens(prompt)} tokens 的笔记] " + prompt[:200]
+
+            self.send_response(200)
+            if body.get('stream'):
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                for i in range(0, len(reply), 20):
+                    event = {'id': 'mock', 'object': 'chat.completion.chunk', 'created': 0, 'model': body['model'],
+                             'choices': [{'index': 0, 'delta': {'content': reply[i:i + 20]}, 'finish_reason': None}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+            else:
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({
+                    'id': 'mock', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply},
+                                 'finish_reason': 'stop'}]
+                }).encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockChatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OpenAI(api_key='mock', base_url=f"http://127.0.0.1:{server.server_port}")
+
+    # 约 3 小时课程的转录文本
+    transcript = "今天我们讲傅里叶变换的性质，以及它在信号处理中的应用。" * 4000
+    summarizer = MapReduceSummarizer(client, chunk_tokens=8000)
+    chunks = split_transcript(transcript, summarizer.chunk_tokens)
+    print(f"转录约 {estimate_tokens(transcript)} tokens，切成 {len(chunks)} 块")
+
+    started = time.time()
+    first_token = None
+    for text in summarizer.summarize(transcript, on_progress=lambda done, total: print(f"  map {done}/{total}")):
+        first_token = first_token or time.time() - started
+    print(f"map-reduce：首字 {first_token:.2f}s，总耗时 {time.time() - started:.2f}s")
+    server.shutdown()
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from util.micro_batcher import MicroBatcher
+
+
+if __name__ == '__main__':
+    # 基准测试：桩模型每次调用固定开销 20ms，每条额外 2ms
+    CALL_OVERHEAD = 0.02
+    PER_ITEM = 0.002
+    N = 200
+
+    def stub_generate(items):
+        time.sleep(CALL_OVERHEAD + PER_ITEM * len(items))
+        return [f"text-{item}" for item in items]
+
+    start = time.time()
+    for i in range(N):
+        stub_generate([i])
+    serial = time.time() - start
+
+    done = threading.Event()
+    results = {}
+
+    def make_callback(i):
+        def callback(result, error):
+            results[i] = result
+            if len(results) == N:
+                done.set()
+        return callback
+
+    batcher = MicroBatcher(stub_generate, max_batch_size=16, max_wait=0.05)
+    batcher.start()
+    start = time.time()
+    for i in range(N):
+        batcher.submit(i, make_callback(i))
+    done.wait()
+    batched = time.time() - start
+    batcher.stop()
+
+    assert all(results[i] == f"text-{i}" for i in range(N))
+    print(f"逐条调用: {N / serial:.1f} 条/秒")
+    print(f"微批处理: {N / batched:.1f} 条/秒 ({batcher.stats()})")
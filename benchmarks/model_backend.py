@@ -0,0 +1,44 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from util.model_backend import BACKENDS, create_backend, synthetic_speech, warm_up, write_wav
+
+
+if __name__ == '__main__':
+    # 基准测试：对比各后端首次调用与预热后 generate 的 p50 / p99 延迟
+    import argparse
+
+    parser = argparse.ArgumentParser(description="比较模型后端的识别延迟")
+    parser.add_argument('--backends', nargs='+', default=['stub'], choices=list(BACKENDS))
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--audio', help="测试音频，默认使用合成音频")
+    parser.add_argument('--seconds', type=float, default=10, help="合成音频时长")
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        audio_path = args.audio
+        if audio_path is None:
+            audio_path = os.path.join(tmp_dir, 'bench.wav')
+            write_wav(audio_path, synthetic_speech(args.seconds, seed=42))
+
+        for name in args.backends:
+            started = time.perf_counter()
+            backend = create_backend(name, args.device)
+            load_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            backend.generate(audio_path, 'auto')
+            cold_ms = (time.perf_counter() - started) * 1000
+            warm_up_timings = warm_up(backend)
+
+            latencies = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                backend.generate(audio_path, 'auto')
+                latencies.append((time.perf_counter() - started) * 1000)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"{name:>12}: 加载 {load_seconds:.1f}s，首次 {cold_ms:.0f}ms，预热 {warm_up_timings}，"
+                  f"p50 {p50:.0f}ms，p99 {p99:.0f}ms")
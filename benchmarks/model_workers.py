@@ -0,0 +1,43 @@
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from util.model_workers import InProcessModel, ModelWorkerPool
+
+
+if __name__ == '__main__':
+    # CPU 替身模型：服务进程内多线程 vs 多个模型进程的吞吐，以及杀掉进程后的自动恢复
+    segments = [(np.random.uniform(-0.1, 0.1, 16000 * 8).astype(np.float32), 'auto') for _ in range(4)]
+    total = 32
+    processes = max(2, min(4, os.cpu_count() or 1))
+
+    def run(model):
+        started = time.time()
+        with ThreadPoolExecutor(processes * 2) as executor:
+            list(executor.map(lambda _: model.recognize_batch(segments), range(total)))
+        return total / (time.time() - started)
+
+    model = InProcessModel('stub', 'cpu')
+    model.start()
+    print(f"线程模式（{processes * 2} 个线程）: {run(model):.1f} 批/秒")
+
+    pool = ModelWorkerPool('stub', ['cpu'] * processes, threads_per_worker=1)
+    pool.start()
+    pool.recognize_batch(segments)  # 等待就绪
+    print(f"进程模式（{processes} 个模型进程）: {run(pool):.1f} 批/秒")
+
+    victim = pool.stats()[0]['pid']
+    with ThreadPoolExecutor(processes * 2) as executor:
+        futures = [executor.submit(pool.recognize_batch, segments) for _ in range(total)]
+        time.sleep(0.3)
+        os.kill(victim, signal.SIGKILL)
+        done = sum(1 for future in futures if future.result() is not None)
+    print(f"杀掉 pid {victim} 后 {done}/{total} 个请求完成")
+    pool.recognize_batch(segments)
+    time.sleep(1.5)
+    for worker in pool.stats():
+        print(worker)
+    pool.stop()
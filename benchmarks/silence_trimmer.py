@@ -0,0 +1,38 @@
+import numpy as np
+
+from util.silence_trimmer import SilenceTrimmer
+
+
+if __name__ == '__main__':
+    # 合成课堂录音：语音频段的调制噪声与不同长度的停顿（板书）交替，底噪 -60dB
+    import time
+
+    rate = 16000
+    rng = np.random.default_rng(0)
+    parts = []
+    speech_seconds = 0.0
+    for _ in range(120):
+        talk = rng.uniform(2, 15)
+        pause = rng.choice([0.3, 0.8, 2.0, 8.0, 25.0], p=[0.35, 0.3, 0.2, 0.1, 0.05])
+        t = np.arange(int(talk * rate)) / rate
+        syllables = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+        voice = 0.3 * syllables * np.sin(2 * np.pi * 180 * t + 3 * np.sin(2 * np.pi * 5 * t))
+        parts.append(voice)
+        parts.append(np.zeros(int(pause * rate)))
+        speech_seconds += talk
+    audio = np.concatenate(parts) + rng.normal(0, 0.001, sum(len(p) for p in parts))
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes()
+
+    trimmer = SilenceTrimmer(rate)
+    started = time.time()
+    chunk = 4096 * 2
+    trimmed = b''.join(trimmer.process(pcm[i:i + chunk]) for i in range(0, len(pcm), chunk)) + trimmer.flush()
+    elapsed = time.time() - started
+
+    stats = trimmer.stats()
+    print(f"原始 {len(pcm) / 1024 / 1024:.1f} MB / {stats['input_seconds']}s（语音 {speech_seconds:.0f}s），"
+          f"压缩后 {len(trimmed) / 1024 / 1024:.1f} MB / {stats['output_seconds']}s")
+    print(f"节省上传 {stats['bytes_saved'] / 1024 / 1024:.1f} MB，"
+          f"服务器需处理的音频时长减少 {1 - stats['output_seconds'] / stats['input_seconds']:.0%}，"
+          f"VAD 耗时 {elapsed:.2f}s（{stats['input_seconds'] / elapsed:.0f}x 实时）")
+    print(f"压缩后 60s 处对应原始录音 {trimmer.to_original_ms(60000) / 1000:.1f}s")
@@ -1,12 +1,15 @@
 from PySide6.QtCore import QThread, Signal, Slot
 
+from util.map_reduce_summary import MapReduceSummarizer
+
 class SummarizationWorker(QThread):
     """
     后台执行总结任务的工作线程。
     """
     summary_chunk_ready = Signal(str)  # 用于发送总结文本块的信号
-    summary_finished = Signal()       # 用于通知总结完成的信号
+    summary_finished = Signal(str)    # 用于通知总结完成的信号，携带完整总结
     summary_error = Signal(str)        # 用于通知总结错误的信号
+    summary_progress = Signal(int, int)  # 长文本分块总结进度 (已完成块数, 总块数)
 
     def __init__(self, api, text: str, instruction: str = ""):
         super().__init__()
@@ -19,26 +22,14 @@ class SummarizationWorker(QThread):
         在线程中执行总结任务。
         """
         try:
-            system_prompt = "You are a helpful assistant that processes lecture transcripts. Organize the content into clear sections with headings, bullet points, and highlight key concepts."
-            if self.instruction:
-                system_prompt = self.instruction
-
-            response_stream = self.api.llm_client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Here is the transcript to process:\n\n{self.text}"},
-                ],
-                stream=True # 启用流式输出
-            )
-
-            for chunk in response_stream:
-                if chunk.choices:
-                    text_chunk = chunk.choices[0].delta.content
-                    if text_chunk:
-                        self.summary_chunk_ready.emit(text_chunk) # 发射信号，传递文本块
+            # 超出单次上下文预算的转录先分块并发提炼，再按提示词流式归并
+            summarizer = MapReduceSummarizer(self.api.llm_client)
+            chunks = []
+            for text_chunk in summarizer.summarize(self.text, self.instruction, self.summary_progress.emit):
+                chunks.append(text_chunk)
+                self.summary_chunk_ready.emit(text_chunk) # 发射信号，传递文本块
 
-            self.summary_finished.emit() # 发射信号，通知总结完成
+            self.summary_finished.emit("".join(chunks)) # 发射信号，通知总结完成
 
         except Exception as e:
             error_str = f"Error summarizing with LLM: {str(e)}"
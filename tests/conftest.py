@@ -0,0 +1,56 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+
+class FakeStream:
+    def __init__(self, stream_callback, **kwargs):
+        self.callback = stream_callback
+        self.kwargs = kwargs
+        self.stopped = False
+
+    def stop_stream(self):
+        self.stopped = True
+
+    def close(self):
+        pass
+
+
+class FakePyAudio:
+    """替代 pyaudio.PyAudio：不打开设备，只记录回调，由测试代替 PortAudio 线程调用"""
+
+    def __init__(self):
+        self.streams = []
+
+    def open(self, **kwargs):
+        stream = FakeStream(**kwargs)
+        self.streams.append(stream)
+        return stream
+
+    def terminate(self):
+        pass
+
+
+def fake_pyaudio_module():
+    module = types.ModuleType('pyaudio')
+    module.paInt16 = 8
+    module.paContinue = 0
+    module.paInputUnderflow = 1
+    module.paInputOverflow = 2
+    module.get_sample_size = lambda format: 2
+    module.PyAudio = FakePyAudio
+    return module
+
+
+@pytest.fixture(scope='module')
+def audio_transcription():
+    """用替身 pyaudio 模块导入 audio_transcription，结束后移除，避免影响其他测试"""
+    pytest.importorskip('openai')
+    pytest.importorskip('requests')
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setitem(sys.modules, 'pyaudio', fake_pyaudio_module())
+        sys.modules.pop('audio_transcription', None)
+        yield importlib.import_module('audio_transcription')
+        sys.modules.pop('audio_transcription', None)
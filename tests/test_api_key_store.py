@@ -0,0 +1,79 @@
+import json
+import os
+import time
+
+import pytest
+
+from util.api_key_store import ApiKeyStore
+
+
+def new_key():
+    return {'is_active': True, 'usage': {'total_requests': 0, 'last_used': None, 'total_processing_time': 0}}
+
+
+def read_usage(path, key):
+    with open(path) as f:
+        return json.load(f)[key]['usage']
+
+
+def test_usage_survives_restart(tmp_path):
+    path = str(tmp_path / 'api_keys.json')
+    store = ApiKeyStore(path, flush_interval=60)
+    store.add('key', new_key())
+    for _ in range(3):
+        store.record_request(store.get('key'))
+    store.record_processing_time('key', 1.5)
+    store.close()
+
+    reloaded = ApiKeyStore(path, flush_interval=60)
+    assert 'key' in reloaded
+    assert reloaded.get('key')['usage']['total_requests'] == 3
+    assert reloaded.get('key')['usage']['total_processing_time'] == 1.5
+    reloaded.close()
+
+
+def test_dirty_threshold_triggers_flush(tmp_path):
+    path = str(tmp_path / 'api_keys.json')
+    store = ApiKeyStore(path, flush_interval=60, dirty_threshold=5)
+    store.add('key', new_key())
+    for _ in range(5):
+        store.record_request(store.get('key'))
+
+    deadline = time.time() + 5
+    while read_usage(path, 'key')['total_requests'] != 5:
+        assert time.time() < deadline, "达到脏计数阈值后没有写回"
+        time.sleep(0.05)
+    store.close()
+
+
+def test_failed_flush_is_retried(tmp_path, monkeypatch):
+    path = str(tmp_path / 'api_keys.json')
+    store = ApiKeyStore(path, flush_interval=60)
+    store.add('key', new_key())
+    store.record_request(store.get('key'))
+
+    def fail_replace(src, dst):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(os, 'replace', fail_replace)
+        with pytest.raises(OSError):
+            store.flush()
+    assert read_usage(path, 'key')['total_requests'] == 0
+
+    # 写入失败后修改仍处于未写回状态，下一次写回补上
+    store.flush()
+    assert read_usage(path, 'key')['total_requests'] == 1
+    store.close()
+
+
+def test_add_and_toggle_write_immediately(tmp_path):
+    path = str(tmp_path / 'api_keys.json')
+    store = ApiKeyStore(path, flush_interval=60)
+    assert store.add('key', new_key())
+    assert not store.add('key', new_key())
+    assert store.set_active('key', False)
+    assert not store.set_active('missing', False)
+    with open(path) as f:
+        assert json.load(f)['key']['is_active'] is False
+    store.close()
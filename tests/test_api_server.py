@@ -0,0 +1,273 @@
+import hashlib
+import importlib
+import io
+import json
+import os
+import time
+
+import pytest
+
+from util.inference_pool import InferencePool
+from util.model_backend import synthetic_speech, write_wav
+from util.model_workers import InProcessModel
+
+API_KEY = 'test-key'
+SERVER_ENV = {
+    'MODEL_BACKEND': 'stub',
+    'MODEL_DEVICES': 'cpu',
+    'SERVING_MODE': 'thread',
+    'WARM_UP_SECONDS': '',
+    'TASK_STORE': 'memory',
+}
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    """在临时目录中以替身模型启动服务（上传、缓存与密钥文件都写在该目录），等待模型就绪"""
+    pytest.importorskip('flask')
+    pytest.importorskip('flask_cors')
+    workdir = tmp_path_factory.mktemp('server')
+    saved_env = {name: os.environ.get(name) for name in SERVER_ENV}
+    saved_cwd = os.getcwd()
+    os.environ.update(SERVER_ENV)
+    os.chdir(workdir)
+    try:
+        module = importlib.import_module('api_key_server')
+        module.api_keys.add(API_KEY, {
+            'created_at': time.time(),
+            'is_admin': False,
+            'is_active': True,
+            'usage': {'total_requests': 0, 'last_used': None, 'total_processing_time': 0}
+        })
+        client = module.app.test_client()
+        deadline = time.time() + 30
+        while client.get('/ready').status_code != 200:
+            assert time.time() < deadline, "替身模型未能就绪"
+            time.sleep(0.1)
+        yield module
+        module.api_keys.close()
+    finally:
+        os.chdir(saved_cwd)
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
+
+
+@pytest.fixture(scope='module')
+def wav_bytes(tmp_path_factory):
+    path = tmp_path_factory.mktemp('audio') / 'speech.wav'
+    write_wav(str(path), synthetic_speech(3, seed=1))
+    return path.read_bytes()
+
+
+def recognize(client, wav_bytes, **form):
+    data = {'file': (io.BytesIO(wav_bytes), 'speech.wav'), **form}
+    return client.post('/recognize', data=data, headers={'X-API-Key': API_KEY},
+                       content_type='multipart/form-data')
+
+
+def wait_completed(client, task_id, timeout=30):
+    deadline = time.time() + timeout
+    while True:
+        status = client.get(f'/status/{task_id}?wait=5', headers={'X-API-Key': API_KEY}).get_json()
+        if status['status'] in ['completed', 'failed'] or time.time() > deadline:
+            return status
+
+
+def test_recognize_requires_api_key(client, wav_bytes):
+    response = client.post('/recognize', data={'file': (io.BytesIO(wav_bytes), 'speech.wav')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 401
+
+
+def test_recognize_round_trip(client, wav_bytes):
+    response = recognize(client, wav_bytes, is_final='true', language='zh')
+    assert response.status_code == 200
+    task_id = response.get_json()['task_id']
+
+    status = wait_completed(client, task_id)
+    assert status['status'] == 'completed'
+    assert status['result'].startswith('[')
+    assert status['is_final'] is True
+
+
+def test_concurrent_interim_requests_share_a_batch(server, client, wav_bytes, monkeypatch):
+    batches = []
+    batch_fn = server.segment_batcher.batch_fn
+
+    def recording_batch_fn(items):
+        batches.append({language for _, language in items})
+        return batch_fn(items)
+
+    monkeypatch.setattr(server.segment_batcher, 'batch_fn', recording_batch_fn)
+    monkeypatch.setattr(server.segment_batcher, 'max_wait', 1.0)
+    monkeypatch.setattr(server.segment_batcher, 'max_batch_size', 256)
+    assert server.app.config['INFERENCE_WORKERS'] == 1
+
+    # 单个推理线程下两个临时任务的片段也应进入同一批次
+    task_ids = [recognize(client, wav_bytes, language=language).get_json()['task_id'] for language in ['de', 'es']]
+    for task_id in task_ids:
+        status = wait_completed(client, task_id)
+        assert status['status'] == 'completed'
+        assert status['result'].startswith('[')
+    assert {'de', 'es'} in batches
+
+
+def test_recognize_returns_429_when_queue_is_full(server, client, wav_bytes, monkeypatch):
+    # 未启动工作线程的推理池，占满唯一的排队位置
+    full_pool = InferencePool(lambda *args: None, max_queue_size=1)
+    full_pool.submit('blocker', ())
+    monkeypatch.setattr(server, 'inference_pool', full_pool)
+    uploads_before = set(os.listdir(server.app.config['UPLOAD_FOLDER']))
+
+    # 换一种语言，避免命中前面用例留下的识别缓存
+    response = recognize(client, wav_bytes, is_final='false', language='en')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['retry_after'] == int(response.headers['Retry-After'])
+    # 被拒绝的上传不留下任务与临时文件
+    assert set(os.listdir(server.app.config['UPLOAD_FOLDER'])) == uploads_before
+
+
+def test_stream_chunks_must_be_whole_samples(client):
+    headers = {'X-API-Key': API_KEY}
+    session_id = client.post('/stream/open', json={'language': 'zh'}, headers=headers).get_json()['session_id']
+
+    assert client.post(f'/stream/{session_id}/chunk', data=b'\x00' * 3, headers=headers).status_code == 400
+    assert client.post(f'/stream/{session_id}/chunk', data=b'\x00' * 3200, headers=headers).status_code == 200
+    assert client.post(f'/stream/{session_id}/close', headers=headers).get_json()['done']
+    # 关闭后继续上传是状态冲突，重复关闭仍返回最终结果
+    assert client.post(f'/stream/{session_id}/chunk', data=b'\x00' * 3200, headers=headers).status_code == 409
+    assert client.post(f'/stream/{session_id}/close', headers=headers).status_code == 200
+
+
+def test_status_events_stream_until_completed(client, wav_bytes):
+    task_id = recognize(client, wav_bytes, is_final='true', language='ja').get_json()['task_id']
+
+    response = client.get(f'/status/{task_id}/events', headers={'X-API-Key': API_KEY})
+    assert response.mimetype == 'text/event-stream'
+    events = [json.loads(line[len('data: '):]) for line in response.get_data(as_text=True).splitlines()
+              if line.startswith('data: ')]
+    assert events[-1]['status'] == 'completed'
+    assert all(event['task_id'] == task_id for event in events)
+
+    assert client.get('/status/missing/events', headers={'X-API-Key': API_KEY}).status_code == 404
+
+
+def test_repeated_upload_hits_result_cache(client, wav_bytes):
+    task_id = recognize(client, wav_bytes, is_final='true', language='ko').get_json()['task_id']
+    first = wait_completed(client, task_id)
+
+    response = recognize(client, wav_bytes, is_final='true', language='ko').get_json()
+    assert response['status'] == 'completed'
+    assert response['cached'] is True
+    assert response['result'] == first['result']
+    status = client.get(f"/status/{response['task_id']}", headers={'X-API-Key': API_KEY}).get_json()
+    assert status['result'] == first['result']
+
+
+@pytest.mark.parametrize('chunk_size', [0, -1, 'big', True, 10 ** 12])
+def test_upload_rejects_invalid_chunk_size(client, chunk_size):
+    response = client.post('/upload/initiate', json={'size': 1000, 'chunk_size': chunk_size},
+                           headers={'X-API-Key': API_KEY})
+    assert response.status_code == 400
+
+
+def test_resumable_upload_round_trip(client, wav_bytes):
+    headers = {'X-API-Key': API_KEY}
+    status = client.post('/upload/initiate', json={'size': len(wav_bytes), 'filename': 'speech.wav',
+                                                   'is_final': True, 'language': 'fr'},
+                         headers=headers).get_json()
+    upload_id, chunk_size = status['upload_id'], status['chunk_size']
+
+    for offset in range(0, len(wav_bytes), chunk_size):
+        chunk = wav_bytes[offset:offset + chunk_size]
+        response = client.put(f'/upload/{upload_id}?offset={offset}', data=chunk,
+                              headers=dict(headers, **{'X-Chunk-SHA256': hashlib.sha256(chunk).hexdigest()}))
+        assert response.status_code == 200
+    assert client.get(f'/upload/{upload_id}', headers=headers).get_json()['missing_chunks'] == []
+
+    response = client.post(f'/upload/{upload_id}/complete', json={'sha256': hashlib.sha256(wav_bytes).hexdigest()},
+                           headers=headers)
+    assert response.status_code == 200
+    assert wait_completed(client, response.get_json()['task_id'])['status'] == 'completed'
+
+
+def test_resumable_upload_rejects_file_hash_mismatch(client, wav_bytes):
+    headers = {'X-API-Key': API_KEY}
+    upload_id = client.post('/upload/initiate', json={'size': len(wav_bytes)}, headers=headers).get_json()['upload_id']
+
+    bad_checksum = dict(headers, **{'X-Chunk-SHA256': hashlib.sha256(b'other').hexdigest()})
+    assert client.put(f'/upload/{upload_id}?offset=0', data=wav_bytes, headers=bad_checksum).status_code == 400
+    # 分块未到齐时不能完成
+    assert client.post(f'/upload/{upload_id}/complete', headers=headers).status_code == 409
+
+    good_checksum = dict(headers, **{'X-Chunk-SHA256': hashlib.sha256(wav_bytes).hexdigest()})
+    assert client.put(f'/upload/{upload_id}?offset=0', data=wav_bytes, headers=good_checksum).status_code == 200
+    response = client.post(f'/upload/{upload_id}/complete', json={'sha256': hashlib.sha256(b'other').hexdigest()},
+                           headers=headers)
+    assert response.status_code == 400
+    assert client.get(f'/upload/{upload_id}', headers=headers).status_code == 404
+
+
+def test_resumable_upload_survives_bad_retry_of_accepted_chunk(client, wav_bytes):
+    headers = {'X-API-Key': API_KEY}
+    upload_id = client.post('/upload/initiate', json={'size': len(wav_bytes), 'is_final': True, 'language': 'it'},
+                            headers=headers).get_json()['upload_id']
+    good_checksum = dict(headers, **{'X-Chunk-SHA256': hashlib.sha256(wav_bytes).hexdigest()})
+    assert client.put(f'/upload/{upload_id}?offset=0', data=wav_bytes, headers=good_checksum).status_code == 200
+
+    # 重传的副本损坏：拒绝该副本，已确认的数据保持不变
+    corrupted = bytes(len(wav_bytes))
+    assert client.put(f'/upload/{upload_id}?offset=0', data=corrupted, headers=good_checksum).status_code == 400
+    assert client.get(f'/upload/{upload_id}', headers=headers).get_json()['missing_chunks'] == []
+
+    response = client.post(f'/upload/{upload_id}/complete', json={'sha256': hashlib.sha256(wav_bytes).hexdigest()},
+                           headers=headers)
+    assert response.status_code == 200
+    assert wait_completed(client, response.get_json()['task_id'])['status'] == 'completed'
+
+
+def test_ready_reports_model_state(server, client, monkeypatch):
+    assert client.get('/ready').get_json()['ready'] is True
+    assert client.get('/health').get_json()['ready'] is True
+
+    broken = InProcessModel('missing-backend', 'cpu', warm_up_lengths=[])
+    broken.start()
+    broken._loaded.wait(10)
+    monkeypatch.setattr(server, 'model', broken)
+
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert 'missing-backend' in response.get_json()['load_error']
+    # 存活检查不受模型状态影响
+    assert client.get('/health').status_code == 200
+
+
+def test_long_audio_is_split_into_timed_segments(server, client, monkeypatch, tmp_path):
+    monkeypatch.setitem(server.app.config, 'SPLIT_LONG_AUDIO', True)
+    monkeypatch.setitem(server.app.config, 'LONG_AUDIO_SECONDS', 5)
+    monkeypatch.setitem(server.app.config, 'SPLIT_CHUNK_SECONDS', 5)
+    path = tmp_path / 'long.wav'
+    write_wav(str(path), synthetic_speech(20, seed=2))
+    long_wav = path.read_bytes()
+
+    task_id = recognize(client, long_wav, is_final='true', language='ja').get_json()['task_id']
+    status = wait_completed(client, task_id)
+    assert status['status'] == 'completed'
+    segments = status['segments']
+    assert len(segments) > 1
+    assert all(a['end'] <= b['start'] for a, b in zip(segments, segments[1:]))
+    assert status['result'] == ''.join(segment['text'] for segment in segments)
+
+    # 切分结果连同时间段一起进入结果缓存
+    cached = recognize(client, long_wav, is_final='true', language='ja').get_json()
+    assert cached['cached'] is True
+    assert cached['segments'] == segments
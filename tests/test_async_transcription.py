@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+import pytest
+
+web = pytest.importorskip('aiohttp.web')
+
+from async_transcription import AsyncTranscriptionManager
+
+
+class StubServer:
+    """
+    替身识别服务器：前 busy 次上传返回 429，任务在 SSE 中 done_after 秒后完成；
+    done_after 为 None 时任务一直处于处理中
+    """
+
+    def __init__(self, busy=0, done_after=0.0, status_code=200):
+        self.busy = busy
+        self.done_after = done_after
+        self.status_code = status_code
+        self.uploads = 0
+
+    async def recognize(self, request):
+        await request.post()
+        self.uploads += 1
+        if self.uploads <= self.busy:
+            return web.json_response({'error': 'busy'}, status=429, headers={'Retry-After': '0'})
+        return web.json_response({'task_id': str(self.uploads), 'status': 'queued'})
+
+    def status_payload(self, task_id):
+        return {'task_id': task_id, 'status': 'completed', 'result': f'transcript {task_id}'}
+
+    async def events(self, request):
+        if self.done_after is None:
+            return web.json_response({'error': 'no events'}, status=404)
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        await asyncio.sleep(self.done_after)
+        await response.write(f"data: {json.dumps(self.status_payload(request.match_info['task_id']))}\n\n".encode())
+        return response
+
+    async def status(self, request):
+        if self.status_code != 200:
+            return web.json_response({'error': 'denied'}, status=self.status_code)
+        await asyncio.sleep(0.05)
+        return web.json_response({'task_id': request.match_info['task_id'], 'status': 'processing'})
+
+    async def run(self, body, **manager_args):
+        """启动服务器，在 AsyncTranscriptionManager 上下文中执行 body(manager)"""
+        app = web.Application()
+        app.add_routes([
+            web.post('/recognize', self.recognize),
+            web.get('/status/{task_id}/events', self.events),
+            web.get('/status/{task_id}', self.status),
+        ])
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        try:
+            async with AsyncTranscriptionManager('key', url, upload_encoding='wav', **manager_args) as manager:
+                return await body(manager)
+        finally:
+            await runner.cleanup()
+
+
+@pytest.fixture
+def audio_files(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'lecture_{i}.wav'
+        path.write_bytes(b'RIFF' + bytes([i]) * 1024)
+        paths.append(str(path))
+    return paths
+
+
+async def collect(manager, paths):
+    return [result async for result in manager.process_files(paths, summarize=False)]
+
+
+def test_batch_waits_out_backpressure(audio_files):
+    server = StubServer(busy=2)
+    results = asyncio.run(server.run(lambda manager: collect(manager, audio_files)))
+
+    assert sorted(result.status for result in results) == ['completed'] * 3
+    assert all(result.transcript.startswith('transcript ') for result in results)
+    assert server.uploads == 5
+
+
+def test_upload_gives_up_after_max_attempts(audio_files):
+    server = StubServer(busy=100)
+    results = asyncio.run(server.run(lambda manager: collect(manager, audio_files[:1]), max_submit_attempts=3))
+
+    result, = results
+    assert result.status == 'failed'
+    assert audio_files[0] in result.error
+    assert server.uploads == 3
+
+
+def test_task_wait_is_bounded(audio_files):
+    server = StubServer(done_after=None)
+    result, = asyncio.run(server.run(lambda manager: collect(manager, audio_files[:1]), task_timeout=0.5))
+
+    assert result.status == 'failed'
+    assert 'did not finish' in result.error
+
+
+def test_status_client_errors_are_not_retried(audio_files):
+    server = StubServer(done_after=None, status_code=403)
+    result, = asyncio.run(server.run(lambda manager: collect(manager, audio_files[:1]), task_timeout=5))
+
+    assert result.status == 'failed'
+    assert 'denied' in result.error
+
+
+def test_cached_transcripts_skip_the_server(audio_files, tmp_path):
+    server = StubServer()
+    cache_dir = str(tmp_path / 'cache')
+    asyncio.run(server.run(lambda manager: collect(manager, audio_files), cache_dir=cache_dir))
+    results = asyncio.run(server.run(lambda manager: collect(manager, audio_files), cache_dir=cache_dir))
+
+    assert all(result.cached for result in results)
+    assert server.uploads == 3
@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+import pytest
+
+from tests.test_mov_support import needs_ffmpeg
+from util.audio_codec import transcode_for_upload
+from util.model_backend import synthetic_speech, write_wav
+from util.mov_support import audio_duration, iter_audio_pcm
+
+
+@pytest.fixture
+def speech_wav(tmp_path):
+    path = str(tmp_path / 'speech.wav')
+    write_wav(path, synthetic_speech(3, seed=2))
+    return path
+
+
+@needs_ffmpeg
+def test_flac_upload_is_lossless(speech_wav):
+    flac_path = transcode_for_upload(speech_wav, 'flac')
+    try:
+        assert flac_path.endswith('.flac')
+        assert os.path.getsize(flac_path) < os.path.getsize(speech_wav)
+        assert b''.join(iter_audio_pcm(flac_path)) == b''.join(iter_audio_pcm(speech_wav))
+    finally:
+        os.remove(flac_path)
+
+
+@needs_ffmpeg
+def test_opus_upload_keeps_duration(speech_wav):
+    try:
+        opus_path = transcode_for_upload(speech_wav, 'opus')
+    except RuntimeError as e:
+        pytest.skip(f"ffmpeg 不支持 libopus: {e}")
+    try:
+        assert opus_path.endswith('.ogg')
+        assert audio_duration(opus_path) == pytest.approx(3.0, abs=0.1)
+    finally:
+        os.remove(opus_path)
+
+
+@needs_ffmpeg
+def test_failed_transcode_leaves_no_file(tmp_path, monkeypatch):
+    broken = tmp_path / 'broken.wav'
+    broken.write_bytes(b'not audio')
+    temp_dir = tmp_path / 'tmp'
+    temp_dir.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(temp_dir))
+
+    with pytest.raises(RuntimeError):
+        transcode_for_upload(str(broken), 'flac')
+    assert os.listdir(temp_dir) == []
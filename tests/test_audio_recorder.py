@@ -0,0 +1,129 @@
+import os
+import struct
+import threading
+import time
+import wave
+
+import numpy as np
+import pytest
+
+RATE = 16000
+CHUNK = 1600  # 100ms
+
+
+def pcm_chunk(index):
+    """每块内容不同的合成 16-bit PCM，便于核对写入顺序"""
+    t = (np.arange(CHUNK) + index * CHUNK) / RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t) * 32767).astype(np.int16).tobytes()
+
+
+def record(recorder, chunks):
+    recorder.start_recording()
+    callback = recorder.p.streams[-1].callback
+    for data in chunks:
+        assert callback(data, CHUNK, {}, 0) == (None, 0)
+    return recorder.stop_recording()
+
+
+def test_ring_is_bounded_and_file_holds_every_frame(audio_transcription):
+    recorder = audio_transcription.AudioRecorder(rate=RATE, chunk=CHUNK, ring_seconds=1, trim_silence=False)
+    chunks = [pcm_chunk(i) for i in range(50)]
+    path = record(recorder, chunks)
+    try:
+        # 内存中只保留最近 1 秒
+        assert recorder.frames.maxlen == RATE // CHUNK
+        assert recorder.recent_audio() == b''.join(chunks[-10:])
+        assert recorder.frames_written == 50 * CHUNK
+
+        with wave.open(path, 'rb') as wav:
+            assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, 2, RATE)
+            assert wav.getnframes() == 50 * CHUNK
+            assert wav.readframes(wav.getnframes()) == b''.join(chunks)
+    finally:
+        os.remove(path)
+
+
+def test_wav_header_sizes_are_patched_on_stop(audio_transcription):
+    recorder = audio_transcription.AudioRecorder(rate=RATE, chunk=CHUNK, trim_silence=False)
+    path = record(recorder, [pcm_chunk(i) for i in range(7)])
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(44)
+        data_bytes = 7 * CHUNK * 2
+        assert header[:4] == b'RIFF' and header[36:40] == b'data'
+        assert struct.unpack('<I', header[4:8])[0] == os.path.getsize(path) - 8
+        assert struct.unpack('<I', header[40:44])[0] == data_bytes
+        assert os.path.getsize(path) == 44 + data_bytes
+    finally:
+        os.remove(path)
+
+
+def test_write_loop_drains_queue_into_file_and_upload_copy(audio_transcription, tmp_path):
+    recorder = audio_transcription.AudioRecorder(rate=RATE, chunk=CHUNK, trim_silence=False)
+    recorder._wav = recorder._open_wav(str(tmp_path / 'raw.wav'))
+    received = []
+    recorder._on_chunk = received.append
+
+    chunks = [pcm_chunk(i) for i in range(5)]
+    for data in chunks:
+        recorder._capture_callback(data, CHUNK, {}, 0)
+    recorder._pending.put(None)
+    recorder._write_loop()
+    recorder._wav.close()
+
+    assert received == chunks
+    with wave.open(str(tmp_path / 'raw.wav'), 'rb') as wav:
+        assert wav.readframes(wav.getnframes()) == b''.join(chunks)
+
+
+def test_full_queue_drops_chunks_without_blocking(audio_transcription):
+    pyaudio = audio_transcription.pyaudio
+    recorder = audio_transcription.AudioRecorder(rate=RATE, chunk=CHUNK, max_pending_chunks=4, trim_silence=False)
+    data = pcm_chunk(0)
+
+    # 没有写线程消费，队列满后每次回调都立即返回并计为丢弃
+    for _ in range(4):
+        assert recorder._capture_callback(data, CHUNK, {}, 0) == (None, pyaudio.paContinue)
+    started = time.perf_counter()
+    for _ in range(1000):
+        assert recorder._capture_callback(data, CHUNK, {}, 0) == (None, pyaudio.paContinue)
+    assert time.perf_counter() - started < 0.5
+
+    stats = recorder.capture_stats()
+    assert stats['dropped_chunks'] == 1000
+    assert stats['pending_chunks'] == 4
+
+
+def test_status_flags_are_counted(audio_transcription):
+    pyaudio = audio_transcription.pyaudio
+    recorder = audio_transcription.AudioRecorder(rate=RATE, chunk=CHUNK, trim_silence=False)
+    data = pcm_chunk(0)
+    recorder._capture_callback(data, CHUNK, {}, pyaudio.paInputOverflow)
+    recorder._capture_callback(data, CHUNK, {}, pyaudio.paInputOverflow | pyaudio.paInputUnderflow)
+    recorder._capture_callback(data, CHUNK, {}, 0)
+    assert (recorder.overflows, recorder.underruns, recorder.dropped_chunks) == (2, 1, 0)
+
+
+def test_slow_consumer_drops_chunks_but_keeps_accepted_ones(audio_transcription):
+    recorder = audio_transcription.AudioRecorder(rate=RATE, chunk=CHUNK, max_pending_chunks=3, trim_silence=False)
+    release = threading.Event()
+    recorder.start_recording(on_chunk=lambda data: release.wait(5))
+    callback = recorder.p.streams[-1].callback
+
+    # 写线程卡在消费者上时，回调照常返回，超出队列上限的块被丢弃
+    started = time.perf_counter()
+    for i in range(20):
+        callback(pcm_chunk(i), CHUNK, {}, 0)
+    assert time.perf_counter() - started < 0.5
+    release.set()
+    path = recorder.stop_recording()
+    try:
+        stats = recorder.capture_stats()
+        accepted = 20 - stats['dropped_chunks']
+        assert stats['dropped_chunks'] > 0
+        assert stats['pending_chunks'] == 0
+        assert recorder.frames_written == accepted * CHUNK
+        with wave.open(path, 'rb') as wav:
+            assert wav.getnframes() == accepted * CHUNK
+    finally:
+        os.remove(path)
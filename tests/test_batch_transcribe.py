@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from batch_transcribe import find_media, main, output_paths
+
+
+@pytest.fixture
+def recordings(tmp_path):
+    root = tmp_path / 'lectures'
+    (root / 'week1').mkdir(parents=True)
+    for name in ['week1/a.wav', 'week1/b.MP4', 'c.flac', 'notes.txt']:
+        (root / name).write_bytes(b'data')
+    return root
+
+
+def test_find_media_filters_and_sorts(recordings):
+    files = find_media([str(recordings), str(recordings / 'c.flac'), str(recordings / 'missing')],
+                       {'.wav', '.mp4', '.flac'})
+    assert [path.relative_to(recordings).as_posix() for path in files] == ['c.flac', 'week1/a.wav', 'week1/b.MP4']
+
+
+def test_output_paths_mirror_input_folders(recordings, tmp_path):
+    output_dir = tmp_path / 'out'
+    transcript, summary = output_paths(recordings / 'week1' / 'a.wav', [recordings], output_dir)
+    assert transcript == output_dir / 'lectures' / 'week1' / 'a.txt'
+    assert summary == output_dir / 'lectures' / 'week1' / 'a.summary.md'
+    # 单独给出的文件直接放在输出目录下
+    assert output_paths(Path('/elsewhere/x.wav'), [recordings], output_dir)[0] == output_dir / 'x.txt'
+
+
+def test_main_requires_keys(recordings, monkeypatch):
+    monkeypatch.delenv('SPEECH_API_KEY', raising=False)
+    monkeypatch.delenv('DEEPSEEK_API_KEY', raising=False)
+    assert main([str(recordings)]) == 2
+    assert main([str(recordings), '--speech-key', 'k']) == 2
+
+
+def test_existing_outputs_are_skipped(recordings, tmp_path):
+    output_dir = tmp_path / 'out'
+    for media in find_media([str(recordings)], {'.wav', '.mp4', '.flac'}):
+        transcript, _ = output_paths(media, [recordings.resolve()], output_dir)
+        transcript.parent.mkdir(parents=True, exist_ok=True)
+        transcript.write_text('done', encoding='utf-8')
+
+    # 输出都已存在时不连接服务器
+    assert main([str(recordings), '--speech-key', 'k', '--no-summary', '--output-dir', str(output_dir),
+                 '--speech-url', 'http://127.0.0.1:9']) == 0
+    records = [json.loads(line) for line in (output_dir / 'manifest.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert len(records) == 3
+    assert {record['status'] for record in records} == {'skipped'}
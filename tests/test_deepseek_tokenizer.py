@@ -0,0 +1,55 @@
+from util.deepseek_v3_tokenizer.deepseek_tokenizer import TokenizerService, estimate_tokens
+
+
+class FakeTokenizer:
+    """按空格分词、默认加 BOS 的替身 tokenizer，记录每次批量编码的文本"""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, text, add_special_tokens=True):
+        return (['<bos>'] if add_special_tokens else []) + text.split()
+
+    def __call__(self, texts, add_special_tokens=True):
+        self.batches.append(list(texts))
+        return {'input_ids': [self.encode(text, add_special_tokens) for text in texts]}
+
+
+class FakeService(TokenizerService):
+    def _load(self):
+        self._tokenizer = FakeTokenizer()
+        self.ready.set()
+
+
+def test_estimate_tokens_weights_cjk_higher():
+    assert estimate_tokens('傅里叶变换') > estimate_tokens('abcde')
+
+
+def test_counts_are_batched_and_cached():
+    service = FakeService()
+    assert service.count_tokens(['a b', 'c', 'a b'], wait=5) == [3, 2, 3]
+    # 重复文本只编码一次，已缓存的文本不再编码
+    assert service.count_tokens(['c', 'd e f'], wait=5) == [2, 4]
+    assert service._tokenizer.batches == [['a b', 'c'], ['d e f']]
+
+
+def test_counts_match_encode_including_special_tokens():
+    service = FakeService()
+    text = 'Hello there !'
+    assert service.count(text, wait=5) == len(service._tokenizer.encode(text)) == 4
+
+
+def test_cache_is_bounded():
+    service = FakeService(max_entries=2)
+    service.count_tokens(['a', 'b', 'c'], wait=5)
+    service.count_tokens(['a'], wait=5)
+    assert service._tokenizer.batches[-1] == ['a']
+    assert len(service._counts) == 2
+
+
+def test_falls_back_to_estimate_when_loading_fails(tmp_path):
+    service = TokenizerService(tokenizer_dir=str(tmp_path))
+    text = '今天讲傅里叶变换 and Fourier transforms'
+    assert service.count(text, wait=30) == estimate_tokens(text)
+    assert service.ready.is_set()
+    assert service.load_error is not None
@@ -0,0 +1,86 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from util.http_client import LatencyHistogram, PooledSession
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    histogram = LatencyHistogram(buckets_ms=[10, 100])
+    for seconds in [0.005] * 90 + [0.05] * 9 + [0.5]:
+        histogram.record('GET /status/<id>', seconds)
+    histogram.record('GET /status/<id>', 0.2, error=True)
+
+    stats = histogram.stats()['GET /status/<id>']
+    assert stats['count'] == 101
+    assert stats['errors'] == 1
+    assert stats['p50_ms'] == 10
+    assert stats['p95_ms'] == 100
+    assert stats['p99_ms'] == float('inf')
+    assert stats['histogram'] == {'<=10ms': 90, '<=100ms': 9, '>100ms': 2}
+
+
+@pytest.fixture
+def server():
+    """本地服务器：前 state["fail"] 个请求返回 503，记录请求次数与连接数"""
+    state = {'requests': 0, 'connections': 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            state['connections'] += 1
+
+        def _reply(self):
+            state['requests'] += 1
+            status = 503 if state['requests'] <= state.get('fail', 0) else 200
+            body = b'{}'
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = _reply
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self._reply()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}", state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connections_are_reused_and_endpoints_grouped(server):
+    url, state = server
+    session = PooledSession()
+    for task_id in ['0b9e7c1e-4a5f-4c39-9a57-1f3c2d4e5f60', '7d1c2b3a-0000-4c39-9a57-1f3c2d4e5f61']:
+        assert session.get(f"{url}/status/{task_id}").status_code == 200
+    assert state['connections'] == 1
+    assert session.latency_stats()['GET /status/<id>']['count'] == 2
+
+
+def test_idempotent_requests_are_retried(server):
+    url, state = server
+    state['fail'] = 2
+    session = PooledSession(backoff=0)
+    assert session.get(f"{url}/status/x").status_code == 200
+    assert state['requests'] == 3
+
+
+def test_post_is_not_retried(server):
+    url, state = server
+    state['fail'] = 2
+    session = PooledSession(backoff=0)
+    response = session.post(f"{url}/recognize", data=b'audio')
+    assert response.status_code == 503
+    assert state['requests'] == 1
+    assert session.latency_stats()['POST /recognize']['errors'] == 1
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from util.inference_pool import InferencePool, QueueFullError
+
+
+def test_submit_raises_when_queue_is_full():
+    pool = InferencePool(lambda: None, num_workers=2, max_queue_size=2)
+    pool.submit('a', ())
+    pool.submit('b', ())
+
+    with pytest.raises(QueueFullError) as excinfo:
+        pool.submit('c', ())
+    assert excinfo.value.retry_after >= 1
+    assert pool.is_full()
+
+    # 重启恢复的任务不受队列上限限制
+    pool.submit('d', (), force=True)
+    assert pool.stats()['queued'] == 3
+
+
+def test_retry_after_grows_with_queue_length():
+    pool = InferencePool(lambda: None, num_workers=1, max_queue_size=8)
+    empty = pool.retry_after()
+    for i in range(4):
+        pool.submit(str(i), ())
+    assert pool.retry_after() > empty
+
+
+def test_final_tasks_run_before_interim():
+    done = []
+    finished = threading.Event()
+
+    def handler(name):
+        done.append(name)
+        if len(done) == 3:
+            finished.set()
+
+    pool = InferencePool(handler, num_workers=1, max_queue_size=8)
+    pool.submit('interim-0', ('interim-0',))
+    pool.submit('interim-1', ('interim-1',))
+    pool.submit('final', ('final',), is_final=True)
+    assert pool.position('final') == 1
+    assert pool.position('interim-1') == 3
+    assert pool.position('missing') is None
+
+    pool.start()
+    assert finished.wait(5)
+    pool.stop()
+    assert done == ['final', 'interim-0', 'interim-1']
+
+
+def test_handler_errors_do_not_stop_workers():
+    done = threading.Event()
+
+    def handler(fail):
+        if fail:
+            raise RuntimeError("boom")
+        done.set()
+
+    pool = InferencePool(handler, num_workers=1)
+    pool.start()
+    pool.submit('bad', (True,))
+    pool.submit('good', (False,))
+    assert done.wait(5)
+    pool.stop()
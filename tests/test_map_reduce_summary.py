@@ -0,0 +1,98 @@
+import threading
+from types import SimpleNamespace
+
+from util.map_reduce_summary import MAP_PROMPT, REDUCE_MESSAGE, MapReduceSummarizer, split_transcript
+
+
+def count_chars(texts):
+    """测试用计数：每个字符算 1 个 token"""
+    return [len(text) for text in texts]
+
+
+class FakeLLM:
+    """记录请求的 OpenAI 兼容替身：非流式请求返回 reply(content)，流式请求分两块返回"""
+
+    def __init__(self, reply=lambda content: f"笔记{len(content)}。"):
+        self.reply = reply
+        self.calls = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, stream):
+        with self._lock:
+            self.calls.append((messages[0]['content'], messages[1]['content'], stream))
+        content = self.reply(messages[1]['content'])
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        half = len(content) // 2
+        return iter(SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+                    for piece in [content[:half], content[half:]])
+
+    def map_calls(self):
+        return [call for call in self.calls if not call[2]]
+
+
+def test_split_respects_token_budget_and_sentences():
+    text = "第一句话讲定义。" * 30 + "第二部分讲公式！" * 30
+    chunks = split_transcript(text, 50, count_chars)
+
+    assert ''.join(chunks) == text
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert all(chunk.endswith(('。', '！')) for chunk in chunks)
+
+
+def test_split_hard_cuts_overlong_sentence():
+    text = "没有标点的超长句子" * 20 + "。短句。"
+    chunks = split_transcript(text, 40, count_chars)
+
+    assert ''.join(chunks) == text
+    assert all(len(chunk) <= 40 for chunk in chunks)
+
+
+def test_short_transcript_is_summarized_in_one_call():
+    llm = FakeLLM(reply=lambda content: "总结")
+    summary = ''.join(MapReduceSummarizer(llm, chunk_tokens=1000, count_tokens=count_chars)
+                      .summarize("很短的转录。", instruction="提示词"))
+
+    assert summary == "总结"
+    assert len(llm.calls) == 1
+    system_prompt, user_content, stream = llm.calls[0]
+    assert system_prompt == "提示词"
+    assert "很短的转录。" in user_content
+    assert stream
+
+
+def test_long_transcript_is_mapped_within_budget():
+    text = "".join(f"第{i:03d}句讲一个知识点。" for i in range(200))
+    progress = []
+    llm = FakeLLM()
+    summarizer = MapReduceSummarizer(llm, chunk_tokens=300, max_workers=3, count_tokens=count_chars)
+    summary = ''.join(summarizer.summarize(text, on_progress=lambda done, total: progress.append((done, total))))
+
+    chunks = split_transcript(text, 300, count_chars)
+    map_calls = llm.map_calls()
+    assert len(map_calls) == len(chunks) > 1
+    assert all(len(user_content) <= 300 for _, user_content, _ in map_calls)
+    assert {system_prompt for system_prompt, _, _ in map_calls} == {
+        MAP_PROMPT.format(index=i + 1, total=len(chunks)) for i in range(len(chunks))}
+    assert progress[-1] == (len(chunks), len(chunks))
+
+    # 归并请求按原顺序收到全部笔记
+    _, reduce_content, stream = llm.calls[-1]
+    assert stream
+    notes = [f"笔记{len(chunk)}。" for chunk in chunks]
+    assert '\n\n'.join(notes) in reduce_content
+    assert summary == llm.reply(reduce_content)
+
+
+def test_notes_over_budget_are_merged_again():
+    # 每块笔记和原文一样长，合起来仍超预算，需要再合并一轮
+    llm = FakeLLM(reply=lambda content: content[:60])
+    text = "".join(f"第{i:03d}句讲一个知识点。" for i in range(100))
+    summarizer = MapReduceSummarizer(llm, chunk_tokens=200, count_tokens=count_chars)
+    ''.join(summarizer.summarize(text))
+
+    first_round = len(split_transcript(text, 200, count_chars))
+    assert len(llm.map_calls()) > first_round
+    _, reduce_content, _ = llm.calls[-1]
+    assert len(reduce_content) - len(REDUCE_MESSAGE.format(notes='')) <= 200
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+from util.micro_batcher import MicroBatcher
+
+
+def test_full_batch_flushes_without_waiting_for_window():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait=30)
+    batcher.start()
+    started = time.monotonic()
+    futures = [batcher.submit_future(i) for i in range(4)]
+    assert [future.result(timeout=5) for future in futures] == [0, 2, 4, 6]
+    assert time.monotonic() - started < 5
+    batcher.stop()
+    assert calls == [[0, 1, 2, 3]]
+
+
+def test_partial_batch_flushes_after_window():
+    batcher = MicroBatcher(lambda items: [f"text-{item}" for item in items], max_batch_size=16, max_wait=0.05)
+    batcher.start()
+    futures = [batcher.submit_future(i) for i in range(3)]
+    assert [future.result(timeout=5) for future in futures] == ['text-0', 'text-1', 'text-2']
+    batcher.stop()
+    stats = batcher.stats()
+    assert stats['items'] == 3
+    assert stats['max_batch'] <= 3
+
+
+def test_batch_errors_reach_every_caller():
+    def batch_fn(items):
+        raise ValueError("model failed")
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait=0.01)
+    batcher.start()
+    futures = [batcher.submit_future(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    batcher.stop()
+
+
+def test_result_count_mismatch_is_an_error():
+    batcher = MicroBatcher(lambda items: items[:1], max_batch_size=2, max_wait=0.01)
+    batcher.start()
+    futures = [batcher.submit_future(i) for i in range(2)]
+    with pytest.raises(RuntimeError):
+        futures[1].result(timeout=5)
+    batcher.stop()
+
+
+def test_stop_drains_pending_items_and_rejects_new_ones():
+    release = threading.Event()
+
+    def batch_fn(items):
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=1, max_wait=0)
+    batcher.start()
+    first = batcher.submit_future('first')
+    second = batcher.submit_future('second')
+    release.set()
+    batcher.stop(timeout=5)
+    assert first.result(timeout=1) == 'first'
+    assert second.result(timeout=1) == 'second'
+
+    with pytest.raises(RuntimeError):
+        batcher.submit_future('late').result(timeout=1)
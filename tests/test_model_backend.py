@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from util.model_backend import (StubBackend, create_backend, load_audio, merge_vad_segments, runtime_device_id,
+                                synthetic_speech, warm_up, write_wav)
+
+
+@pytest.fixture
+def stub():
+    return StubBackend('cpu', rtf=0, load_seconds=0)
+
+
+@pytest.fixture
+def speech_wav(tmp_path):
+    path = str(tmp_path / 'speech.wav')
+    write_wav(path, synthetic_speech(20))
+    return path
+
+
+def test_merge_vad_segments_respects_max_length():
+    segments = [[0, 4000], [4500, 9000], [9500, 16000], [16500, 18000]]
+    assert merge_vad_segments(segments) == [[0, 9000], [9500, 18000]]
+    assert merge_vad_segments(segments, max_ms=5000) == [[0, 4000], [4500, 9000], [9500, 16000], [16500, 18000]]
+    assert merge_vad_segments([]) == []
+
+
+def test_runtime_device_id():
+    assert runtime_device_id('cuda:1') == '1'
+    assert runtime_device_id('cpu') == '-1'
+
+
+def test_create_backend_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        create_backend('missing-backend', 'cpu')
+
+
+def test_load_audio_reads_only_the_requested_window(tmp_path):
+    samples = synthetic_speech(3)
+    path = str(tmp_path / 'window.wav')
+    write_wav(path, samples)
+
+    full = load_audio(path)
+    window = load_audio(path, start_ms=1000, end_ms=1500)
+    assert len(full) == len(samples)
+    assert len(window) == 8000
+    np.testing.assert_array_equal(window, full[16000:24000])
+    assert len(load_audio(path, start_ms=5000)) == 0
+
+
+def test_segmented_generate_matches_span_recognition(stub, speech_wav):
+    segments = stub.vad_segments(speech_wav)
+    assert len(segments) > 1
+    units = merge_vad_segments(segments)
+    texts = stub.recognize_span(speech_wav, units, 'auto')
+    assert stub.generate(speech_wav, 'auto') == ''.join(texts)
+    assert all(text.startswith('[') and text.endswith('s]') for text in texts)
+
+
+def test_split_vad_returns_segment_samples(stub, speech_wav):
+    pieces = stub.split_vad(speech_wav)
+    assert [beg for beg, _ in pieces] == [beg for beg, _ in stub.vad_segments(speech_wav)]
+    assert stub.recognize_batch([(np.zeros(16000, dtype=np.float32), 'zh')]) == ['[1.0s]']
+
+
+def test_stream_vad_carries_state_across_chunks(stub):
+    samples = np.zeros(32000, dtype=np.float32)
+    samples[9600:24000] = 0.5
+    cache = {}
+    endpoints = stub.stream_vad(samples[:14400], cache, False, 1000)
+    endpoints += stub.stream_vad(samples[14400:], cache, True, 1000)
+    assert [beg for beg, _ in endpoints if beg != -1] == [600]
+    assert [end for beg, end in endpoints if beg == -1] == [1500]
+    assert not cache['in_speech']
+
+
+def test_warm_up_reports_each_length(stub):
+    timings = warm_up(stub, (1, 2))
+    assert sorted(timings) == ['1s', '2s']
+    assert all(seconds >= 0 for seconds in timings.values())
@@ -0,0 +1,69 @@
+import os
+import signal
+import time
+
+import numpy as np
+import pytest
+
+from util.model_workers import InProcessModel, ModelWorkerPool, WorkerUnavailableError
+
+SEGMENTS = [(np.full(16000, 0.1, dtype=np.float32), 'auto'), (np.full(32000, 0.1, dtype=np.float32), 'zh')]
+
+
+def wait_until(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "等待超时"
+        time.sleep(0.05)
+
+
+def test_in_process_model_reports_load_errors():
+    model = InProcessModel('stub', 'cpu', warm_up_lengths=[])
+    model.start()
+    assert model.recognize_batch(SEGMENTS) == ['[1.0s]', '[2.0s]']
+    assert model.stats()[0]['ready']
+
+    broken = InProcessModel('missing-backend', 'cpu', warm_up_lengths=[])
+    broken.start()
+    with pytest.raises(WorkerUnavailableError):
+        broken.recognize_batch(SEGMENTS)
+    assert broken.ready_count() == 0
+    assert broken.stats()[0]['dead']
+
+
+def test_pool_recovers_from_killed_worker():
+    pool = ModelWorkerPool('stub', ['cpu', 'cpu'], warm_up_lengths=[], restart_backoff=0.1)
+    pool.start()
+    try:
+        assert pool.recognize_batch(SEGMENTS) == ['[1.0s]', '[2.0s]']
+        wait_until(lambda: pool.ready_count() == 2)
+
+        victim = pool.stats()[0]['pid']
+        os.kill(victim, signal.SIGKILL)
+        # 另一个进程继续服务，被杀的进程退避后重启
+        assert pool.recognize_batch(SEGMENTS) == ['[1.0s]', '[2.0s]']
+        wait_until(lambda: pool.ready_count() == 2 and pool.stats()[0]['pid'] != victim)
+        worker = pool.stats()[0]
+        assert worker['restarts'] == 1
+        assert not worker['dead']
+    finally:
+        pool.stop()
+
+
+def test_pool_gives_up_on_worker_that_cannot_load():
+    pool = ModelWorkerPool('missing-backend', ['cpu'], warm_up_lengths=[], max_restarts=1,
+                           restart_backoff=0.1)
+    pool.start()
+    try:
+        wait_until(lambda: pool.stats()[0]['dead'])
+        # 所有设备都不可用时立即失败，不等待加载超时
+        started = time.time()
+        with pytest.raises(WorkerUnavailableError):
+            pool.recognize_batch(SEGMENTS)
+        assert time.time() - started < 1
+
+        worker = pool.stats()[0]
+        assert worker['restarts'] == 1
+        assert 'missing-backend' in worker['load_error']
+    finally:
+        pool.stop()
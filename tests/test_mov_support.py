@@ -0,0 +1,71 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from util.mov_support import audio_duration, extract_audio_from_video, get_ffmpeg_exe, is_pcm_wav, iter_audio_pcm
+
+
+def ffmpeg_available():
+    try:
+        get_ffmpeg_exe()
+        return True
+    except RuntimeError:
+        return False
+
+
+needs_ffmpeg = pytest.mark.skipif(not ffmpeg_available(), reason="需要 ffmpeg")
+
+
+@pytest.fixture
+def stereo_wav(tmp_path):
+    """2 秒 44.1kHz 立体声 WAV，模拟视频里的原始音轨"""
+    path = str(tmp_path / 'stereo.wav')
+    t = np.arange(2 * 44100) / 44100
+    tone = (0.3 * np.sin(2 * np.pi * 440 * t) * 32767).astype(np.int16)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(44100)
+        wav.writeframes(np.repeat(tone, 2).tobytes())
+    return path
+
+
+def test_wav_header_checks(stereo_wav, tmp_path):
+    # 双声道，采样率匹配也不能按帧直接读取
+    assert not is_pcm_wav(stereo_wav, sample_rate=44100)
+    assert audio_duration(stereo_wav) == 2.0
+    assert not is_pcm_wav(str(tmp_path / 'missing.wav'))
+
+
+@needs_ffmpeg
+def test_iter_audio_pcm_resamples_to_mono(stereo_wav):
+    pcm = b''.join(iter_audio_pcm(stereo_wav, chunk_bytes=4096))
+    assert abs(len(pcm) - 2 * 16000 * 2) <= 2 * 160
+
+    window = b''.join(iter_audio_pcm(stereo_wav, start=0.5, duration=1.0))
+    assert abs(len(window) - 16000 * 2) <= 2 * 160
+
+
+@needs_ffmpeg
+def test_extract_audio_writes_16k_mono_wav(stereo_wav, tmp_path):
+    output = str(tmp_path / 'out.wav')
+    assert extract_audio_from_video(stereo_wav, output)
+    assert is_pcm_wav(output)
+    assert audio_duration(output) == pytest.approx(2.0, abs=0.02)
+
+
+@needs_ffmpeg
+def test_extract_audio_respects_size_limit(stereo_wav, tmp_path):
+    output = str(tmp_path / 'out.wav')
+    assert not extract_audio_from_video(stereo_wav, output, max_bytes=16000)
+    assert not os.path.exists(output)
+
+
+@needs_ffmpeg
+def test_iter_audio_pcm_reports_ffmpeg_errors(tmp_path):
+    broken = tmp_path / 'broken.mp4'
+    broken.write_bytes(b'not a video')
+    with pytest.raises(RuntimeError):
+        list(iter_audio_pcm(str(broken)))
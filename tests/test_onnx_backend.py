@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip('onnx')
+onnxruntime = pytest.importorskip('onnxruntime')
+
+from onnx import TensorProto, helper, numpy_helper  # noqa: E402
+
+from util.model_backend import BACKENDS, ONNXBackend, ONNXInt8Backend  # noqa: E402
+
+
+def write_matmul_model(path):
+    """只含一个 MatMul 的小模型，代替 SenseVoice 的 model.onnx"""
+    weight = numpy_helper.from_array(np.random.default_rng(0).normal(size=(64, 64)).astype(np.float32), 'weight')
+    graph = helper.make_graph(
+        [helper.make_node('MatMul', ['input', 'weight'], ['output'])], 'matmul',
+        [helper.make_tensor_value_info('input', TensorProto.FLOAT, [None, 64])],
+        [helper.make_tensor_value_info('output', TensorProto.FLOAT, [None, 64])],
+        initializer=[weight])
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)], ir_version=8), path)
+
+
+def test_onnx_backends_are_registered():
+    assert BACKENDS['onnx'] is ONNXBackend
+    assert BACKENDS['onnx-int8'] is ONNXInt8Backend
+    assert ONNXInt8Backend.QUANTIZE and not ONNXBackend.QUANTIZE
+    assert ONNXBackend.SIGNATURE != ONNXInt8Backend.SIGNATURE
+
+
+def test_quantize_writes_int8_model_once(tmp_path):
+    pytest.importorskip('onnxruntime.quantization')
+    write_matmul_model(str(tmp_path / 'model.onnx'))
+
+    ONNXBackend._quantize(str(tmp_path))
+    int8_path = tmp_path / 'model_quant.onnx'
+    assert int8_path.exists()
+    assert os.path.getsize(int8_path) < os.path.getsize(tmp_path / 'model.onnx')
+
+    # 已存在的量化模型不会被覆盖
+    mtime = os.path.getmtime(int8_path)
+    ONNXBackend._quantize(str(tmp_path))
+    assert os.path.getmtime(int8_path) == mtime
+
+
+def test_resolve_model_dir_keeps_local_directory(tmp_path):
+    assert ONNXBackend._resolve_model_dir(str(tmp_path)) == str(tmp_path)
+
+
+def test_set_inter_op_threads_rebuilds_session(tmp_path):
+    model_path = str(tmp_path / 'model.onnx')
+    write_matmul_model(model_path)
+
+    class OrtInfer:
+        """与 funasr_onnx 的 OrtInferSession 相同的会话选项"""
+
+        def __init__(self):
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = 1
+            options.log_severity_level = 4
+            options.enable_cpu_mem_arena = False
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = onnxruntime.InferenceSession(model_path, sess_options=options,
+                                                        providers=['CPUExecutionProvider'])
+
+    backend = object.__new__(ONNXBackend)
+    backend.model_path = model_path
+    backend.intra_op_threads = 1
+    backend.inter_op_threads = 2
+    ort_infer = OrtInfer()
+    previous = ort_infer.session
+    backend._set_inter_op_threads(ort_infer)
+
+    assert ort_infer.session is not previous
+    assert ort_infer.session.get_providers() == previous.get_providers()
+    # 只改 inter-op 线程数与执行模式，其余选项沿用原会话
+    options = ort_infer.session.get_session_options()
+    assert options.inter_op_num_threads == 2
+    assert options.execution_mode == onnxruntime.ExecutionMode.ORT_PARALLEL
+    assert options.enable_cpu_mem_arena is False
+    assert options.intra_op_num_threads == 1
+    assert options.log_severity_level == 4
+    assert options.graph_optimization_level == onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    inputs = {'input': np.ones((2, 64), dtype=np.float32)}
+    np.testing.assert_allclose(ort_infer.session.run(None, inputs)[0], previous.run(None, inputs)[0], rtol=1e-5)
@@ -0,0 +1,70 @@
+import os
+
+from util.result_cache import ResultCache
+
+# 每个条目约 115 字节，上限 300 字节时最多容纳两个条目
+PAYLOAD_TEXT = 'x' * 100
+
+
+def payload(name):
+    return {'result': name + PAYLOAD_TEXT}
+
+
+def test_make_key_depends_on_every_param():
+    key = ResultCache.make_key('hash', 'zh', 'full', 'sig')
+    assert key == ResultCache.make_key('hash', 'zh', 'full', 'sig')
+    assert key != ResultCache.make_key('hash', 'en', 'full', 'sig')
+    assert key != ResultCache.make_key('hash', 'zh', 'full', 'sig2')
+
+
+def test_round_trip_keeps_segments(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    entry = {'result': '你好世界', 'segments': [{'start': 0, 'end': 1200, 'text': '你好世界'}]}
+    cache.put('a', entry)
+    assert cache.get('a') == entry
+    assert cache.get('missing') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=300)
+    cache.put('a', payload('a'))
+    cache.put('b', payload('b'))
+    assert cache.get('a') is not None  # a 变为最近使用
+
+    cache.put('c', payload('c'))
+    assert cache.get('b') is None
+    assert cache.get('a') == payload('a')
+    assert cache.get('c') == payload('c')
+    assert not os.path.exists(tmp_path / 'b.json')
+    assert cache.stats()['bytes'] <= 300
+
+
+def test_oversized_entry_is_not_cached(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=50)
+    cache.put('a', payload('a'))
+    assert cache.get('a') is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_restart_restores_entries_in_lru_order(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=300)
+    cache.put('a', payload('a'))
+    cache.put('b', payload('b'))
+    os.utime(tmp_path / 'a.json', (2000, 2000))
+    os.utime(tmp_path / 'b.json', (1000, 1000))
+
+    reopened = ResultCache(str(tmp_path), max_bytes=300)
+    assert reopened.stats()['entries'] == 2
+    reopened.put('c', payload('c'))
+    assert reopened.get('b') is None
+    assert reopened.get('a') == payload('a')
+
+
+def test_missing_file_counts_as_miss(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put('a', payload('a'))
+    os.remove(tmp_path / 'a.json')
+    assert cache.get('a') is None
+    assert cache.stats() == dict(cache.stats(), hits=0, misses=1, entries=0, bytes=0)
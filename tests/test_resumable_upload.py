@@ -0,0 +1,88 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from util.resumable_upload import ChunkError, ResumableUpload
+
+CHUNK = 1024
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def data():
+    return os.urandom(2 * CHUNK + 100)
+
+
+@pytest.fixture
+def upload(tmp_path, data):
+    return ResumableUpload('u', str(tmp_path / 'audio.wav'), len(data), CHUNK, language='zh')
+
+
+def put(upload, data, index, checksum=None):
+    chunk = data[index * CHUNK:(index + 1) * CHUNK]
+    upload.write_chunk(index * CHUNK, io.BytesIO(chunk), checksum or sha256(chunk))
+
+
+def test_chunks_in_any_order_assemble_the_file(upload, data):
+    assert upload.num_chunks == 3
+    for index in [2, 0, 1]:
+        put(upload, data, index)
+
+    assert upload.status()['next_offset'] == len(data)
+    assert upload.finalize() == sha256(data)
+    with open(upload.file_path, 'rb') as f:
+        assert f.read() == data
+    assert not os.path.exists(upload.part_path)
+
+
+def test_checksum_mismatch_rejects_chunk(upload, data):
+    with pytest.raises(ChunkError):
+        put(upload, data, 0, checksum=sha256(b'other'))
+    assert upload.missing() == [0, 1, 2]
+
+    # 校验失败的块可以原样重传
+    put(upload, data, 0)
+    put(upload, data, 2)
+    status = upload.status()
+    assert status['missing_chunks'] == [1]
+    assert status['next_offset'] == CHUNK
+
+
+def test_bad_retry_keeps_accepted_chunk(upload, data):
+    for index in range(3):
+        put(upload, data, index)
+
+    # 已确认的块再次收到校验失败的副本，原数据不被覆盖
+    bad = os.urandom(CHUNK)
+    with pytest.raises(ChunkError):
+        upload.write_chunk(0, io.BytesIO(bad), sha256(data[:CHUNK]))
+    assert upload.missing() == []
+    assert upload.finalize() == sha256(data)
+
+
+def test_chunk_length_must_match(upload, data):
+    short = data[:CHUNK - 1]
+    with pytest.raises(ChunkError):
+        upload.write_chunk(0, io.BytesIO(short), sha256(short))
+    long = data[:CHUNK + 1]
+    with pytest.raises(ChunkError):
+        upload.write_chunk(0, io.BytesIO(long), sha256(long))
+
+
+@pytest.mark.parametrize('offset', [-1, 10, 3 * CHUNK])
+def test_offset_must_be_aligned_and_in_range(upload, offset):
+    with pytest.raises(ChunkError):
+        upload.write_chunk(offset, io.BytesIO(b''), sha256(b''))
+
+
+def test_finalize_requires_every_chunk(upload, data):
+    put(upload, data, 0)
+    with pytest.raises(ChunkError):
+        upload.finalize()
+    upload.discard()
+    assert not os.path.exists(upload.part_path)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from util.silence_trimmer import SilenceTrimmer
+
+RATE = 16000
+
+
+def lecture(*parts):
+    """按 (是否说话, 秒数) 拼接合成录音：说话段为调制正弦波，停顿段只有 -60dB 底噪"""
+    rng = np.random.default_rng(0)
+    audio = []
+    for speaking, seconds in parts:
+        t = np.arange(int(seconds * RATE)) / RATE
+        audio.append(0.3 * np.sin(2 * np.pi * 180 * t) if speaking else np.zeros(len(t)))
+    audio = np.concatenate(audio) + rng.normal(0, 0.001, sum(len(part) for part in audio))
+    return (np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def trim(trimmer, pcm, chunk_bytes=4096 * 2):
+    return b''.join(trimmer.process(pcm[i:i + chunk_bytes]) for i in range(0, len(pcm), chunk_bytes)) + trimmer.flush()
+
+
+@pytest.fixture
+def trimmed():
+    trimmer = SilenceTrimmer(RATE)
+    pcm = trim(trimmer, lecture((False, 1), (True, 2), (False, 5), (True, 2), (False, 1)))
+    return trimmer, pcm
+
+
+def test_long_pauses_are_shortened_to_padding(trimmed):
+    trimmer, pcm = trimmed
+    # 两段 2 秒语音，每段前后各保留 300ms 静音
+    assert len(pcm) / 2 / RATE == pytest.approx(5.2, abs=0.1)
+    stats = trimmer.stats()
+    assert stats['input_seconds'] == pytest.approx(11.0, abs=0.05)
+    assert stats['bytes_saved'] == (trimmer.input_frames - trimmer.output_frames) * trimmer.frame_samples * 2
+
+
+@pytest.mark.parametrize('trimmed_ms, original_ms', [
+    (0, 700),        # 开头只保留语音前 300ms
+    (1300, 2000),    # 第一段语音中
+    (2500, 3200),    # 第一段语音后保留的 300ms 静音
+    (2750, 7850),    # 第二段语音前保留的 300ms 静音
+    (3900, 9000),    # 第二段语音中
+])
+def test_trimmed_time_maps_back_to_recording(trimmed, trimmed_ms, original_ms):
+    trimmer, _ = trimmed
+    assert trimmer.to_original_ms(trimmed_ms) == pytest.approx(original_ms, abs=90)
+
+
+def test_continuous_speech_is_kept_whole():
+    trimmer = SilenceTrimmer(RATE)
+    pcm = lecture((False, 0.5), (True, 3))
+    out = trim(trimmer, pcm)
+    assert len(out) >= len(pcm) - 2 * RATE * 0.2
+    assert trimmer.to_original_ms(1000) == pytest.approx(1200, abs=90)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from util.stream_session import SessionClosedError, StreamSession
+
+ONE_SECOND = np.zeros(16000, dtype=np.int16).tobytes()
+
+
+def scripted_vad(*outputs):
+    """按调用顺序返回预设端点的 VAD，用完后不再输出端点"""
+    outputs = list(outputs)
+    return lambda samples, is_final: outputs.pop(0) if outputs else []
+
+
+def recognize_length(samples, language, callback):
+    """同步回调识别的采样数，便于核对送去识别的音频范围"""
+    callback(str(len(samples)), None)
+
+
+def test_segment_is_recognized_between_vad_endpoints():
+    session = StreamSession('s', 'zh', scripted_vad([[500, -1]], [], [[-1, 1800]]), recognize_length)
+    for _ in range(3):
+        snapshot = session.feed(ONE_SECOND)
+
+    assert snapshot['received_ms'] == 3000
+    assert snapshot['segments'] == [{'start': 500, 'end': 1800, 'text': str(1300 * 16), 'final': True}]
+    assert snapshot['text'] == str(1300 * 16)
+    assert not snapshot['done']
+
+
+def test_partial_result_while_speech_continues():
+    session = StreamSession('s', 'zh', scripted_vad([[0, -1]]), recognize_length, partial_interval_ms=1000)
+    session.feed(ONE_SECOND)
+    snapshot = session.feed(ONE_SECOND)
+
+    segment, = snapshot['segments']
+    assert segment['text'] == str(2000 * 16)
+    assert not segment['final']
+    assert snapshot['text'] == ''
+
+
+def test_final_chunk_closes_open_segment_and_session():
+    session = StreamSession('s', 'zh', scripted_vad([[200, -1]]), recognize_length)
+    session.feed(ONE_SECOND)
+    snapshot = session.feed(ONE_SECOND, is_final=True)
+
+    assert snapshot['segments'][0]['end'] == 2000
+    assert snapshot['done']
+    with pytest.raises(SessionClosedError):
+        session.feed(ONE_SECOND)
+
+
+def test_recognition_error_is_kept_on_segment():
+    def recognize_error(samples, language, callback):
+        callback(None, RuntimeError("model failed"))
+
+    session = StreamSession('s', 'zh', scripted_vad([[0, 500]]), recognize_error)
+    segment, = session.feed(ONE_SECOND)['segments']
+    assert segment['final']
+    assert segment['error'] == "model failed"
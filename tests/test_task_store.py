@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+
+import pytest
+
+from util.task_store import MemoryTaskStore, SqliteTaskStore, create_task_store
+
+
+def new_task(status='queued', created_at=100.0, is_final=True):
+    return {'status': status, 'created_at': created_at, 'is_final': is_final, 'file_path': 'uploads/a.wav'}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    return create_task_store(request.param, str(tmp_path / 'tasks.db'))
+
+
+def test_create_update_get(store):
+    store.create('a', new_task())
+    assert store.update('a', status='completed', result='你好')
+    assert not store.update('missing', status='completed')
+
+    task = store.get('a')
+    assert task['status'] == 'completed'
+    assert task['result'] == '你好'
+    assert store.get('missing') is None
+
+
+def test_unfinished_and_cleanup(store):
+    store.create('old-done', new_task('completed', created_at=1.0))
+    store.create('old-interim', new_task('failed', created_at=1.0, is_final=False))
+    store.create('new-done', new_task('completed', created_at=500.0))
+    store.create('queued', new_task('queued', created_at=2.0))
+    store.create('processing', new_task('processing', created_at=1.0))
+
+    assert [task_id for task_id, _ in store.unfinished()] == ['processing', 'queued']
+    assert store.delete_finished_before(100.0, is_final=True) == 1
+    assert store.get('old-done') is None
+    assert store.get('old-interim') is not None
+    assert store.count_by_status() == {'failed': 1, 'completed': 1, 'queued': 1, 'processing': 1}
+
+    store.delete('queued')
+    assert store.get('queued') is None
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = str(tmp_path / 'tasks.db')
+    store = SqliteTaskStore(path)
+    store.create('a', new_task())
+    store.update('a', status='processing')
+
+    reopened = SqliteTaskStore(path)
+    assert reopened.get('a')['status'] == 'processing'
+    assert [task_id for task_id, _ in reopened.unfinished()] == ['a']
+    assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_sqlite_store_is_shared_across_threads(tmp_path):
+    store = SqliteTaskStore(str(tmp_path / 'tasks.db'))
+
+    def worker(i):
+        store.create(str(i), new_task())
+        store.update(str(i), status='completed', result=str(i))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(store.get(str(i))['result'] == str(i) for i in range(8))
+
+
+def test_unknown_backend():
+    assert isinstance(create_task_store('memory'), MemoryTaskStore)
+    with pytest.raises(ValueError):
+        create_task_store('redis')
@@ -0,0 +1,65 @@
+import os
+
+from util.transcript_cache import TranscriptCache
+
+
+def test_transcript_and_summaries_round_trip(tmp_path):
+    audio = tmp_path / 'lecture.wav'
+    audio.write_bytes(b'RIFF' + os.urandom(1024))
+    cache = TranscriptCache(str(tmp_path / 'cache'))
+    key = cache.key(str(audio), 'zh')
+    assert key != cache.key(str(audio), 'en')
+
+    assert cache.get_transcript(key) is None
+    # 没有转录时不保存总结
+    cache.put_summary(key, '', '总结')
+    assert cache.get_summary(key, '') is None
+
+    cache.put_transcript(key, '今天讲傅里叶变换', source=str(audio))
+    cache.put_summary(key, '', '默认总结')
+    cache.put_summary(key, '列出公式', '公式总结')
+    assert cache.get_transcript(key) == '今天讲傅里叶变换'
+    assert cache.get_summary(key, '') == '默认总结'
+    assert cache.get_summary(key, '列出公式') == '公式总结'
+    assert cache.get_summary(key, '其他提示词') is None
+
+
+def test_fingerprint_covers_whole_file(tmp_path):
+    cache = TranscriptCache(str(tmp_path / 'cache'))
+    size = 4 * cache.READ_BYTES + 10
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(bytes(size))
+    before = cache.fingerprint(str(path))
+
+    # 同样长度、只在中间某处不同的文件指纹也不同
+    with open(path, 'r+b') as f:
+        f.seek(cache.READ_BYTES + 10)
+        f.write(b'x')
+    assert TranscriptCache(str(tmp_path / 'cache')).fingerprint(str(path)) != before
+
+    # 内容相同的副本指纹相同
+    copy = tmp_path / 'copy.mp4'
+    copy.write_bytes(path.read_bytes())
+    assert cache.fingerprint(str(copy)) == cache.fingerprint(str(path))
+
+
+def test_fingerprint_memo_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(TranscriptCache, 'MAX_FINGERPRINTS', 3)
+    cache = TranscriptCache(str(tmp_path / 'cache'))
+    for i in range(5):
+        path = tmp_path / f'{i}.wav'
+        path.write_bytes(str(i).encode())
+        cache.fingerprint(str(path))
+    assert len(cache._fingerprints) == 3
+
+
+def test_evicts_oldest_entries(tmp_path):
+    cache = TranscriptCache(str(tmp_path), max_bytes=300)
+    for i, name in enumerate(['a', 'b', 'c']):
+        cache.put_transcript(name, 'x' * 100)
+        os.utime(tmp_path / f'{name}.json', (1000 + i, 1000 + i))
+    cache.put_transcript('d', 'x' * 100)
+
+    assert cache.get_transcript('a') is None
+    assert cache.get_transcript('d') == 'x' * 100
+    assert cache.stats()['bytes'] <= 300
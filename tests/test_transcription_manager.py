@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pytest
+
+RATE = 16000
+CHUNK = 1600
+
+
+def lecture(*parts):
+    """按 (是否说话, 秒数) 拼接合成录音：说话段为正弦波，停顿段只有底噪"""
+    rng = np.random.default_rng(0)
+    audio = []
+    for speaking, seconds in parts:
+        t = np.arange(int(seconds * RATE)) / RATE
+        audio.append(0.3 * np.sin(2 * np.pi * 180 * t) if speaking else np.zeros(len(t)))
+    audio = np.concatenate(audio) + rng.normal(0, 0.001, sum(len(part) for part in audio))
+    return (np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+@pytest.fixture
+def manager(audio_transcription, tmp_path):
+    return audio_transcription.TranscriptionManager('key', 'http://speech.invalid', 'llm-key',
+                                                    output_dir=str(tmp_path / 'out'))
+
+
+def record(manager, pcm):
+    manager.start_recording()
+    callback = manager.recorder.p.streams[-1].callback
+    for offset in range(0, len(pcm), CHUNK * 2):
+        callback(pcm[offset:offset + CHUNK * 2], CHUNK, {}, 0)
+    return manager.stop_recording()
+
+
+def test_split_segments_are_mapped_back_to_recording_time(audio_transcription, manager, monkeypatch):
+    path = record(manager, lecture((True, 2), (False, 8), (True, 2)))
+    trimmer = manager.recorder.trimmer
+    uploads = []
+
+    def transcribe_audio(file_path, language, is_final):
+        uploads.append(file_path)
+        task = audio_transcription.TranscriptionTask('t1', file_path, '', language, is_final, status='processing')
+        manager.api.tasks['t1'] = task
+        return task
+
+    # 服务器在切分模式下返回的时间段指向压缩后的上传音频
+    trimmed_segments = [{'start': 0, 'end': 2000, 'text': 'a'}, {'start': 2500, 'end': 4500, 'text': 'b'}]
+    monkeypatch.setattr(manager.api, 'transcribe_audio', transcribe_audio)
+    monkeypatch.setattr(manager.api, 'check_transcription_status', lambda task_id, wait=0: manager.api._update_task(
+        task_id, {'status': 'completed', 'result': 'ab', 'segments': trimmed_segments}))
+    try:
+        assert manager.submit_for_transcription(path, is_final=True, use_cache=False)
+        assert uploads == [manager.recorder.trimmed_file]
+
+        status = manager.check_transcription_status()
+        assert status['status'] == 'completed'
+        assert [segment['text'] for segment in status['segments']] == ['a', 'b']
+        assert status['segments'][1]['start'] == trimmer.to_original_ms(2500)
+        assert status['segments'][1]['end'] == trimmer.to_original_ms(4500)
+        # 第二段在原始录音中位于 8 秒停顿之后
+        assert status['segments'][1]['start'] > 8000
+    finally:
+        os.remove(path)
+        os.remove(manager.recorder.trimmed_file)
+
+
+def test_untrimmed_upload_keeps_segment_times(audio_transcription, manager, monkeypatch, tmp_path):
+    audio = tmp_path / 'lecture.wav'
+    audio.write_bytes(b'RIFF')
+    segments = [{'start': 2500, 'end': 4500, 'text': 'b'}]
+    monkeypatch.setattr(manager.api, 'transcribe_audio', lambda file_path, language, is_final: (
+        audio_transcription.TranscriptionTask('t2', file_path, '', language, is_final, status='completed',
+                                              result='b', segments=segments)))
+
+    assert manager.submit_for_transcription(str(audio), is_final=True, use_cache=False)
+    assert manager.check_transcription_status()['segments'] == segments
@@ -0,0 +1,129 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+
+class ApiKeyStore:
+    """
+    API 密钥存储：查询直接读内存字典（无锁），使用统计在内存中累计，
+    由后台线程按时间间隔或脏计数阈值写回磁盘（临时文件 + 原子替换），退出时再写一次。
+    :param path: 密钥 JSON 文件路径
+    :param flush_interval: 定期写回间隔（秒）
+    :param dirty_threshold: 未写回的修改达到该数量时立即写回
+    """
+
+    def __init__(self, path, flush_interval=5.0, dirty_threshold=200):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.dirty_threshold = dirty_threshold
+        self.keys = self._load()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dirty = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_loop, name="api-key-flusher")
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def get(self, key):
+        """查询密钥信息，不加锁"""
+        return self.keys.get(key)
+
+    def items(self):
+        with self._lock:
+            return [(key, dict(info, usage=dict(info['usage']))) for key, info in self.keys.items()]
+
+    def add(self, key, info):
+        """新增密钥并立即写盘，密钥已存在返回 False"""
+        with self._lock:
+            if key in self.keys:
+                return False
+            self.keys[key] = info
+            self._dirty += 1
+        self.flush()
+        return True
+
+    def set_active(self, key, active):
+        """启用/禁用密钥并立即写盘，密钥不存在返回 False"""
+        with self._lock:
+            if key not in self.keys:
+                return False
+            self.keys[key]['is_active'] = active
+            self._dirty += 1
+        self.flush()
+        return True
+
+    def record_request(self, key_info):
+        """累计一次请求，仅修改内存"""
+        with self._lock:
+            key_info['usage']['total_requests'] += 1
+            key_info['usage']['last_used'] = time.time()
+            self._mark_dirty()
+
+    def record_processing_time(self, key, seconds):
+        """累计处理时间，仅修改内存"""
+        with self._lock:
+            key_info = self.keys.get(key)
+            if key_info:
+                key_info['usage']['total_processing_time'] += seconds
+                self._mark_dirty()
+
+    def _mark_dirty(self):
+        self._dirty += 1
+        if self._dirty >= self.dirty_threshold:
+            self._wake.set()
+
+    def flush(self):
+        """把未写回的修改写入磁盘"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = json.dumps(self.keys, indent=2)
+                written = self._dirty
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+            # 写入成功后才清除计数；写入失败时保持未写回状态，下次继续重试。
+            # 写入期间新增的修改不在本次快照中，仍需下次写回
+            with self._lock:
+                self._dirty -= written
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"写入 API 密钥文件失败: {e}")
+
+    def close(self):
+        """停止后台线程并做最后一次写回"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import tempfile
+
+from util.mov_support import get_ffmpeg_exe
+
+# 上传编码 -> (文件后缀, ffmpeg 编码参数)
+UPLOAD_ENCODINGS = {
+    'flac': ('.flac', ['-c:a', 'flac', '-compression_level', '5']),
+    'opus': ('.ogg', ['-c:a', 'libopus', '-b:a', '32k', '-application', 'voip']),
+}
+
+
+def transcode_for_upload(file_path, encoding, sample_rate=16000):
+    """
+    把音频转码为 16kHz 单声道的压缩格式，用于上传
+    :param file_path: 原始音频文件
+    :param encoding: 'flac'（无损）或 'opus'
+    :return: 转码后的临时文件路径，调用方负责删除
+    """
+    suffix, codec_args = UPLOAD_ENCODINGS[encoding]
+    fd, output_path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    cmd = [get_ffmpeg_exe(), '-nostdin', '-v', 'error', '-y', '-i', file_path,
+           '-map', '0:a:0', '-vn', '-ac', '1', '-ar', str(sample_rate), *codec_args, output_path]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        os.remove(output_path)
+        raise RuntimeError(f"转码失败: {result.stderr.decode(errors='ignore').strip()}")
+    return output_path
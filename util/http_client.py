@@ -0,0 +1,112 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 延迟直方图的桶上界（毫秒），最后一个桶收纳更慢的请求
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+# 路径中的 UUID 等 ID 归并为 <id>，按接口而不是按任务统计
+_ID_SEGMENT = re.compile(r'/[0-9a-fA-F-]{16,}(?=/|$)')
+
+
+class LatencyHistogram:
+    """按接口统计请求延迟分布"""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, endpoint, seconds, error=False):
+        ms = seconds * 1000
+        with self._lock:
+            series = self._series.setdefault(endpoint, {
+                'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'buckets': [0] * (len(self.buckets_ms) + 1)
+            })
+            series['count'] += 1
+            series['errors'] += error
+            series['total_ms'] += ms
+            series['max_ms'] = max(series['max_ms'], ms)
+            series['buckets'][bisect_left(self.buckets_ms, ms)] += 1
+
+    def _percentile(self, buckets, count, q):
+        """返回第 q 分位所在桶的上界"""
+        target = q * count
+        seen = 0
+        for bound, n in zip(self.buckets_ms + [float('inf')], buckets):
+            seen += n
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for endpoint, series in self._series.items():
+                count = series['count']
+                labels = [f"<={bound}ms" for bound in self.buckets_ms] + [f">{self.buckets_ms[-1]}ms"]
+                result[endpoint] = {
+                    'count': count,
+                    'errors': series['errors'],
+                    'avg_ms': round(series['total_ms'] / count, 1),
+                    'max_ms': round(series['max_ms'], 1),
+                    'p50_ms': self._percentile(series['buckets'], count, 0.5),
+                    'p95_ms': self._percentile(series['buckets'], count, 0.95),
+                    'p99_ms': self._percentile(series['buckets'], count, 0.99),
+                    'histogram': {label: n for label, n in zip(labels, series['buckets']) if n}
+                }
+            return result
+
+
+class PooledSession(requests.Session):
+    """
+    带连接池、默认超时、幂等请求重试和延迟统计的 requests.Session
+    :param pool_size: 每个主机保持的连接数
+    :param connect_timeout: 建立连接的超时（秒）
+    :param read_timeout: 等待响应的超时（秒），调用时可用 timeout= 覆盖
+    :param retries: 幂等请求（GET/PUT/DELETE 等）遇到连接错误或 429/502/503/504 时的重试次数
+    :param backoff: 重试退避基数（秒），按指数增长并叠加随机抖动
+    """
+
+    def __init__(self, pool_size=8, connect_timeout=5.0, read_timeout=60.0, retries=3, backoff=0.5):
+        super().__init__()
+        self.default_timeout = (connect_timeout, read_timeout)
+        self.latency = LatencyHistogram()
+
+        retry_args = dict(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # POST 不重试，避免重复提交任务
+            raise_on_status=False,
+        )
+        try:
+            retry = Retry(backoff_jitter=backoff, **retry_args)
+        except TypeError:
+            # urllib3 1.x 不支持抖动
+            retry = Retry(**retry_args)
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', self.default_timeout)
+        endpoint = f"{method.upper()} {_ID_SEGMENT.sub('/<id>', requests.utils.urlparse(url).path)}"
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except requests.RequestException:
+            self.latency.record(endpoint, time.perf_counter() - started, error=True)
+            raise
+        self.latency.record(endpoint, time.perf_counter() - started, error=response.status_code >= 500)
+        return response
+
+    def latency_stats(self):
+        return self.latency.stats()
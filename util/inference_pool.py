@@ -0,0 +1,126 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class QueueFullError(Exception):
+    """推理队列已满时抛出，retry_after 为建议的重试等待秒数"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"推理队列已满，请 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    """
+    有界优先级队列 + 固定数量的推理工作线程。
+    is_final 任务优先于临时（interim）任务，同优先级按提交顺序处理。
+    :param handler: 实际执行推理的函数，以 submit 时传入的 args 调用
+    :param num_workers: 并发推理的工作线程数
+    :param max_queue_size: 排队任务上限（不含正在处理的任务）
+    """
+
+    PRIORITY_FINAL = 0
+    PRIORITY_INTERIM = 1
+
+    def __init__(self, handler, num_workers=1, max_queue_size=32):
+        self.handler = handler
+        self.num_workers = max(1, int(num_workers))
+        self.max_queue_size = max(1, int(max_queue_size))
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._running = False
+        self._active = 0
+        # 单个任务耗时的指数滑动平均，用于估算 Retry-After
+        self._avg_job_seconds = 5.0
+
+    def start(self):
+        """启动工作线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"inference-worker-{i}")
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout=None):
+        """停止接收新任务，等待工作线程处理完当前任务后退出"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def submit(self, task_id, args, is_final=False, force=False):
+        """
+        提交任务
+        :param force: 忽略队列上限（用于重启后恢复已接收的任务）
+        :raises QueueFullError: 队列已满
+        """
+        priority = self.PRIORITY_FINAL if is_final else self.PRIORITY_INTERIM
+        with self._cond:
+            if not force and len(self._heap) >= self.max_queue_size:
+                raise QueueFullError(self._retry_after_locked())
+            heapq.heappush(self._heap, (priority, next(self._counter), task_id, args))
+            self._cond.notify()
+
+    def is_full(self):
+        with self._cond:
+            return len(self._heap) >= self.max_queue_size
+
+    def retry_after(self):
+        """估算队列腾出空位所需的秒数"""
+        with self._cond:
+            return self._retry_after_locked()
+
+    def _retry_after_locked(self):
+        return max(1, int(self._avg_job_seconds * (len(self._heap) + 1) / self.num_workers + 0.5))
+
+    def position(self, task_id):
+        """
+        返回任务在队列中的位置（从 1 开始），不在队列中返回 None
+        """
+        with self._cond:
+            entry = next((item for item in self._heap if item[2] == task_id), None)
+            if entry is None:
+                return None
+            return 1 + sum(1 for item in self._heap if item[:2] < entry[:2])
+
+    def stats(self):
+        """队列与工作线程的当前负载"""
+        with self._cond:
+            return {
+                'workers': self.num_workers,
+                'active': self._active,
+                'queued': len(self._heap),
+                'max_queue_size': self.max_queue_size,
+                'avg_job_seconds': round(self._avg_job_seconds, 3)
+            }
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                _, _, task_id, args = heapq.heappop(self._heap)
+                self._active += 1
+
+            start_time = time.time()
+            try:
+                self.handler(*args)
+            except Exception as e:
+                print(f"推理任务 {task_id} 异常: {e}")
+            finally:
+                elapsed = time.time() - start_time
+                with self._cond:
+                    self._active -= 1
+                    self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
@@ -0,0 +1,131 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from util.deepseek_v3_tokenizer.deepseek_tokenizer import estimate_tokens, get_tokenizer_service
+
+DEFAULT_SYSTEM_PROMPT = ("You are a helpful assistant that processes lecture transcripts. Organize the content into "
+                         "clear sections with headings, bullet points, and highlight key concepts.")
+
+# 分块阶段的提示词：只做信息压缩，最终格式交给归并阶段的 Instruction
+MAP_PROMPT = """
+你将收到一段课堂录音转录文本，它是整堂课的第 {index}/{total} 部分。
+请按原顺序提炼这一部分的讲课笔记：保留所有知识点、定义、公式、推导步骤、例子和数据，
+修正明显的识别错别字，去掉口头禅和重复内容。不要写开头语和总结语，不要补充原文没有的内容。
+"""
+
+REDUCE_MESSAGE = "以下是同一堂课按时间顺序分段整理的笔记，请把它们作为完整的课堂转录内容处理：\n\n{notes}"
+
+# 断句：中英文句末标点与换行
+SENTENCE_END = re.compile(r'(?<=[。！？；!?;\n])|(?<=\.[ \t])')
+
+
+def estimate_token_counts(texts):
+    return [estimate_tokens(text) for text in texts]
+
+
+def split_transcript(text: str, max_tokens: int, count_tokens=estimate_token_counts):
+    """
+    按句子边界把转录文本切成不超过 max_tokens 的块；单句超长时按字符硬切
+    :param count_tokens: 批量计数函数，输入文本列表，返回 token 数列表
+    :return: 文本块列表
+    """
+    sentences = [sentence for sentence in SENTENCE_END.split(text) if sentence]
+    chunks = []
+    current, current_tokens = [], 0
+    for sentence, tokens in zip(sentences, count_tokens(sentences)):
+        if tokens > max_tokens:
+            step = max(1, len(sentence) * max_tokens // tokens)
+            pieces = [sentence[i:i + step] for i in range(0, len(sentence), step)]
+            piece_counts = count_tokens(pieces)
+        else:
+            pieces, piece_counts = [sentence], [tokens]
+        for piece, piece_tokens in zip(pieces, piece_counts):
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append(''.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+
+class MapReduceSummarizer:
+    """
+    长文本分层总结：转录文本按 token 预算切块，线程池并发提炼各块笔记（map），
+    再把笔记交给用户选择的 Instruction 流式生成最终总结（reduce）。
+    笔记合起来仍超出预算时，先逐组合并笔记再归并。
+    :param llm_client: OpenAI 兼容客户端
+    :param chunk_tokens: 每块转录文本的 token 上限，短于该值的文本直接单次总结
+    :param max_workers: 同时进行的 map 请求数
+    :param count_tokens: 批量计数函数，默认使用共享的 DeepSeek tokenizer 服务
+    """
+
+    def __init__(self, llm_client, model="deepseek-chat", chunk_tokens=12000, max_workers=4,
+                 count_tokens=None):
+        self.llm_client = llm_client
+        self.model = model
+        self.chunk_tokens = chunk_tokens
+        self.max_workers = max_workers
+        self.count_tokens = count_tokens or get_tokenizer_service().count_tokens
+
+    def _total_tokens(self, text):
+        return self.count_tokens([text])[0]
+
+    def _complete(self, system_prompt, user_content):
+        response = self.llm_client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content},
+            ],
+            stream=False
+        )
+        return response.choices[0].message.content
+
+    def _map(self, chunks, on_progress=None):
+        """并发提炼每块的笔记，按原顺序返回"""
+        notes = [None] * len(chunks)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._complete, MAP_PROMPT.format(index=i + 1, total=len(chunks)), chunk): i
+                for i, chunk in enumerate(chunks)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                notes[futures[future]] = future.result()
+                if on_progress:
+                    on_progress(done, len(chunks))
+        return notes
+
+    def summarize(self, text, instruction="", on_progress=None):
+        """
+        生成总结，流式产出文本块
+        :param instruction: 最终总结使用的系统提示词（如 Instruction1/Instruction2），为空时使用默认提示词
+        :param on_progress: 回调 (已完成块数, 总块数)，在工作线程中调用
+        """
+        system_prompt = instruction or DEFAULT_SYSTEM_PROMPT
+        if self._total_tokens(text) <= self.chunk_tokens:
+            user_content = f"Here is the transcript to process:\n\n{text}"
+        else:
+            notes = self._map(split_transcript(text, self.chunk_tokens, self.count_tokens), on_progress)
+            # 笔记总量仍超预算时逐层合并
+            while len(notes) > 1 and self._total_tokens('\n\n'.join(notes)) > self.chunk_tokens:
+                groups = split_transcript('\n\n'.join(notes) + '\n', self.chunk_tokens, self.count_tokens)
+                if len(groups) >= len(notes):
+                    break
+                notes = self._map(groups)
+            user_content = REDUCE_MESSAGE.format(notes='\n\n'.join(notes))
+
+        response_stream = self.llm_client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content},
+            ],
+            stream=True
+        )
+        for chunk in response_stream:
+            if chunk.choices:
+                text_chunk = chunk.choices[0].delta.content
+                if text_chunk:
+                    yield text_chunk
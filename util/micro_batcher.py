@@ -0,0 +1,122 @@
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    跨请求的微批处理：在 max_wait 时间窗口内收集请求（或达到 max_batch_size 时立即触发），
+    合并为一次 batch_fn 调用，再把结果逐个回调给提交者。
+    :param batch_fn: 接收 item 列表并返回等长结果列表的函数
+    :param max_batch_size: 单批最大条目数
+    :param max_wait: 收集窗口（秒），从批次中第一条到达时开始计时
+    """
+
+    def __init__(self, batch_fn, max_batch_size=16, max_wait=0.05):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max_wait
+        self._pending = []
+        self._cond = threading.Condition()
+        self._running = False
+        self._closed = False
+        self._thread = None
+        self._stats = {'batches': 0, 'items': 0, 'max_batch': 0}
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        停止处理线程：已提交的条目先全部处理完，超时仍未处理的条目以错误回调，
+        之后提交的条目直接以错误回调
+        """
+        with self._cond:
+            self._running = False
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._cond:
+            leftover, self._pending = self._pending, []
+        for _, callback in leftover:
+            callback(None, RuntimeError("微批处理器已停止"))
+
+    def submit(self, item, callback):
+        """
+        提交一个条目，批处理完成后以 callback(result, error) 回调，二者之一为 None
+        """
+        with self._cond:
+            if not self._closed:
+                self._pending.append((item, callback))
+                self._cond.notify()
+                return
+        callback(None, RuntimeError("微批处理器已停止"))
+
+    def submit_future(self, item):
+        """
+        提交一个条目，返回 concurrent.futures.Future，批处理完成后得到结果或异常
+        """
+        future = Future()
+
+        def callback(result, error):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        self.submit(item, callback)
+        return future
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+        stats['avg_batch'] = round(stats['items'] / stats['batches'], 2) if stats['batches'] else 0
+        return stats
+
+    def _collect(self):
+        """等待第一条请求到达，然后在窗口内继续收集直到满批或超时；停止后不再等待，直接取出剩余条目"""
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait()
+            if not self._pending:
+                return []
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"批处理结果数量不匹配: {len(results)} != {len(items)}")
+            except Exception as e:
+                for _, callback in batch:
+                    callback(None, e)
+            else:
+                for (_, callback), result in zip(batch, results):
+                    callback(result, None)
+
+            with self._cond:
+                self._stats['batches'] += 1
+                self._stats['items'] += len(items)
+                self._stats['max_batch'] = max(self._stats['max_batch'], len(items))
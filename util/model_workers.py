@@ -0,0 +1,495 @@
+import itertools
+import os
+import queue
+import secrets
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+
+from util.model_backend import WARM_UP_SECONDS, create_backend, warm_up
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class WorkerUnavailableError(RuntimeError):
+    """没有可用的模型进程，或任务所在进程崩溃且重试次数已用完"""
+
+
+class InProcessModel:
+    """
+    在服务进程内调用模型后端，接口与 ModelWorkerPool 相同（线程模式）。
+    start() 在后台线程加载并预热模型，加载完成前的调用最多等待 load_timeout 秒
+    :param backend: 模型后端名称（见 util.model_backend.BACKENDS）
+    :param device: 推理设备
+    :param load_timeout: 调用方等待模型加载的最长时间（秒）
+    :param warm_up_lengths: 预热合成音频的时长列表（秒），为空则不预热
+    """
+
+    def __init__(self, backend, device, load_timeout=600, warm_up_lengths=WARM_UP_SECONDS):
+        self.backend_name = backend
+        self.device = device
+        self.load_timeout = load_timeout
+        self.warm_up_lengths = warm_up_lengths
+        self.backend = None
+        self.load_error = None
+        self.load_seconds = None
+        self.warm_up = None
+        self._loaded = threading.Event()
+        self._started_at = time.time()
+        self._stream_caches = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._started_at = time.time()
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def stop(self):
+        pass
+
+    def _load(self):
+        try:
+            backend = create_backend(self.backend_name, self.device)
+            self.load_seconds = round(time.time() - self._started_at, 1)
+            self.warm_up = warm_up(backend, self.warm_up_lengths)
+            self.backend = backend
+            print(f"模型已加载（{self.load_seconds}s），预热 {self.warm_up}")
+        except Exception as e:
+            self.load_error = repr(e)
+            print(f"模型加载失败: {self.load_error}")
+        finally:
+            self._loaded.set()
+
+    def _ready_backend(self):
+        if not self._loaded.wait(self.load_timeout):
+            raise WorkerUnavailableError("模型仍在加载")
+        if self.backend is None:
+            raise WorkerUnavailableError(f"模型加载失败: {self.load_error}")
+        return self.backend
+
+    def generate(self, audio_path, language):
+        return self._ready_backend().generate(audio_path, language)
+
+    def split_vad(self, audio_path):
+        return self._ready_backend().split_vad(audio_path)
+
+    def vad_segments(self, audio_path):
+        return self._ready_backend().vad_segments(audio_path)
+
+    def recognize_span(self, audio_path, spans, language):
+        return self._ready_backend().recognize_span(audio_path, spans, language)
+
+    def recognize_batch(self, items):
+        return self._ready_backend().recognize_batch(items)
+
+    def stream_vad(self, session_id, samples, is_final, chunk_size):
+        backend = self._ready_backend()
+        with self._lock:
+            cache = self._stream_caches.setdefault(session_id, {})
+        result = backend.stream_vad(samples, cache, is_final, chunk_size)
+        if is_final:
+            self.release_stream(session_id)
+        return result
+
+    def release_stream(self, session_id):
+        with self._lock:
+            self._stream_caches.pop(session_id, None)
+
+    def ready_count(self):
+        return int(self.backend is not None)
+
+    def stats(self):
+        return [{
+            'worker_id': 0,
+            'device': self.device,
+            'pid': os.getpid(),
+            'alive': True,
+            'ready': self.backend is not None,
+            'dead': self._loaded.is_set() and self.backend is None,
+            'load_seconds': self.load_seconds,
+            'warm_up': self.warm_up,
+            'load_error': self.load_error,
+        }]
+
+
+def _worker_main(worker_id, backend_name, device, address, authkey, warm_up_lengths=WARM_UP_SECONDS):
+    """
+    模型进程入口：连接服务进程，加载一次模型后循环处理请求，后台线程定期发送心跳
+    请求：(job_id, method, args)，None 表示退出；结果：('result', job_id, ok, payload)
+    """
+    conn = Client(address, authkey=authkey)
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    def heartbeat():
+        while True:
+            try:
+                send(('heartbeat', time.time()))
+            except OSError:
+                return
+            time.sleep(1)
+
+    send(('hello', worker_id, os.getpid()))
+    threading.Thread(target=heartbeat, daemon=True).start()
+    started = time.time()
+    try:
+        backend = create_backend(backend_name, device)
+        load_seconds = time.time() - started
+        warm_up_timings = warm_up(backend, warm_up_lengths)
+    except Exception as e:
+        send(('load_failed', repr(e)))
+        return 1
+    # 预热完成后才报告就绪，第一个真实请求不再承担初始化开销
+    send(('ready', time.time(), round(load_seconds, 1), warm_up_timings))
+
+    # 流式 VAD 的状态缓存按会话保存在进程内
+    stream_caches = {}
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        job_id, method, args = message
+        try:
+            if method == 'stream_vad':
+                session_id, samples, is_final, chunk_size = args
+                cache = stream_caches.setdefault(session_id, {})
+                payload = backend.stream_vad(samples, cache, is_final, chunk_size)
+                if is_final:
+                    stream_caches.pop(session_id, None)
+            elif method == 'release_stream':
+                payload = stream_caches.pop(args[0], None) is not None
+            else:
+                payload = getattr(backend, method)(*args)
+            send(('result', job_id, True, payload))
+        except Exception as e:
+            send(('result', job_id, False, repr(e)))
+
+
+class _Worker:
+    def __init__(self, worker_id, device):
+        self.worker_id = worker_id
+        self.device = device
+        self.process = None
+        self.outbox = None
+        self.pid = None
+        self.ready = False
+        self.load_seconds = None
+        self.warm_up = None
+        self.load_error = None
+        self.started_at = 0.0
+        self.last_heartbeat = 0.0
+        self.inflight = {}  # job_id -> (method, args, attempt)
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.busy_seconds = 0.0
+        self.failures = 0  # 上次就绪以来连续失败的次数
+        self.restart_at = None  # 等待退避重启时为计划重启的时间
+        self.dead = False  # 连续失败次数超过上限，不再重启
+
+
+class ModelWorkerPool:
+    """
+    多进程模型服务：每个进程绑定一个设备并各自加载模型，服务进程通过本地套接字分发推理请求。
+    模型进程以 `python -m util.model_workers` 独立启动，不会重复执行服务脚本的初始化代码；
+    调用方线程阻塞等待结果，不受 GIL 与单设备限制。后台线程监控进程与心跳，
+    崩溃、卡死或加载超时的进程自动重启，其上未完成的请求转交其他进程重试。
+    :param backend: 模型后端名称（见 util.model_backend.BACKENDS）
+    :param devices: 设备列表，每项启动一个进程，如 ['cuda:0', 'cuda:1'] 或 ['cpu'] * 4
+    :param threads_per_worker: 每个进程的 OMP/MKL 线程数，CPU 多进程时避免线程超订
+    :param heartbeat_timeout: 超过该秒数没有心跳视为卡死
+    :param load_timeout: 模型加载超时（秒）
+    :param max_attempts: 进程崩溃时单个请求最多执行的次数
+    :param warm_up_lengths: 预热合成音频的时长列表（秒），预热完成后进程才报告就绪
+    :param max_restarts: 未能就绪的连续重启次数上限，超过后该设备标记为不可用
+    :param restart_backoff: 首次重启前的等待秒数，之后每次翻倍，最长 max_backoff 秒
+    """
+
+    def __init__(self, backend, devices, threads_per_worker=None, heartbeat_timeout=30, load_timeout=600,
+                 max_attempts=2, warm_up_lengths=WARM_UP_SECONDS, max_restarts=5, restart_backoff=1.0,
+                 max_backoff=60.0):
+        self.backend = backend
+        self.warm_up_lengths = warm_up_lengths
+        self.threads_per_worker = threads_per_worker
+        self.heartbeat_timeout = heartbeat_timeout
+        self.load_timeout = load_timeout
+        self.max_attempts = max_attempts
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self._authkey = secrets.token_bytes(32)
+        self._listener = None
+        self._workers = [_Worker(i, device) for i, device in enumerate(devices)]
+        self._futures = {}  # job_id -> (Future, submitted_at)
+        self._job_ids = itertools.count()
+        self._lock = threading.Condition()
+        self._running = False
+
+    def start(self):
+        self._listener = Listener(('127.0.0.1', 0), authkey=self._authkey)
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        with self._lock:
+            for worker in self._workers:
+                self._spawn(worker)
+        threading.Thread(target=self._monitor, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        with self._lock:
+            for worker in self._workers:
+                worker.outbox.put(None)
+        for worker in self._workers:
+            try:
+                worker.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+        self._listener.close()
+
+    def _spawn(self, worker):
+        """启动模型进程（调用时持有 _lock）"""
+        env = dict(os.environ)
+        if self.threads_per_worker:
+            env['OMP_NUM_THREADS'] = env['MKL_NUM_THREADS'] = str(self.threads_per_worker)
+        worker.outbox = queue.SimpleQueue()
+        worker.process = subprocess.Popen(
+            [sys.executable, '-m', 'util.model_workers', '--worker', str(worker.worker_id),
+             self.backend, worker.device, str(self._listener.address[1]),
+             ','.join(map(str, self.warm_up_lengths))],
+            cwd=PROJECT_ROOT,
+            env=env,
+            stdin=subprocess.PIPE,
+        )
+        # 认证密钥经 stdin 传递，不出现在进程列表中
+        worker.process.stdin.write(self._authkey.hex().encode() + b'\n')
+        worker.process.stdin.close()
+        worker.pid = worker.process.pid
+        worker.ready = False
+        worker.started_at = worker.last_heartbeat = time.time()
+
+    def _restart(self, worker, reason):
+        """
+        结束进程并按指数退避安排重启，未完成的请求转交其他进程或以错误结束（调用时持有 _lock）。
+        就绪前连续失败超过 max_restarts 次的设备标记为不可用，不再重启
+        """
+        worker.outbox.put(None)
+        if worker.process.poll() is None:
+            worker.process.kill()
+        worker.process.wait()
+        worker.ready = False
+        inflight, worker.inflight = worker.inflight, {}
+        worker.failed += len(inflight)
+        worker.failures += 1
+        if worker.failures > self.max_restarts:
+            worker.dead = True
+            print(f"模型进程 {worker.worker_id}（{worker.device}, pid {worker.pid}）{reason}，"
+                  f"连续失败 {worker.failures} 次，不再重启（{worker.load_error}）")
+        else:
+            delay = min(self.restart_backoff * 2 ** (worker.failures - 1), self.max_backoff)
+            worker.restart_at = time.time() + delay
+            print(f"模型进程 {worker.worker_id}（{worker.device}, pid {worker.pid}）{reason}，{delay:g}s 后重启")
+
+        for job_id, (method, args, attempt) in inflight.items():
+            # 流式 VAD 的状态随进程丢失，不能重试
+            if attempt < self.max_attempts and method != 'stream_vad':
+                self._dispatch(job_id, method, args, attempt + 1)
+            else:
+                self._fail(job_id, WorkerUnavailableError(f"模型进程 {worker.worker_id} {reason}"))
+        self._lock.notify_all()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn = self._listener.accept()
+                _, worker_id, pid = conn.recv()
+            except (OSError, EOFError):
+                if not self._running:
+                    return
+                continue
+            worker = self._workers[worker_id]
+            with self._lock:
+                if pid != worker.pid:
+                    conn.close()  # 已被替换的旧进程
+                    continue
+                outbox = worker.outbox
+            threading.Thread(target=self._send_loop, args=(conn, outbox), daemon=True).start()
+            threading.Thread(target=self._receive_loop, args=(worker, pid, conn), daemon=True).start()
+
+    def _send_loop(self, conn, outbox):
+        """每个进程一个发送线程，大块音频的发送不占用调度锁"""
+        while True:
+            message = outbox.get()
+            try:
+                conn.send(message)
+            except OSError:
+                return
+            if message is None:
+                return
+
+    def _receive_loop(self, worker, pid, conn):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return  # 进程退出由监控线程处理
+            with self._lock:
+                if worker.pid != pid:
+                    return  # 进程已被替换，丢弃迟到的结果
+                kind = message[0]
+                if kind == 'heartbeat':
+                    worker.last_heartbeat = message[1]
+                elif kind == 'result':
+                    _, job_id, ok, payload = message
+                    if worker.inflight.pop(job_id, None) is None:
+                        continue
+                    future, submitted_at = self._futures.pop(job_id, (None, time.time()))
+                    worker.busy_seconds += time.time() - submitted_at
+                    if ok:
+                        worker.completed += 1
+                        future.set_result(payload)
+                    else:
+                        worker.failed += 1
+                        future.set_exception(RuntimeError(payload))
+                elif kind == 'ready':
+                    _, worker.last_heartbeat, worker.load_seconds, worker.warm_up = message
+                    worker.ready = True
+                    worker.failures = 0
+                    worker.load_error = None
+                    print(f"模型进程 {worker.worker_id}（{worker.device}, pid {pid}）已就绪，"
+                          f"加载 {worker.load_seconds}s，预热 {worker.warm_up}")
+                    self._lock.notify_all()
+                elif kind == 'load_failed':
+                    worker.load_error = message[1]
+                    print(f"模型进程 {worker.worker_id}（{worker.device}）加载失败: {message[1]}")
+
+    def _monitor(self):
+        """健康检查：进程退出、心跳超时或加载超时都会触发重启"""
+        while self._running:
+            time.sleep(1)
+            now = time.time()
+            with self._lock:
+                if not self._running:
+                    return
+                for worker in self._workers:
+                    if worker.dead:
+                        continue
+                    if worker.restart_at is not None:
+                        if now >= worker.restart_at:
+                            worker.restart_at = None
+                            worker.restarts += 1
+                            self._spawn(worker)
+                    elif worker.process.poll() is not None:
+                        self._restart(worker, f"已退出（exit code {worker.process.returncode}）")
+                    elif now - worker.last_heartbeat > self.heartbeat_timeout:
+                        self._restart(worker, "心跳超时")
+                    elif not worker.ready and now - worker.started_at > self.load_timeout:
+                        self._restart(worker, "加载超时")
+
+    def _pick(self, affinity=None):
+        if affinity is not None:
+            worker = self._workers[zlib.crc32(affinity.encode()) % len(self._workers)]
+            return worker if worker.ready else None
+        ready = [worker for worker in self._workers if worker.ready]
+        return min(ready, key=lambda worker: len(worker.inflight)) if ready else None
+
+    def _fail(self, job_id, error):
+        future, _ = self._futures.pop(job_id, (None, None))
+        if future:
+            future.set_exception(error)
+
+    def _dispatch(self, job_id, method, args, attempt, affinity=None):
+        """选择进程并放入其发送队列（调用时持有 _lock）"""
+        worker = self._pick(affinity)
+        if worker is None:
+            self._fail(job_id, WorkerUnavailableError("没有可用的模型进程"))
+            return
+        worker.inflight[job_id] = (method, args, attempt)
+        worker.outbox.put((job_id, method, args))
+
+    def call(self, method, *args, affinity=None, timeout=None, wait_ready=None):
+        """
+        在负载最低的模型进程上执行 backend.method(*args)，阻塞返回结果
+        :param affinity: 指定时按该键固定分配进程（流式会话需要进程内的 VAD 状态）
+        :param wait_ready: 没有就绪进程时最多等待的秒数，默认为 load_timeout
+        """
+        future = Future()
+        with self._lock:
+            # 所有设备都不可用时不必等待
+            self._lock.wait_for(lambda: any(worker.ready for worker in self._workers) or
+                                all(worker.dead for worker in self._workers),
+                                timeout=self.load_timeout if wait_ready is None else wait_ready)
+            job_id = next(self._job_ids)
+            self._futures[job_id] = (future, time.time())
+            self._dispatch(job_id, method, args, 1, affinity=affinity)
+        return future.result(timeout)
+
+    # 与 InProcessModel 相同的接口
+    def generate(self, audio_path, language):
+        return self.call('generate', audio_path, language)
+
+    def split_vad(self, audio_path):
+        return self.call('split_vad', audio_path)
+
+    def vad_segments(self, audio_path):
+        return self.call('vad_segments', audio_path)
+
+    def recognize_span(self, audio_path, spans, language):
+        return self.call('recognize_span', audio_path, spans, language)
+
+    def recognize_batch(self, items):
+        return self.call('recognize_batch', items)
+
+    def stream_vad(self, session_id, samples, is_final, chunk_size):
+        return self.call('stream_vad', session_id, samples, is_final, chunk_size, affinity=session_id)
+
+    def release_stream(self, session_id):
+        try:
+            self.call('release_stream', session_id, affinity=session_id, wait_ready=0)
+        except WorkerUnavailableError:
+            pass
+
+    def ready_count(self):
+        with self._lock:
+            return sum(worker.ready for worker in self._workers)
+
+    def stats(self):
+        """每个进程的负载与状态"""
+        now = time.time()
+        with self._lock:
+            return [{
+                'worker_id': worker.worker_id,
+                'device': worker.device,
+                'pid': worker.pid,
+                'alive': worker.process.poll() is None,
+                'ready': worker.ready,
+                'dead': worker.dead,
+                'inflight': len(worker.inflight),
+                'completed': worker.completed,
+                'failed': worker.failed,
+                'restarts': worker.restarts,
+                'uptime': round(now - worker.started_at, 1),
+                'heartbeat_age': round(now - worker.last_heartbeat, 1),
+                'busy_seconds': round(worker.busy_seconds, 1),
+                'load_seconds': worker.load_seconds,
+                'warm_up': worker.warm_up,
+                'load_error': worker.load_error,
+            } for worker in self._workers]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 7 or sys.argv[1] != '--worker':
+        sys.exit("模型进程由 ModelWorkerPool 启动：python -m util.model_workers --worker "
+                 "<worker_id> <backend> <device> <port> <warm_up_lengths>")
+    worker_id, backend_name, device, port, lengths = sys.argv[2:7]
+    authkey = bytes.fromhex(sys.stdin.readline().strip())
+    sys.exit(_worker_main(int(worker_id), backend_name, device, ('127.0.0.1', int(port)), authkey,
+                          [float(seconds) for seconds in lengths.split(',') if seconds]))
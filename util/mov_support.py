@@ -1,22 +1,115 @@
-from moviepy import VideoFileClip
+import os
+import re
+import shutil
+import subprocess
+import wave
 
-def extract_audio_from_video(video_path, output_audio_path) -> bool:
+
+def get_ffmpeg_exe() -> str:
+    """
+    查找 ffmpeg 可执行文件，优先使用系统 PATH，其次使用 imageio-ffmpeg 自带的版本
+    """
+    exe = shutil.which('ffmpeg')
+    if exe:
+        return exe
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except ImportError:
+        raise RuntimeError("未找到 ffmpeg，请安装 ffmpeg 或 imageio-ffmpeg")
+
+
+def iter_audio_pcm(media_path, sample_rate=16000, chunk_bytes=64 * 1024, start=None, duration=None):
+    """
+    用 ffmpeg 只解复用音频流，直接重采样为单声道 int16 PCM，通过管道分块输出
+    :param media_path: 视频或音频文件路径
+    :param sample_rate: 输出采样率
+    :param chunk_bytes: 每次产出的字节数
+    :param start: 起始秒数，为 None 时从头开始
+    :param duration: 读取的秒数，为 None 时读到结尾
+    :return: PCM 字节块生成器
+    """
+    cmd = [get_ffmpeg_exe(), '-nostdin', '-v', 'error']
+    if start:
+        cmd += ['-ss', f"{start:.3f}"]
+    cmd += ['-i', media_path]
+    if duration is not None:
+        cmd += ['-t', f"{duration:.3f}"]
+    cmd += [
+        '-map', '0:a:0', '-vn', '-sn', '-dn',
+        '-ac', '1', '-ar', str(sample_rate),
+        '-f', 's16le', '-acodec', 'pcm_s16le', 'pipe:1'
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            chunk = proc.stdout.read(chunk_bytes)
+            if not chunk:
+                break
+            yield chunk
+        stderr = proc.stderr.read().decode(errors='ignore')
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg 提取音频失败: {stderr.strip()}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def is_pcm_wav(path, sample_rate=16000):
+    """是否为指定采样率的单声道 16 位 PCM WAV，可以直接按帧随机读取"""
+    try:
+        with wave.open(path, 'rb') as wav:
+            return wav.getnchannels() == 1 and wav.getsampwidth() == 2 and wav.getframerate() == sample_rate
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def audio_duration(media_path):
+    """
+    音频时长（秒）：WAV 直接读文件头，其他格式解析 ffmpeg 输出的 Duration，无法获取时返回 None
+    """
+    try:
+        with wave.open(media_path, 'rb') as wav:
+            return wav.getnframes() / wav.getframerate()
+    except (wave.Error, EOFError, OSError):
+        pass
+    result = subprocess.run([get_ffmpeg_exe(), '-nostdin', '-hide_banner', '-i', media_path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    match = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', result.stderr.decode(errors='ignore'))
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def extract_audio_from_video(video_path, output_audio_path, sample_rate=16000, max_bytes=None) -> bool:
     """
-    从视频文件中提取音频，并保存为 WAV 文件
+    从视频文件中提取音频，保存为 16kHz 单声道 WAV 文件
     :param video_path: 视频文件路径
     :param output_audio_path: 输出音频文件路径
+    :param sample_rate: 输出采样率
+    :param max_bytes: 输出文件大小上限，超出则放弃并删除已写入的文件
     :return: 是否提取成功
     """
-    # 加载视频文件
-    video = VideoFileClip(video_path)
-    
-    # 提取音频
-    audio = video.audio
-    
-    # 保存为 WAV 文件
-    audio.write_audiofile(output_audio_path, codec='pcm_s16le')
-    
-    # 关闭视频文件
-    video.close()
-
-    return True
\ No newline at end of file
+    try:
+        written = 0
+        with wave.open(output_audio_path, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            for chunk in iter_audio_pcm(video_path, sample_rate):
+                written += len(chunk)
+                if max_bytes and written > max_bytes:
+                    raise RuntimeError(f"提取的音频超过磁盘占用上限 {max_bytes} 字节")
+                wf.writeframes(chunk)
+        return True
+    except Exception as e:
+        print(f"提取音频失败: {e}")
+        try:
+            os.remove(output_audio_path)
+        except OSError:
+            pass
+        return False
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    按内容哈希索引的磁盘 LRU 结果缓存，每个条目是 cache_dir 下的一个 JSON 文件，
+    保存与任务状态一致的结果字段（result 与可选的 segments）。
+    总大小超过 max_bytes 时淘汰最久未访问的条目，重启后按文件修改时间恢复 LRU 顺序。
+    :param cache_dir: 缓存目录
+    :param max_bytes: 缓存总大小上限
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+        files = [entry for entry in os.scandir(cache_dir) if entry.name.endswith('.json')]
+        for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+            size = entry.stat().st_size
+            self._entries[entry.name[:-5]] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(content_hash, *params):
+        """由音频内容哈希与影响识别结果的参数组合出缓存键"""
+        return hashlib.sha256('|'.join([content_hash, *map(str, params)]).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """命中返回缓存的结果字段字典，否则返回 None"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            os.utime(self._path(key))
+            return payload
+        except (OSError, ValueError):
+            with self._lock:
+                self._total_bytes -= self._entries.pop(key, 0)
+                self.hits -= 1
+                self.misses += 1
+            return None
+
+    def put(self, key, payload):
+        """
+        写入缓存条目
+        :param key: 缓存键
+        :param payload: 结果字段字典，如 {'result': 文本, 'segments': [...]}
+        """
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+        tmp_path = f"{self._path(key)}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+
+        with self._lock:
+            self._total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            while self._total_bytes > self.max_bytes:
+                old_key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes
+            }
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+
+class ChunkError(Exception):
+    """分块偏移、长度或校验和不合法"""
+
+
+class ResumableUpload:
+    """
+    断点续传上传：文件按 chunk_size 切块，各块可乱序、并行写入到预分配文件的对应偏移，
+    每块带 SHA-256 校验，只有校验通过的块才写入目标文件并记为已接收。
+    :param upload_id: 上传 ID
+    :param file_path: 目标文件路径（上传期间带 .part 后缀）
+    :param size: 文件总字节数
+    :param chunk_size: 分块大小
+    """
+
+    # 分块先暂存在内存中校验，超过该大小时暂存到磁盘
+    SPOOL_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, upload_id, file_path, size, chunk_size, **meta):
+        self.upload_id = upload_id
+        self.file_path = file_path
+        self.part_path = f"{file_path}.part"
+        self.size = size
+        self.chunk_size = chunk_size
+        self.num_chunks = max(1, -(-size // chunk_size))
+        self.meta = meta
+        self.received = set()
+        self.created_at = time.time()
+        self.last_active = self.created_at
+        self._lock = threading.Lock()
+
+        # 预分配目标文件，各块直接写到自己的偏移
+        with open(self.part_path, 'wb') as f:
+            f.truncate(size)
+
+    def chunk_length(self, index):
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def write_chunk(self, offset, stream, checksum):
+        """
+        从 stream 读取一块，暂存并校验通过后再写入 offset，
+        校验失败的重传不会覆盖此前已确认的数据
+        :param checksum: 客户端给出的该块 SHA-256 十六进制串
+        :raises ChunkError: 偏移未对齐、长度不符或校验和不匹配
+        """
+        if offset % self.chunk_size or not 0 <= offset < max(self.size, 1):
+            raise ChunkError(f"偏移 {offset} 未按 {self.chunk_size} 字节对齐或超出文件大小")
+        index = offset // self.chunk_size
+        expected = self.chunk_length(index)
+
+        digest = hashlib.sha256()
+        written = 0
+        with tempfile.SpooledTemporaryFile(max_size=self.SPOOL_BYTES,
+                                           dir=os.path.dirname(self.part_path) or None) as staged:
+            while written < expected:
+                data = stream.read(min(1024 * 1024, expected - written))
+                if not data:
+                    break
+                digest.update(data)
+                staged.write(data)
+                written += len(data)
+            if stream.read(1):
+                written += 1
+
+            if written != expected:
+                raise ChunkError(f"分块 {index} 长度应为 {expected} 字节，实际收到 {written} 字节")
+            if digest.hexdigest() != (checksum or '').lower():
+                raise ChunkError(f"分块 {index} 校验和不匹配")
+
+            staged.seek(0)
+            with open(self.part_path, 'r+b') as f:
+                f.seek(offset)
+                for data in iter(lambda: staged.read(1024 * 1024), b''):
+                    f.write(data)
+
+        with self._lock:
+            self.received.add(index)
+            self.last_active = time.time()
+
+    def missing(self):
+        with self._lock:
+            return [index for index in range(self.num_chunks) if index not in self.received]
+
+    def status(self):
+        missing = self.missing()
+        return {
+            'upload_id': self.upload_id,
+            'size': self.size,
+            'chunk_size': self.chunk_size,
+            'received_chunks': self.num_chunks - len(missing),
+            'missing_chunks': missing,
+            # 第一个缺失块之前的数据都已确认，可从这里续传
+            'next_offset': missing[0] * self.chunk_size if missing else self.size
+        }
+
+    def finalize(self):
+        """
+        所有分块到齐后去掉 .part 后缀，返回整个文件的 SHA-256
+        :raises ChunkError: 仍有分块缺失
+        """
+        missing = self.missing()
+        if missing:
+            raise ChunkError(f"还有 {len(missing)} 个分块未上传")
+        digest = hashlib.sha256()
+        with open(self.part_path, 'rb') as f:
+            for data in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(data)
+        os.replace(self.part_path, self.file_path)
+        return digest.hexdigest()
+
+    def discard(self):
+        try:
+            os.remove(self.part_path)
+        except OSError:
+            pass
@@ -0,0 +1,110 @@
+import bisect
+from collections import deque
+
+import numpy as np
+
+
+class SilenceTrimmer:
+    """
+    基于短时能量与过零率的流式静音压缩（int16 单声道 PCM）。
+    每段静音最多保留 pad_ms（语音前后各一半），其余丢弃；同时记录时间映射，
+    可把压缩后音频上的时间换算回原始录音的时间。
+    :param rate: 采样率
+    :param frame_ms: 分析帧长
+    :param pad_ms: 每段静音保留的总时长，避免切掉字头字尾
+    :param margin_db: 高于噪声底多少 dB 判为语音
+    :param min_speech_db: 绝对能量下限，低于此值一律视为静音
+    """
+
+    def __init__(self, rate=16000, frame_ms=30, pad_ms=600, margin_db=10.0, min_speech_db=-50.0):
+        self.rate = rate
+        self.frame_samples = rate * frame_ms // 1000
+        self.frame_ms = frame_ms
+        self.margin_db = margin_db
+        self.min_speech_db = min_speech_db
+        self.pad_frames = max(1, pad_ms // frame_ms // 2)
+
+        self.noise_floor_db = None
+        self._remainder = np.zeros(0, dtype=np.int16)
+        # 静音帧缓冲：语音开始时只回补最后 pad_frames 帧
+        self._silence = deque(maxlen=self.pad_frames)
+        self._hangover = 0
+
+        self.input_frames = 0
+        self.output_frames = 0
+        # 时间映射：(压缩后起点帧, 原始起点帧)，每次发生丢弃后新增一个断点
+        self._out_marks = [0]
+        self._in_marks = [0]
+
+    def _classify(self, frames):
+        """向量化计算每帧是否为语音"""
+        samples = frames.astype(np.float32) / 32768.0
+        energy_db = 10 * np.log10(np.mean(samples * samples, axis=1) + 1e-10)
+        zcr = np.mean(np.abs(np.diff(np.signbit(samples), axis=1)), axis=1)
+
+        # 噪声底取本批最安静帧能量，并缓慢跟随
+        quiet = float(np.percentile(energy_db, 10))
+        if self.noise_floor_db is None:
+            self.noise_floor_db = quiet
+        else:
+            self.noise_floor_db = min(quiet, 0.95 * self.noise_floor_db + 0.05 * quiet)
+
+        threshold = max(self.noise_floor_db + self.margin_db, self.min_speech_db)
+        # 清辅音能量低但过零率高，放宽 3dB 判定
+        fricative = (zcr > 0.25) & (energy_db > threshold - 3)
+        return (energy_db > threshold) | fricative
+
+    def _emit(self, out, frame, in_index):
+        if self.input_frames + in_index != self._in_marks[-1] + (self.output_frames - self._out_marks[-1]):
+            self._out_marks.append(self.output_frames)
+            self._in_marks.append(self.input_frames + in_index)
+        out.append(frame)
+        self.output_frames += 1
+
+    def process(self, pcm: bytes) -> bytes:
+        """输入一块 PCM，返回压缩静音后的 PCM（可能为空）"""
+        samples = np.concatenate([self._remainder, np.frombuffer(pcm, dtype=np.int16)])
+        count = len(samples) // self.frame_samples
+        self._remainder = samples[count * self.frame_samples:]
+        if not count:
+            return b''
+
+        frames = samples[:count * self.frame_samples].reshape(count, self.frame_samples)
+        is_speech = self._classify(frames)
+
+        out = []
+        for i, speech in enumerate(is_speech):
+            if speech:
+                for j, frame in self._silence:
+                    self._emit(out, frame, j - self.input_frames)
+                self._silence.clear()
+                self._emit(out, frames[i], i)
+                self._hangover = self.pad_frames
+            elif self._hangover:
+                self._emit(out, frames[i], i)
+                self._hangover -= 1
+            else:
+                self._silence.append((self.input_frames + i, frames[i]))
+        self.input_frames += count
+
+        return b''.join(frame.tobytes() for frame in out)
+
+    def flush(self) -> bytes:
+        """录音结束时输出不足一帧的尾部"""
+        tail, self._remainder = self._remainder, np.zeros(0, dtype=np.int16)
+        return tail.tobytes() if self._hangover else b''
+
+    def to_original_ms(self, trimmed_ms: float) -> float:
+        """把压缩后音频上的时间换算为原始录音上的时间"""
+        frame = trimmed_ms / self.frame_ms
+        i = bisect.bisect_right(self._out_marks, frame) - 1
+        return (self._in_marks[i] + frame - self._out_marks[i]) * self.frame_ms
+
+    def stats(self):
+        frame_bytes = self.frame_samples * 2
+        return {
+            'input_seconds': round(self.input_frames * self.frame_ms / 1000, 1),
+            'output_seconds': round(self.output_frames * self.frame_ms / 1000, 1),
+            'bytes_saved': (self.input_frames - self.output_frames) * frame_bytes,
+            'noise_floor_db': round(self.noise_floor_db, 1) if self.noise_floor_db is not None else None
+        }
@@ -0,0 +1,151 @@
+import threading
+import time
+
+import numpy as np
+
+
+class SessionClosedError(ValueError):
+    """会话已关闭后继续上传分块"""
+
+
+class StreamSession:
+    """
+    流式识别会话：持续接收 16kHz 单声道 int16 PCM 分块，增量运行 VAD，
+    语音段结束后提交识别得到定稿文本，语音进行中定期提交识别得到临时文本。
+    :param vad_fn: vad_fn(samples, is_final) -> [[beg_ms, end_ms], ...]，
+                   -1 表示该端点尚未检测到（FunASR 流式 VAD 的输出格式），VAD 状态由调用方维护
+    :param recognize_fn: recognize_fn(samples, language, callback)，异步识别，
+                         完成后以 callback(text, error) 回调
+    """
+
+    # 无语音时保留的音频长度，VAD 检测到的起点可能略早于当前分块
+    KEEP_MS = 1000
+
+    def __init__(self, session_id, language, vad_fn, recognize_fn,
+                 sample_rate=16000, partial_interval_ms=2000):
+        self.session_id = session_id
+        self.language = language
+        self.vad_fn = vad_fn
+        self.recognize_fn = recognize_fn
+        self.sample_rate = sample_rate
+        self.partial_interval_ms = partial_interval_ms
+
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.audio_start_ms = 0
+        self.received_samples = 0
+        self.segments = []
+        self.open_segment = None
+        self.last_partial_ms = 0
+        self.partial_inflight = False
+        self.closed = False
+        self.created_at = time.time()
+        self.last_active = self.created_at
+        self.lock = threading.RLock()
+        # 保证分块按到达顺序进入 VAD；VAD 在 lock 之外运行，不阻塞快照查询与识别回调
+        self.feed_lock = threading.Lock()
+
+    def feed(self, pcm, is_final=False):
+        """
+        追加一段 PCM 并返回当前快照
+        :param pcm: int16 小端 PCM 字节
+        :param is_final: 是否为最后一块，之后会话关闭
+        """
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+        with self.feed_lock:
+            with self.lock:
+                if self.closed:
+                    raise SessionClosedError("会话已关闭")
+                self.last_active = time.time()
+                self.audio = np.concatenate([self.audio, samples])
+                self.received_samples += len(samples)
+
+            endpoints = self.vad_fn(samples, is_final)
+
+            with self.lock:
+                for beg, end in endpoints:
+                    if beg != -1:
+                        self._open(beg)
+                    if end != -1 and self.open_segment is not None:
+                        self._finalize(end)
+
+                if is_final:
+                    if self.open_segment is not None:
+                        self._finalize(self.received_ms)
+                    self.closed = True
+                elif self.open_segment is not None and \
+                        self.received_ms - self.last_partial_ms >= self.partial_interval_ms:
+                    self._partial()
+
+                self._trim()
+                return self._snapshot()
+
+    @property
+    def received_ms(self):
+        return self.received_samples * 1000 // self.sample_rate
+
+    def snapshot(self):
+        with self.lock:
+            return self._snapshot()
+
+    def _samples(self, beg_ms, end_ms):
+        to_index = lambda ms: max(0, (ms - self.audio_start_ms) * self.sample_rate // 1000)
+        return self.audio[to_index(beg_ms):to_index(end_ms)]
+
+    def _open(self, beg):
+        if self.open_segment is not None:
+            self._finalize(beg)
+        self.open_segment = {'start': beg, 'end': None, 'text': '', 'final': False}
+        self.segments.append(self.open_segment)
+        self.last_partial_ms = beg
+
+    def _finalize(self, end):
+        segment = self.open_segment
+        self.open_segment = None
+        segment['end'] = end
+        samples = self._samples(segment['start'], end)
+
+        def callback(text, error):
+            with self.lock:
+                segment['text'] = text if error is None else segment['text']
+                segment['final'] = True
+                if error is not None:
+                    segment['error'] = str(error)
+
+        self.recognize_fn(samples, self.language, callback)
+
+    def _partial(self):
+        if self.partial_inflight:
+            return
+        segment = self.open_segment
+        self.partial_inflight = True
+        self.last_partial_ms = self.received_ms
+        samples = self._samples(segment['start'], self.received_ms)
+
+        def callback(text, error):
+            with self.lock:
+                self.partial_inflight = False
+                # 定稿结果可能先于临时结果返回，不能覆盖
+                if error is None and not segment['final']:
+                    segment['text'] = text
+
+        self.recognize_fn(samples, self.language, callback)
+
+    def _trim(self):
+        """丢弃不再需要的音频，内存只保留当前语音段"""
+        if self.open_segment is not None:
+            keep_from = self.open_segment['start']
+        else:
+            keep_from = self.received_ms - self.KEEP_MS
+        drop = (keep_from - self.audio_start_ms) * self.sample_rate // 1000
+        if drop > 0:
+            self.audio = self.audio[drop:]
+            self.audio_start_ms += drop * 1000 // self.sample_rate
+
+    def _snapshot(self):
+        return {
+            'session_id': self.session_id,
+            'received_ms': self.received_ms,
+            'segments': [dict(segment) for segment in self.segments],
+            'text': ''.join(segment['text'] for segment in self.segments if segment['final']),
+            'done': self.closed and all(segment['final'] for segment in self.segments)
+        }
@@ -0,0 +1,156 @@
+import json
+import sqlite3
+import threading
+
+
+class MemoryTaskStore:
+    """
+    内存任务存储（默认），重启后任务丢失。
+    所有方法返回任务字典的副本，修改需通过 update 完成。
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def create(self, task_id, task):
+        with self._lock:
+            self._tasks[task_id] = dict(task)
+
+    def get(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task else None
+
+    def update(self, task_id, **fields):
+        """更新任务字段，任务不存在返回 False"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return False
+            task.update(fields)
+            return True
+
+    def delete(self, task_id):
+        with self._lock:
+            self._tasks.pop(task_id, None)
+
+    def delete_finished_before(self, cutoff, is_final):
+        """删除 created_at 早于 cutoff 的已结束任务，返回删除数量"""
+        with self._lock:
+            to_delete = [task_id for task_id, task in self._tasks.items()
+                         if task['created_at'] < cutoff and bool(task.get('is_final')) == is_final
+                         and task['status'] in ['completed', 'failed']]
+            for task_id in to_delete:
+                del self._tasks[task_id]
+            return len(to_delete)
+
+    def unfinished(self):
+        """返回排队中或处理中的任务 [(task_id, task), ...]，按创建时间排序"""
+        with self._lock:
+            items = [(task_id, dict(task)) for task_id, task in self._tasks.items()
+                     if task['status'] in ['queued', 'processing']]
+        return sorted(items, key=lambda item: item[1]['created_at'])
+
+    def count_by_status(self):
+        with self._lock:
+            counts = {}
+            for task in self._tasks.values():
+                counts[task['status']] = counts.get(task['status'], 0) + 1
+            return counts
+
+
+class SqliteTaskStore:
+    """
+    SQLite 任务存储（WAL 模式），重启后任务仍在。
+    status、created_at 单独成列并建索引，保留期清理走范围查询；
+    每个线程使用独立连接，WAL 下读不阻塞写，写操作由锁串行化。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                is_final INTEGER NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_status_created ON tasks (status, created_at);
+            CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks (created_at);
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, sql, params):
+        with self._write_lock:
+            conn = self._conn()
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.rowcount
+
+    def create(self, task_id, task):
+        self._write(
+            "INSERT OR REPLACE INTO tasks (task_id, status, created_at, is_final, data) VALUES (?, ?, ?, ?, ?)",
+            (task_id, task['status'], task['created_at'], int(bool(task.get('is_final'))), json.dumps(task))
+        )
+
+    def get(self, task_id):
+        row = self._conn().execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, task_id, **fields):
+        with self._write_lock:
+            conn = self._conn()
+            row = conn.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if row is None:
+                return False
+            task = json.loads(row[0])
+            task.update(fields)
+            conn.execute("UPDATE tasks SET status = ?, data = ? WHERE task_id = ?",
+                         (task['status'], json.dumps(task), task_id))
+            conn.commit()
+            return True
+
+    def delete(self, task_id):
+        self._write("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+    def delete_finished_before(self, cutoff, is_final):
+        return self._write(
+            "DELETE FROM tasks WHERE status IN ('completed', 'failed') AND created_at < ? AND is_final = ?",
+            (cutoff, int(is_final))
+        )
+
+    def unfinished(self):
+        rows = self._conn().execute(
+            "SELECT task_id, data FROM tasks WHERE status IN ('queued', 'processing') ORDER BY created_at"
+        ).fetchall()
+        return [(task_id, json.loads(data)) for task_id, data in rows]
+
+    def count_by_status(self):
+        return dict(self._conn().execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+
+def create_task_store(backend='memory', path='tasks.db'):
+    """
+    按配置创建任务存储
+    :param backend: 'memory' 或 'sqlite'
+    :param path: SQLite 数据库路径
+    """
+    if backend == 'sqlite':
+        return SqliteTaskStore(path)
+    if backend == 'memory':
+        return MemoryTaskStore()
+    raise ValueError(f"未知的任务存储后端: {backend}")
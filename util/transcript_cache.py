@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class TranscriptCache:
+    """
+    客户端转录缓存：按音频指纹与语言索引，保存转录文本及不同提示词下的总结。
+    每个条目是 cache_dir 下的一个 JSON 文件，总大小超过 max_bytes 时按最近访问时间淘汰。
+    :param cache_dir: 缓存目录
+    :param max_bytes: 缓存总大小上限
+    """
+
+    # 计算指纹时分块读取文件，大视频也不会整体读入内存
+    READ_BYTES = 1024 * 1024
+    # 最多记住的文件指纹数
+    MAX_FINGERPRINTS = 1024
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (路径, 大小, 修改时间) -> 指纹，避免同一文件重复读取，超过上限时淘汰最久未用的
+        self._fingerprints = OrderedDict()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def fingerprint(self, file_path):
+        """计算音频/视频文件指纹：全部内容的 SHA-256，同一文件未修改时只计算一次"""
+        stat = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if memo_key in self._fingerprints:
+                self._fingerprints.move_to_end(memo_key)
+                return self._fingerprints[memo_key]
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.READ_BYTES), b''):
+                digest.update(chunk)
+
+        fingerprint = digest.hexdigest()
+        with self._lock:
+            self._fingerprints[memo_key] = fingerprint
+            while len(self._fingerprints) > self.MAX_FINGERPRINTS:
+                self._fingerprints.popitem(last=False)
+        return fingerprint
+
+    def key(self, file_path, language):
+        return hashlib.sha256(f"{self.fingerprint(file_path)}|{language}".encode()).hexdigest()
+
+    @staticmethod
+    def _instruction_key(instruction):
+        return hashlib.sha256((instruction or "").encode()).hexdigest()[:16]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(self._path(key))
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key, entry):
+        tmp_path = f"{self._path(key)}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def get_transcript(self, key):
+        """命中返回转录文本，否则返回 None"""
+        with self._lock:
+            entry = self._read(key)
+            if entry is None or 'transcript' not in entry:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry['transcript']
+
+    def get_summary(self, key, instruction):
+        with self._lock:
+            entry = self._read(key)
+            if entry is None:
+                return None
+            return entry.get('summaries', {}).get(self._instruction_key(instruction))
+
+    def put_transcript(self, key, transcript, source=""):
+        with self._lock:
+            entry = self._read(key) or {'summaries': {}}
+            entry.update(transcript=transcript, source=source)
+            self._write(key, entry)
+
+    def put_summary(self, key, instruction, summary):
+        with self._lock:
+            entry = self._read(key)
+            if entry is None:
+                return
+            entry.setdefault('summaries', {})[self._instruction_key(instruction)] = summary
+            self._write(key, entry)
+
+    def _evict(self):
+        """超过大小上限时删除最久未访问的条目"""
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.json')]
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.json')]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'entries': len(entries),
+                'bytes': sum(entry.stat().st_size for entry in entries),
+                'max_bytes': self.max_bytes
+            }